@@ -9,6 +9,7 @@ Created on 2018-06-19 17:17
 """
 
 import threading
+import time
 from queue import Queue
 
 import feapder.utils.tools as tools
@@ -19,7 +20,7 @@ from feapder.network.item import Item, UpdateItem
 from feapder.pipelines import BasePipeline
 from feapder.pipelines.mysql_pipeline import MysqlPipeline
 from feapder.utils import metrics
-from feapder.utils.log import log
+from feapder.utils.log import LazyStr, log
 
 MYSQL_PIPELINE_PATH = "feapder.pipelines.mysql_pipeline.MysqlPipeline"
 
@@ -38,6 +39,8 @@ class ItemBuffer(threading.Thread):
             self._task_table = task_table
 
             self._items_queue = Queue(maxsize=setting.ITEM_MAX_CACHED_COUNT)
+            # 结构化日志模式下，记录item来自哪个request的解析 id(item): correlation_id
+            self._correlation_ids = {}
 
             self._table_request = setting.TAB_REQUESTS.format(redis_key=redis_key)
             self._table_failed_items = setting.TAB_FAILED_ITEMS.format(
@@ -121,6 +124,12 @@ class ItemBuffer(threading.Thread):
             # 入库前的回调
             item.pre_to_db()
 
+            if setting.LOG_JSON:
+                # put_item在解析线程中调用，取当前解析的request的关联id
+                correlation_id = log.get_context().get("correlation_id")
+                if correlation_id:
+                    self._correlation_ids[id(item)] = correlation_id
+
         self._items_queue.put(item)
 
     def flush(self):
@@ -130,12 +139,18 @@ class ItemBuffer(threading.Thread):
             requests = []
             callbacks = []
             items_fingerprints = []
+            correlation_ids = []
             data_count = 0
 
             while not self._items_queue.empty():
                 data = self._items_queue.get_nowait()
                 data_count += 1
 
+                if self._correlation_ids and isinstance(data, Item):
+                    correlation_id = self._correlation_ids.pop(id(data), None)
+                    if correlation_id:
+                        correlation_ids.append(correlation_id)
+
                 # data 分类
                 if callable(data):
                     callbacks.append(data)
@@ -153,7 +168,12 @@ class ItemBuffer(threading.Thread):
 
                 if data_count >= setting.ITEM_UPLOAD_BATCH_MAX_SIZE:
                     self.__add_item_to_db(
-                        items, update_items, requests, callbacks, items_fingerprints
+                        items,
+                        update_items,
+                        requests,
+                        callbacks,
+                        items_fingerprints,
+                        correlation_ids,
                     )
 
                     items = []
@@ -161,11 +181,17 @@ class ItemBuffer(threading.Thread):
                     requests = []
                     callbacks = []
                     items_fingerprints = []
+                    correlation_ids = []
                     data_count = 0
 
             if data_count:
                 self.__add_item_to_db(
-                    items, update_items, requests, callbacks, items_fingerprints
+                    items,
+                    update_items,
+                    requests,
+                    callbacks,
+                    items_fingerprints,
+                    correlation_ids,
                 )
 
         except Exception as e:
@@ -284,8 +310,15 @@ class ItemBuffer(threading.Thread):
         return True
 
     def __add_item_to_db(
-            self, items, update_items, requests, callbacks, items_fingerprints
+            self,
+            items,
+            update_items,
+            requests,
+            callbacks,
+            items_fingerprints,
+            correlation_ids=None,
     ):
+        start_time = time.time()
         export_success = True
         self._is_adding_to_db = True
 
@@ -293,6 +326,9 @@ class ItemBuffer(threading.Thread):
         if setting.ITEM_FILTER_ENABLE:
             items, items_fingerprints = self.__dedup_items(items, items_fingerprints)
 
+        items_count = len(items)
+        update_items_count = len(update_items)
+
         # 分捡（返回值包含 pipelines_dict）
         items_dict = self.__pick_items(items)
         update_items_dict = self.__pick_items(update_items, is_update_item=True)
@@ -308,8 +344,9 @@ class ItemBuffer(threading.Thread):
                 -------------- item 批量入库 --------------
                 表名: %s
                 datas: %s
-                    """
-                % (table, tools.dumps_json(datas, indent=16))
+                    """,
+                table,
+                LazyStr(tools.dumps_json, datas, indent=16),
             )
 
             if not self.__export_to_db(table, datas, used_pipelines=used_pipelines):
@@ -326,8 +363,9 @@ class ItemBuffer(threading.Thread):
                 -------------- item 批量更新 --------------
                 表名: %s
                 datas: %s
-                    """
-                % (table, tools.dumps_json(datas, indent=16))
+                    """,
+                table,
+                LazyStr(tools.dumps_json, datas, indent=16),
             )
 
             update_keys = self._item_update_keys.get(table)
@@ -412,6 +450,16 @@ class ItemBuffer(threading.Thread):
                     message_prefix="《%s》爬虫导出数据失败" % (self._redis_key),
                 )
 
+        log.event(
+            "item_flush",
+            spider=self._redis_key,
+            correlation_ids=list(dict.fromkeys(correlation_ids or [])),
+            items_count=items_count,
+            update_items_count=update_items_count,
+            success=export_success,
+            elapsed=round(time.time() - start_time, 3),
+        )
+
         self._is_adding_to_db = False
 
     def metric_datas(self, table, datas):
@@ -55,6 +55,14 @@ class AirSpiderRequestBuffer:
         else:
             self._db.add(request, ignore_max_size=ignore_max_size)
 
+    def put_delay_request(self, request, delay):
+        """
+        延迟重新入库，不去重
+        @param request: Request
+        @param delay: 延迟时间 秒
+        """
+        self._db.add_delay(request, delay)
+
 
 class RequestBuffer(AirSpiderRequestBuffer, threading.Thread):
     def __init__(self, redis_key):
@@ -95,6 +103,18 @@ class RequestBuffer(AirSpiderRequestBuffer, threading.Thread):
     def put_del_request(self, request):
         self._del_requests_deque.append(request)
 
+    def put_delay_request(self, request, delay):
+        """
+        延迟重新入库，不去重。直接修改任务的分数为到期时间，到期后才会被collector取到
+        @param request: Request 或 从redis中取出的request字符串
+        @param delay: 延迟时间 秒
+        """
+        if not isinstance(request, str):
+            request = str(request.to_dict)
+        self._db.zadd(
+            self._table_request, request, tools.get_current_timestamp() + delay
+        )
+
     def put_failed_request(self, request, table=None):
         try:
             request_dict = request.to_dict
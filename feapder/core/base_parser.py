@@ -68,6 +68,19 @@ class BaseParser(object):
 
         pass
 
+    def not_modified(self, request: Request, response: Response):
+        """
+        @summary: 页面未修改时代替解析函数调用，仅在 HTTP_CACHE_SETTING 中 policy 为 skip 时生效
+        可产出需要的request、item或callback，如标记任务完成
+        ---------
+        @param request:
+        @param response: 缓存的页面
+        ---------
+        @result: request / item / callback / None (返回值必须可迭代)
+        """
+
+        pass
+
     def exception_request(self, request: Request, response: Response, e: Exception):
         """
         @summary: 请求或者parser里解析出异常的request
@@ -172,6 +185,19 @@ class TaskParser(BaseParser):
 
     update_task = update_task_state
 
+    def not_modified(self, request: Request, response: Response):
+        """
+        @summary: 页面未修改且跳过解析函数时，将 request.task_id 对应的任务标记为完成，否则任务会被重复下发
+        ---------
+        @param request:
+        @param response: 缓存的页面
+        ---------
+        @result:
+        """
+        task_id = getattr(request, "task_id", None)
+        if task_id is not None:
+            yield self.update_task_batch(task_id, 1)
+
     def update_task_batch(self, task_id, state=1, **kwargs):
         """
         批量更新任务 多处调用，更新的字段必须一致
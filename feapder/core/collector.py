@@ -86,6 +86,8 @@ class Collector(threading.Thread):
                     "request_obj": Request.from_dict(eval(request)),
                     "request_redis": request,
                 }
+                if setting.LOG_JSON:
+                    request_dict["request_obj"].correlation_id = log.new_correlation_id()
             except Exception as e:
                 log.exception(
                     """
@@ -7,6 +7,7 @@ Created on 2017-01-03 16:06
 @author: Boris
 @email: boris_liu@foxmail.com
 """
+import functools
 import inspect
 import random
 import threading
@@ -20,13 +21,33 @@ from feapder.buffer.request_buffer import AirSpiderRequestBuffer
 from feapder.core.base_parser import BaseParser
 from feapder.db.memorydb import MemoryDB
 from feapder.network.item import Item
+from feapder.network.proxy_pool import ProxyUnavailableError
 from feapder.network.request import Request
+from feapder.network.response import ResponseTooLargeError
 from feapder.utils import metrics
-from feapder.utils.log import log
+from feapder.utils.log import LazyStr, log
+
+
+def with_log_context(deal_request):
+    """
+    结构化日志模式下，解析request期间打印的日志均带上该request的上下文
+    """
+
+    @functools.wraps(deal_request)
+    def wrapper(self, request):
+        if not setting.LOG_JSON:
+            return deal_request(self, request)
+
+        request_obj = request["request_obj"] if isinstance(request, dict) else request
+        with log.context(**self.get_log_context(request_obj)):
+            return deal_request(self, request)
+
+    return wrapper
 
 
 class ParserControl(threading.Thread):
     DOWNLOAD_EXCEPTION = "download_exception"
+    DOWNLOAD_ABORTED = "download_aborted"
     DOWNLOAD_SUCCESS = "download_success"
     DOWNLOAD_TOTAL = "download_total"
     PAESERS_EXCEPTION = "parser_exception"
@@ -74,13 +95,16 @@ class ParserControl(threading.Thread):
     def get_task_status_count(cls):
         return cls._failed_task_count, cls._success_task_count, cls._total_task_count
 
+    @with_log_context
     def deal_request(self, request):
+        start_time = time.time()
         response = None
         request_redis = request["request_redis"]
         request = request["request_obj"]
 
         del_request_redis_after_item_to_db = False
         del_request_redis_after_request_to_db = False
+        requeue_later = False  # 已延迟重新入库，不删除正在做的request
 
         for parser in self._parsers:
             if parser.name == request.parser_name:
@@ -155,6 +179,9 @@ class ParserControl(threading.Thread):
                                 "连接超时 url: %s" % (request.url or request_temp.url)
                             )
 
+                        # 向代理池反馈代理的请求结果
+                        (request_temp or request).report_proxy(True, response)
+
                         # 校验
                         if parser.validate(request, response) == False:
                             break
@@ -162,7 +189,12 @@ class ParserControl(threading.Thread):
                     else:
                         response = None
 
-                    if request.callback:  # 如果有parser的回调函数，则用回调处理
+                    if Request.http_cache and Request.http_cache.is_skip(response):
+                        # 页面未修改，按 HTTP_CACHE_SETTING 中的 policy 跳过解析，由 not_modified 产出如标记任务完成等结果
+                        log.debug("页面未修改, 跳过解析 url: %s" % request.url)
+                        results = parser.not_modified(request, response)
+
+                    elif request.callback:  # 如果有parser的回调函数，则用回调处理
                         callback_parser = (
                             request.callback
                             if callable(request.callback)
@@ -229,15 +261,39 @@ class ParserControl(threading.Thread):
                                 f"{function_name} result expect Request、Item or callback, bug get type: {type(result)}"
                             )
 
+                except ProxyUnavailableError as e:
+                    # 获取代理超时，延迟重新入库，不计入重试次数
+                    log.warning(
+                        "%s, %s秒后重新入库 url: %s"
+                        % (e, setting.PROXY_REQUEUE_DELAY, request.url)
+                    )
+                    if request_redis:
+                        self._request_buffer.put_delay_request(
+                            request_redis, setting.PROXY_REQUEUE_DELAY
+                        )
+                        requeue_later = True
+                    else:
+                        self._request_buffer.put_delay_request(
+                            request, setting.PROXY_REQUEUE_DELAY
+                        )
+
                 except Exception as e:
                     exception_type = (
                         str(type(e)).replace("<class '", "").replace("'>", "")
                     )
-                    if exception_type.startswith("requests"):
+                    if isinstance(e, ResponseTooLargeError):
+                        # 记录响应体过大中止下载的文档，再次下载也会超限，不再重试
+                        self.record_download_status(
+                            ParserControl.DOWNLOAD_ABORTED, parser.name
+                        )
+                        request.is_abandoned = True
+
+                    elif exception_type.startswith("requests"):
                         # 记录下载失败的文档
                         self.record_download_status(
                             ParserControl.DOWNLOAD_EXCEPTION, parser.name
                         )
+                        request.report_proxy(False)
                         if request.retry_times % setting.PROXY_MAX_FAILED_TIMES == 0:
                             request.del_proxy()
 
@@ -256,22 +312,19 @@ class ParserControl(threading.Thread):
                         error          %s
                         response       %s
                         deal request   %s
-                        """
-                        % (
-                            parser.name,
-                            (
-                                request.callback
-                                and callable(request.callback)
-                                and getattr(request.callback, "__name__")
-                                or request.callback
-                            )
-                            or "parse",
-                            str(e),
-                            response,
-                            tools.dumps_json(request.to_dict, indent=28)
-                            if setting.LOG_LEVEL == "DEBUG"
-                            else request,
-                        )
+                        """,
+                        parser.name,
+                        request.callback_name or "parse",
+                        e,
+                        response,
+                        LazyStr(lambda: tools.dumps_json(request.to_dict, indent=28))
+                        if setting.LOG_LEVEL == "DEBUG"
+                        else request,
+                        extra={
+                            "event": "request_error",
+                            "exception_type": exception_type,
+                            "elapsed": round(time.time() - start_time, 3),
+                        },
                     )
 
                     request.error_msg = "%s: %s" % (exception_type, e)
@@ -383,6 +436,9 @@ class ParserControl(threading.Thread):
                     )
                     # 记录成功任务数
                     self.__class__._success_task_count += 1
+                    log.event(
+                        "request_success", elapsed=round(time.time() - start_time, 3)
+                    )
 
                     # 缓存下载成功的文档
                     if setting.RESPONSE_CACHED_ENABLE:
@@ -399,7 +455,7 @@ class ParserControl(threading.Thread):
                 break
 
         # 删除正在做的request 跟随item优先
-        if request_redis:
+        if request_redis and not requeue_later:
             if del_request_redis_after_item_to_db:
                 self._item_buffer.put_item(request_redis)
 
@@ -421,6 +477,24 @@ class ParserControl(threading.Thread):
             else:
                 time.sleep(setting.SPIDER_SLEEP_TIME)
 
+    def get_log_context(self, request):
+        """
+        结构化日志中，解析该request期间的日志所带的字段
+        """
+        if not request.correlation_id:
+            request.correlation_id = log.new_correlation_id()
+
+        return dict(
+            correlation_id=request.correlation_id,
+            # AirSpider无redis_key，爬虫即parser
+            spider=getattr(self, "_redis_key", None) or request.parser_name,
+            parser=request.parser_name,
+            callback=request.callback_name or "parse",
+            fingerprint=request.fingerprint,
+            url=request.url,
+            retry_times=request.retry_times,
+        )
+
     def record_download_status(self, status, spider):
         """
         记录html等文档下载状态
@@ -489,7 +563,9 @@ class AirSpiderParserControl(ParserControl):
             except Exception as e:
                 log.exception(e)
 
+    @with_log_context
     def deal_request(self, request):
+        start_time = time.time()
         response = None
 
         for parser in self._parsers:
@@ -552,6 +628,9 @@ class AirSpiderParserControl(ParserControl):
                                 else request.get_response_from_cached(save_cached=False)
                             )
 
+                        # 向代理池反馈代理的请求结果
+                        request.report_proxy(True, response)
+
                         # 校验
                         if parser.validate(request, response) == False:
                             break
@@ -559,7 +638,12 @@ class AirSpiderParserControl(ParserControl):
                     else:
                         response = None
 
-                    if request.callback:  # 如果有parser的回调函数，则用回调处理
+                    if Request.http_cache and Request.http_cache.is_skip(response):
+                        # 页面未修改，按 HTTP_CACHE_SETTING 中的 policy 跳过解析，由 not_modified 产出如标记任务完成等结果
+                        log.debug("页面未修改, 跳过解析 url: %s" % request.url)
+                        results = parser.not_modified(request, response)
+
+                    elif request.callback:  # 如果有parser的回调函数，则用回调处理
                         callback_parser = (
                             request.callback
                             if callable(request.callback)
@@ -604,15 +688,34 @@ class AirSpiderParserControl(ParserControl):
                                 f"{function_name} result expect Request or Item, bug get type: {type(result)}"
                             )
 
+                except ProxyUnavailableError as e:
+                    # 获取代理超时，延迟重新入库，不计入重试次数
+                    log.warning(
+                        "%s, %s秒后重新入库 url: %s"
+                        % (e, setting.PROXY_REQUEUE_DELAY, request.url)
+                    )
+                    request.filter_repeat = False
+                    self._request_buffer.put_delay_request(
+                        request, setting.PROXY_REQUEUE_DELAY
+                    )
+
                 except Exception as e:
                     exception_type = (
                         str(type(e)).replace("<class '", "").replace("'>", "")
                     )
-                    if exception_type.startswith("requests"):
+                    if isinstance(e, ResponseTooLargeError):
+                        # 记录响应体过大中止下载的文档，再次下载也会超限，不再重试
+                        self.record_download_status(
+                            ParserControl.DOWNLOAD_ABORTED, parser.name
+                        )
+                        request.is_abandoned = True
+
+                    elif exception_type.startswith("requests"):
                         # 记录下载失败的文档
                         self.record_download_status(
                             ParserControl.DOWNLOAD_EXCEPTION, parser.name
                         )
+                        request.report_proxy(False)
                         if request.retry_times % setting.PROXY_MAX_FAILED_TIMES == 0:
                             request.del_proxy()
 
@@ -631,22 +734,19 @@ class AirSpiderParserControl(ParserControl):
                             error          %s
                             response       %s
                             deal request   %s
-                            """
-                        % (
-                            parser.name,
-                            (
-                                request.callback
-                                and callable(request.callback)
-                                and getattr(request.callback, "__name__")
-                                or request.callback
-                            )
-                            or "parse",
-                            str(e),
-                            response,
-                            tools.dumps_json(request.to_dict, indent=28)
-                            if setting.LOG_LEVEL == "DEBUG"
-                            else request,
-                        )
+                            """,
+                        parser.name,
+                        request.callback_name or "parse",
+                        e,
+                        response,
+                        LazyStr(lambda: tools.dumps_json(request.to_dict, indent=28))
+                        if setting.LOG_LEVEL == "DEBUG"
+                        else request,
+                        extra={
+                            "event": "request_error",
+                            "exception_type": exception_type,
+                            "elapsed": round(time.time() - start_time, 3),
+                        },
                     )
 
                     request.error_msg = "%s: %s" % (exception_type, e)
@@ -719,6 +819,9 @@ class AirSpiderParserControl(ParserControl):
                     )
                     # 记录成功任务数
                     self.__class__._success_task_count += 1
+                    log.event(
+                        "request_success", elapsed=round(time.time() - start_time, 3)
+                    )
 
                     # 缓存下载成功的文档
                     if setting.RESPONSE_CACHED_ENABLE:
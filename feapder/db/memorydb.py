@@ -7,6 +7,10 @@ Created on 2020/4/21 11:42 PM
 @author: Boris
 @email: boris_liu@foxmail.com
 """
+import heapq
+import itertools
+import threading
+import time
 from queue import PriorityQueue
 
 from feapder import setting
@@ -16,6 +20,11 @@ class MemoryDB:
     def __init__(self):
         self.priority_queue = PriorityQueue(maxsize=setting.TASK_MAX_CACHED_SIZE)
 
+        # 延迟任务 [(执行时间, 序号, item)]，到期后再放入priority_queue
+        self._delay_queue = []
+        self._delay_lock = threading.Lock()
+        self._delay_counter = itertools.count()
+
     def add(self, item, ignore_max_size=False):
         """
         添加任务
@@ -29,11 +38,38 @@ class MemoryDB:
         else:
             self.priority_queue.put(item)
 
+    def add_delay(self, item, delay):
+        """
+        添加延迟任务，delay秒后才可被取到
+        :param item: 同add
+        :param delay: 延迟时间 秒
+        :return:
+        """
+        with self._delay_lock:
+            heapq.heappush(
+                self._delay_queue,
+                (time.time() + delay, next(self._delay_counter), item),
+            )
+
+    def _put_due_items(self):
+        """
+        将到期的延迟任务放入priority_queue
+        """
+        if not self._delay_queue:
+            return
+
+        now = time.time()
+        with self._delay_lock:
+            while self._delay_queue and self._delay_queue[0][0] <= now:
+                item = heapq.heappop(self._delay_queue)[2]
+                self.add(item, ignore_max_size=True)
+
     def get(self):
         """
         获取任务
         :return:
         """
+        self._put_due_items()
         try:
             item = self.priority_queue.get(timeout=1)
             return item
@@ -41,4 +77,4 @@ class MemoryDB:
             return
 
     def empty(self):
-        return self.priority_queue.empty()
+        return self.priority_queue.empty() and not self._delay_queue
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: 响应体压缩（Content-Encoding）的协商及解压，支持 gzip、deflate、br（需安装brotli）、zstd（需安装zstandard）
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import gzip
+import zlib
+
+try:
+    import brotli  # pip install brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import zstandard  # pip install zstandard
+except ImportError:
+    zstandard = None
+
+SUPPORTED_ENCODINGS = ["gzip", "deflate"]
+if brotli:
+    SUPPORTED_ENCODINGS.append("br")
+if zstandard:
+    SUPPORTED_ENCODINGS.append("zstd")
+
+# 请求头 Accept-Encoding 的值
+ACCEPT_ENCODING = ", ".join(SUPPORTED_ENCODINGS)
+
+_ALIASES = {"x-gzip": "gzip"}
+
+
+def get_content_encodings(headers):
+    """
+    解析响应头中的 Content-Encoding
+    Returns: 压缩方式列表，按压缩的先后顺序。有不支持的压缩方式时返回None，交由requests处理
+    """
+    content_encoding = headers.get("Content-Encoding") or headers.get(
+        "content-encoding"
+    )
+    if not content_encoding:
+        return None
+
+    encodings = []
+    for encoding in content_encoding.lower().split(","):
+        encoding = encoding.strip()
+        encoding = _ALIASES.get(encoding, encoding)
+        if not encoding or encoding == "identity":
+            continue
+        if encoding not in SUPPORTED_ENCODINGS:
+            return None
+        encodings.append(encoding)
+
+    return encodings or None
+
+
+def _decompress_deflate(data):
+    try:
+        return zlib.decompress(data)
+    except zlib.error:
+        # 部分服务端返回的是不带zlib头的原始deflate数据
+        return zlib.decompress(data, -zlib.MAX_WBITS)
+
+
+def _decompress_zstd(data):
+    try:
+        return zstandard.decompress(data)
+    except zstandard.ZstdError:
+        # 帧头中没有原始大小或有多个帧
+        return (
+            zstandard.ZstdDecompressor()
+            .decompressobj(read_across_frames=True)
+            .decompress(data)
+        )
+
+
+_DECOMPRESSORS = {
+    "gzip": gzip.decompress,
+    "deflate": _decompress_deflate,
+    "br": lambda data: brotli.decompress(data),
+    "zstd": _decompress_zstd,
+}
+
+
+def decompress(data: bytes, encodings) -> bytes:
+    """
+    一次性解压整个响应体，直接得到解压后的bytes，无中间拷贝
+    Args:
+        data: 压缩的响应体
+        encodings: get_content_encodings 的返回值
+
+    Returns:
+
+    """
+    for encoding in reversed(encodings):
+        data = _DECOMPRESSORS[encoding](data)
+    return data
+
+
+# 限制解压大小时，zstd、br 每次送入解压的字节数。二者不支持限制输出大小，小块输入以免少量数据解压出超大内容
+_BOUNDED_INPUT_SIZE = 256
+
+
+class _Decoder:
+    """
+    流式解压，用于边下载边解压
+    """
+
+    def __init__(self, encoding):
+        self._is_zlib = encoding in ("gzip", "deflate")
+        if encoding == "gzip":
+            self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            self._obj = zlib.decompressobj()
+        elif encoding == "br":
+            self._obj = brotli.Decompressor()
+        else:
+            self._obj = zstandard.ZstdDecompressor().decompressobj(
+                read_across_frames=True
+            )
+
+        if hasattr(self._obj, "decompress"):
+            self._decompress = self._obj.decompress
+        else:
+            self._decompress = self._obj.process
+
+    def decompress(self, data, max_length=0):
+        """
+        解压，分段产出
+        Args:
+            data: 压缩的数据
+            max_length: 每段解压后的最大字节数，0为不限制。gzip、deflate 严格限制，zstd、br 按小块输入近似限制
+
+        Returns: 解压后的数据的迭代器
+
+        """
+        if not max_length:
+            yield self._decompress(data)
+
+        elif self._is_zlib:
+            while data:
+                chunk = self._obj.decompress(data, max_length)
+                data = self._obj.unconsumed_tail
+                if chunk:
+                    yield chunk
+
+        else:
+            for i in range(0, len(data), _BOUNDED_INPUT_SIZE):
+                yield self._decompress(data[i : i + _BOUNDED_INPUT_SIZE])
+
+    def flush(self):
+        if hasattr(self._obj, "flush"):
+            return self._obj.flush() or b""
+        return b""
+
+
+class StreamDecoder:
+    """
+    流式解压，支持多重压缩
+    Args:
+        encodings: get_content_encodings 的返回值
+        max_length: 每段解压后的最大字节数，0为不限制。用于边解压边计数，防止压缩炸弹一次性解压出超大内容
+    """
+
+    def __init__(self, encodings, max_length=0):
+        self._decoders = [_Decoder(encoding) for encoding in reversed(encodings)]
+        self._max_length = max_length
+
+    def _pipe(self, decoder, chunks, flush):
+        for chunk in chunks:
+            yield from decoder.decompress(chunk, self._max_length)
+        if flush:
+            yield decoder.flush()
+
+    def decompress(self, data):
+        """
+        Returns: 解压后的数据的迭代器
+        """
+        chunks = [data]
+        for decoder in self._decoders:
+            chunks = self._pipe(decoder, chunks, flush=False)
+        return chunks
+
+    def flush(self):
+        """
+        Returns: 剩余数据的迭代器
+        """
+        chunks = []
+        for decoder in self._decoders:
+            chunks = self._pipe(decoder, chunks, flush=True)
+        return chunks
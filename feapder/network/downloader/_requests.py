@@ -11,16 +11,37 @@ Created on 2022/4/10 5:57 下午
 import requests
 from requests.adapters import HTTPAdapter
 
+import feapder.setting as setting
+from feapder.network import content_encoding
 from feapder.network.downloader.base import Downloader
 from feapder.network.response import Response
 
 
+def read_body(response: Response, request):
+    """
+    按request的 stream_to、max_body_size 流式读取响应体。响应体压缩且未限制大小时读取压缩的数据，访问content时才解压。
+    均不满足时保持原有的懒读取
+    """
+    stream_to = getattr(request, "stream_to", None)
+    max_body_size = getattr(request, "max_body_size", None)
+    if max_body_size is None:
+        max_body_size = setting.RESPONSE_MAX_BODY_SIZE
+
+    if (
+        stream_to
+        or max_body_size
+        or content_encoding.get_content_encodings(response.headers)
+    ):
+        response.read_body(stream_to=stream_to, max_body_size=max_body_size)
+
+
 class RequestsDownloader(Downloader):
     def download(self, request) -> Response:
         response = requests.request(
             request.method, request.url, **request.requests_kwargs
         )
         response = Response(response)
+        read_body(response, request)
         return response
 
 
@@ -39,8 +60,12 @@ class RequestsSessionDownloader(Downloader):
         return self.__class__.session
 
     def download(self, request) -> Response:
-        response = self._session.request(
+        # 指定了session_key的请求使用会话池中对应的session
+        session_identity = getattr(request, "session_identity", None)
+        session = session_identity.session if session_identity else self._session
+        response = session.request(
             request.method, request.url, **request.requests_kwargs
         )
         response = Response(response)
+        read_body(response, request)
         return response
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: 网页编码探测。按代价由低到高逐级探测：BOM > UTF-8校验 > 同域名缓存 > 统计探测
+    校验时除了前64KB，还会抽查末尾64KB，避免只看开头把编码判错
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import codecs
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+try:
+    import cchardet  # pip install faust-cchardet
+except ImportError:
+    cchardet = None
+
+try:
+    import charset_normalizer
+except ImportError:
+    charset_normalizer = None
+
+# 统计探测及校验时最多使用的字节数，大页面只看前面一段，编码基本可以确定
+DETECT_PREFIX_SIZE = 64 * 1024
+# 缓存的域名数
+HOST_ENCODING_CACHE_SIZE = 4096
+
+BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+# 统计探测结果的归一化，如 gb2312 探测结果经常包含gbk中的字符，统一用超集解码
+ENCODING_ALIASES = {
+    "ascii": "utf-8",
+    "gb2312": "gb18030",
+    "gbk": "gb18030",
+    "big5": "big5hkscs",
+}
+
+# 几乎能解码任意字节序列的编码，解码成功不能说明编码正确，缓存命中后仍需统计探测确认
+PERMISSIVE_ENCODINGS = {"gb18030"}
+
+
+class _HostEncodingCache:
+    """
+    域名 -> 编码 的LRU缓存，同一站点的页面编码基本一致
+    """
+
+    def __init__(self, maxsize=HOST_ENCODING_CACHE_SIZE):
+        self._maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, host):
+        with self._lock:
+            encoding = self._cache.get(host)
+            if encoding:
+                self._cache.move_to_end(host)
+            return encoding
+
+    def set(self, host, encoding):
+        with self._lock:
+            self._cache[host] = encoding
+            self._cache.move_to_end(host)
+            if len(self._cache) > self._maxsize:
+                self._cache.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+host_encoding_cache = _HostEncodingCache()
+
+
+def _normalize(encoding):
+    if not encoding:
+        return None
+    try:
+        name = codecs.lookup(encoding).name
+    except LookupError:
+        return None
+    return ENCODING_ALIASES.get(name, name)
+
+
+def bom_encoding(content: bytes):
+    for bom, encoding in BOMS:
+        if content.startswith(bom):
+            return encoding
+    return None
+
+
+def can_decode(content: bytes, encoding, size=DETECT_PREFIX_SIZE, tail=False):
+    """
+    校验content的前size个字节能否用encoding解码。使用增量解码器，截断处的半个多字节字符不算错误
+    tail为True时再抽查末尾size个字节，样本起点可能落在多字节字符中间，最多跳过3个字节对齐
+    size为None时校验全部内容，分块解码，不保留解码结果
+    """
+    try:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        if size is None:
+            view = memoryview(content)
+            for start in range(0, len(view), DETECT_PREFIX_SIZE):
+                decoder.decode(view[start : start + DETECT_PREFIX_SIZE])
+            decoder.decode(b"", final=True)
+            return True
+        decoder.decode(content[:size], final=len(content) <= size)
+    except (UnicodeDecodeError, LookupError):
+        return False
+
+    if not tail or len(content) <= size:
+        return True
+
+    sample = content[-size:]
+    for skip in range(4):
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(sample[skip:], final=True)
+            return True
+        except UnicodeDecodeError:
+            continue
+    return False
+
+
+def statistical_encoding(content: bytes, size=DETECT_PREFIX_SIZE):
+    """
+    统计探测编码，只取前后各size个字节。优先使用 cchardet，其次 charset_normalizer
+    """
+    sample = content if len(content) <= size * 2 else content[:size] + content[-size:]
+    if cchardet:
+        return _normalize(cchardet.detect(sample).get("encoding"))
+
+    if charset_normalizer:
+        best = charset_normalizer.from_bytes(sample).best()
+        return _normalize(best.encoding) if best else None
+
+    return None
+
+
+def get_host(url):
+    try:
+        return urlparse(url).netloc or None
+    except ValueError:
+        return None
+
+
+def detect_encoding(content: bytes, url=None):
+    """
+    探测网页编码
+    Args:
+        content: 网页源码 bytes
+        url: 网页地址，用于按域名缓存探测结果
+
+    Returns: 编码，探测不出时返回None
+    """
+    if not content:
+        return None
+
+    encoding = bom_encoding(content)
+    if encoding:
+        return encoding
+
+    if can_decode(content, "utf-8", tail=True):
+        return "utf-8"
+
+    host = get_host(url) if url else None
+    cached = host_encoding_cache.get(host) if host else None
+    if cached and not can_decode(content, cached, tail=True):
+        cached = None
+    if cached and cached not in PERMISSIVE_ENCODINGS:
+        return cached
+
+    encoding = statistical_encoding(content) or cached
+    if encoding and host:
+        host_encoding_cache.set(host, encoding)
+
+    return encoding
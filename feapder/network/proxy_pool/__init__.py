@@ -7,5 +7,7 @@ Created on 2023/7/25 10:16
 @author: Boris
 @email: boris_liu@foxmail.com
 """
-from .base import BaseProxyPool
+from .base import BaseProxyPool, ProxyUnavailableError
 from .proxy_pool import ProxyPool
+from .redis_proxy_pool import RedisProxyPool
+from .scored_proxy_pool import ScoredProxyPool
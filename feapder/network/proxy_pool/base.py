@@ -9,10 +9,21 @@ Created on 2023/7/25 10:03
 """
 
 import abc
+import time
 
 from feapder.utils.log import log
 
 
+class ProxyUnavailableError(Exception):
+    """
+    在限定时间内未获取到代理
+    """
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        super().__init__(f"{timeout}秒内未获取到代理")
+
+
 class BaseProxyPool:
     @abc.abstractmethod
     def get_proxy(self):
@@ -23,6 +34,33 @@ class BaseProxyPool:
         """
         raise NotImplementedError
 
+    def acquire_proxy(self, timeout=None):
+        """
+        获取代理，暂无代理时等待，等待间隔逐步增加，不空转
+        Args:
+            timeout: 最长等待时间 秒，为None时一直等待
+
+        Returns:
+            {"http": "xxx", "https": "xxx"}，超时返回None
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        interval = 0.1
+        while True:
+            proxies = self.get_proxy()
+            if proxies:
+                return proxies
+
+            if deadline is None:
+                wait_time = interval
+            else:
+                wait_time = min(interval, deadline - time.time())
+                if wait_time <= 0:
+                    return None
+
+            log.debug("暂无可用代理 ...")
+            time.sleep(wait_time)
+            interval = min(interval * 2, 5)
+
     @abc.abstractmethod
     def del_proxy(self, proxy):
         """
@@ -32,6 +70,16 @@ class BaseProxyPool:
         """
         raise NotImplementedError
 
+    def report_proxy(self, proxy, success, elapsed=None):
+        """
+        @summary: 反馈代理的请求结果，可用于统计代理的健康度。默认不处理
+        ---------
+        @param proxy: ip:port
+        @param success: 是否成功
+        @param elapsed: 请求耗时 秒
+        """
+        pass
+
     def tag_proxy(self, **kwargs):
         """
         @summary: 标记代理
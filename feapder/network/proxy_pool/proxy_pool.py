@@ -7,6 +7,7 @@ Created on 2022/10/19 10:40 AM
 @author: Boris
 @email: boris_liu@foxmail.com
 """
+import time
 from queue import Queue
 
 import requests
@@ -15,6 +16,7 @@ import feapder.setting as setting
 from feapder.network.proxy_pool.base import BaseProxyPool
 from feapder.utils import metrics
 from feapder.utils import tools
+from feapder.utils.log import log
 
 
 class ProxyPool(BaseProxyPool):
@@ -30,9 +32,8 @@ class ProxyPool(BaseProxyPool):
     def format_proxy(self, proxy):
         return {"http": "http://" + proxy, "https": "http://" + proxy}
 
-    @tools.retry(3, interval=5)
-    def pull_proxies(self):
-        resp = requests.get(self.proxy_api)
+    def _pull_proxies(self, timeout=None):
+        resp = requests.get(self.proxy_api, timeout=timeout)
         proxies = resp.text.strip()
         resp.close()
         if "{" in proxies or not proxies:
@@ -40,24 +41,69 @@ class ProxyPool(BaseProxyPool):
         # 使用 /r/n 分隔
         return proxies.split("\r\n")
 
-    def get_proxy(self):
-        try:
-            if self.proxy_queue.empty():
-                proxies = self.pull_proxies()
-                for proxy in proxies:
-                    self.proxy_queue.put_nowait(proxy)
-                    metrics.emit_counter("total", 1, classify="proxy")
+    @tools.retry(3, interval=5)
+    def pull_proxies(self):
+        return self._pull_proxies()
 
-            proxy = self.proxy_queue.get_nowait()
+    def _put_proxies(self, proxies):
+        for proxy in proxies:
             self.proxy_queue.put_nowait(proxy)
+            metrics.emit_counter("total", 1, classify="proxy")
+
+    def _next_proxy(self):
+        proxy = self.proxy_queue.get_nowait()
+        self.proxy_queue.put_nowait(proxy)
+
+        metrics.emit_counter("used_times", 1, classify="proxy")
+
+        return self.format_proxy(proxy)
 
-            metrics.emit_counter("used_times", 1, classify="proxy")
+    def get_proxy(self):
+        try:
+            if self.proxy_queue.empty():
+                self._put_proxies(self.pull_proxies())
 
-            return self.format_proxy(proxy)
+            return self._next_proxy()
         except Exception as e:
             tools.send_msg("获取代理失败", level="error")
             raise Exception("获取代理失败", e)
 
+    def acquire_proxy(self, timeout=None):
+        """
+        获取代理，无代理时提取，提取失败时间隔重试，不超过 timeout
+        Args:
+            timeout: 最长等待时间 秒，为None时一直等待
+
+        Returns:
+            {"http": "xxx", "https": "xxx"}，超时返回None，由调用方按 ProxyUnavailableError 处理
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        interval = 0.5
+        while True:
+            try:
+                return self._next_proxy()
+            except Exception:
+                # 队列为空
+                pass
+
+            remaining = None if deadline is None else deadline - time.time()
+            if remaining is not None and remaining <= 0:
+                return None
+
+            try:
+                self._put_proxies(self._pull_proxies(timeout=remaining))
+                continue
+            except Exception as e:
+                log.error(f"提取代理失败: {e}")
+
+            wait_time = interval
+            if deadline is not None:
+                wait_time = min(interval, deadline - time.time())
+                if wait_time <= 0:
+                    return None
+            time.sleep(wait_time)
+            interval = min(interval * 2, 5)
+
     def del_proxy(self, proxy):
         """
         @summary: 删除代理
@@ -0,0 +1,489 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: 基于redis的分布式代理池，多个爬虫节点共享代理及其健康度
+    - 代理按评分存储在ZSET中，统计信息存储在HASH中，租用记录存储在ZSET中（分数为过期时间）
+    - 节点每次通过lua脚本原子地租用一批代理缓存在本地，用完或租约到期时归还并重新租用，无需每个请求都访问redis
+    - 请求结果在本地汇总后定时上报，某节点发现的失效代理对所有节点生效
+    - 代理不足时，只有抢到 RedisLock 的节点调用API提取代理，避免重复消耗API额度
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import random
+import threading
+import time
+import uuid
+
+import feapder.setting as setting
+from feapder.db.redisdb import RedisDB
+from feapder.network.proxy_pool.proxy_pool import ProxyPool
+from feapder.utils import metrics
+from feapder.utils.log import log
+from feapder.utils.redis_lock import RedisLock
+
+# KEYS: 代理池、统计、租用记录
+# ARGV: 当前时间、租约过期时间、租用数量、单个代理最大租用数、租用者id、需归还的代理...
+# 返回: [代理, 评分, 代理, 评分, ...]
+LEASE_LUA = """
+    local now = ARGV[1]
+    local expire_at = ARGV[2]
+    local count = tonumber(ARGV[3])
+    local max_leases = tonumber(ARGV[4])
+    local lease_id = ARGV[5]
+
+    local function decr_leased(proxy)
+        if redis.call('zscore', KEYS[1], proxy) then
+            if redis.call('hincrby', KEYS[2], proxy .. ':leased', -1) < 0 then
+                redis.call('hset', KEYS[2], proxy .. ':leased', 0)
+            end
+        end
+    end
+
+    -- 归还上一批租用的代理
+    for i = 6, #ARGV do
+        if redis.call('zrem', KEYS[3], lease_id .. '|' .. ARGV[i]) == 1 then
+            decr_leased(ARGV[i])
+        end
+    end
+
+    -- 回收过期的租约，如节点异常退出未归还
+    local expired = redis.call('zrangebyscore', KEYS[3], '-inf', now)
+    for i = 1, #expired do
+        redis.call('zrem', KEYS[3], expired[i])
+        decr_leased(string.match(expired[i], '^[^|]*|(.*)$'))
+    end
+
+    if count <= 0 then
+        return {}
+    end
+
+    -- 从评分最高的代理中，优先租用被租用次数少的
+    local candidates = redis.call('zrevrange', KEYS[1], 0, count * 4 - 1, 'withscores')
+    local items = {}
+    for i = 1, #candidates, 2 do
+        local leased = tonumber(redis.call('hget', KEYS[2], candidates[i] .. ':leased') or 0)
+        if max_leases <= 0 or leased < max_leases then
+            table.insert(items, {candidates[i], candidates[i + 1], leased})
+        end
+    end
+    table.sort(items, function(a, b)
+        if a[3] ~= b[3] then
+            return a[3] < b[3]
+        end
+        return tonumber(a[2]) > tonumber(b[2])
+    end)
+
+    local result = {}
+    for i = 1, math.min(count, #items) do
+        local proxy = items[i][1]
+        redis.call('hincrby', KEYS[2], proxy .. ':leased', 1)
+        redis.call('zadd', KEYS[3], expire_at, lease_id .. '|' .. proxy)
+        table.insert(result, proxy)
+        table.insert(result, items[i][2])
+    end
+
+    return result
+"""
+
+# KEYS: 代理池、统计
+# ARGV: 延迟的移动平均系数、基准延迟、最大连续失败次数，之后每5个一组：代理、成功次数、失败次数、末尾的连续失败次数、平均延迟（无则为空字符串）
+# 返回: 被删除的代理
+REPORT_LUA = """
+    local alpha = tonumber(ARGV[1])
+    local latency_base = tonumber(ARGV[2])
+    local max_failed_times = tonumber(ARGV[3])
+
+    local removed = {}
+    for i = 4, #ARGV, 5 do
+        local proxy = ARGV[i]
+        if redis.call('zscore', KEYS[1], proxy) then
+            local success = redis.call('hincrby', KEYS[2], proxy .. ':success', ARGV[i + 1])
+            local failed = redis.call('hincrby', KEYS[2], proxy .. ':failed', ARGV[i + 2])
+
+            -- 有成功时连续失败次数为本批末尾的连续失败次数，否则累加
+            local continuous_failed = tonumber(ARGV[i + 3])
+            if tonumber(ARGV[i + 1]) > 0 then
+                redis.call('hset', KEYS[2], proxy .. ':continuous_failed', continuous_failed)
+            else
+                continuous_failed = redis.call('hincrby', KEYS[2], proxy .. ':continuous_failed', continuous_failed)
+            end
+
+            if max_failed_times > 0 and continuous_failed >= max_failed_times then
+                redis.call('zrem', KEYS[1], proxy)
+                redis.call('hdel', KEYS[2], proxy .. ':success', proxy .. ':failed',
+                    proxy .. ':continuous_failed', proxy .. ':latency', proxy .. ':leased')
+                table.insert(removed, proxy)
+            else
+                local latency = redis.call('hget', KEYS[2], proxy .. ':latency')
+                if ARGV[i + 4] ~= '' then
+                    if latency then
+                        latency = alpha * tonumber(ARGV[i + 4]) + (1 - alpha) * tonumber(latency)
+                    else
+                        latency = tonumber(ARGV[i + 4])
+                    end
+                    redis.call('hset', KEYS[2], proxy .. ':latency', tostring(latency))
+                end
+                latency = tonumber(latency) or latency_base
+
+                local score = (success + 1) / (success + failed + 2) / (1 + latency / latency_base)
+                redis.call('zadd', KEYS[1], tostring(score), proxy)
+            end
+        end
+    end
+
+    return removed
+"""
+
+# KEYS: 代理池
+# ARGV: 初始评分、代理...
+# 返回: 新增的数量，已存在的代理保留原有评分
+ADD_LUA = """
+    local count = 0
+    for i = 2, #ARGV do
+        if not redis.call('zscore', KEYS[1], ARGV[i]) then
+            redis.call('zadd', KEYS[1], ARGV[1], ARGV[i])
+            count = count + 1
+        end
+    end
+    return count
+"""
+
+# KEYS: 代理池、统计
+# ARGV: 代理
+DELETE_LUA = """
+    local proxy = ARGV[1]
+    redis.call('hdel', KEYS[2], proxy .. ':success', proxy .. ':failed',
+        proxy .. ':continuous_failed', proxy .. ':latency', proxy .. ':leased')
+    return redis.call('zrem', KEYS[1], proxy)
+"""
+
+
+class _Report:
+    """
+    本地汇总的代理请求结果
+    """
+
+    __slots__ = ("success_times", "failed_times", "continuous_failed_times", "latencies")
+
+    def __init__(self):
+        self.success_times = 0
+        self.failed_times = 0
+        self.continuous_failed_times = 0
+        self.latencies = []
+
+
+class RedisProxyPool(ProxyPool):
+    """
+    基于redis的分布式代理池，通过API提取代理，多个节点共享
+    """
+
+    def __init__(
+        self,
+        proxy_api=None,
+        redis_key=None,
+        redis_url=None,
+        lease_size=None,
+        lease_time=None,
+        max_leases=None,
+        report_interval=None,
+        min_size=None,
+        ewma_alpha=None,
+        latency_base=None,
+        wait_timeout=None,
+        refill_interval=None,
+        max_failed_times=None,
+        **kwargs,
+    ):
+        """
+        Args:
+            proxy_api: 代理提取API，默认为 setting.PROXY_EXTRACT_API
+            redis_key: 代理池在redis中的key前缀，相同前缀的节点共享代理
+            redis_url: redis连接地址，默认使用setting中的redis配置
+            lease_size: 每次租用的代理数量，缓存在本地
+            lease_time: 租约时长 秒，到期前重新租用；节点异常退出时租约到期自动回收
+            max_leases: 单个代理同时被租用的最大次数，0为不限制
+            report_interval: 上报请求结果的间隔 秒
+            min_size: 代理数量不高于此值时提取代理
+            ewma_alpha: 延迟的指数加权移动平均系数
+            latency_base: 基准延迟 秒，用于计算评分
+            wait_timeout: 无代理时最长等待时间 秒，超时返回None
+            refill_interval: 检查代理数量的间隔 秒
+            max_failed_times: 代理连续失败的最大次数，默认为 setting.PROXY_MAX_FAILED_TIMES
+        """
+        super().__init__(proxy_api=proxy_api, **kwargs)
+
+        proxy_pool_setting = setting.PROXY_POOL_SETTING
+
+        def get_setting(value, key, default):
+            return proxy_pool_setting.get(key, default) if value is None else value
+
+        redis_key = get_setting(redis_key, "redis_key", "feapder")
+        self.lease_size = max(1, get_setting(lease_size, "lease_size", 10))
+        self.lease_time = get_setting(lease_time, "lease_time", 60)
+        self.max_leases = get_setting(max_leases, "max_leases", 0)
+        self.report_interval = get_setting(report_interval, "report_interval", 5)
+        self.min_size = get_setting(min_size, "min_size", 5)
+        self.ewma_alpha = get_setting(ewma_alpha, "ewma_alpha", 0.3)
+        self.latency_base = get_setting(latency_base, "latency_base", 1)
+        self.wait_timeout = get_setting(wait_timeout, "wait_timeout", 10)
+        self.refill_interval = get_setting(refill_interval, "refill_interval", 3)
+        self.max_failed_times = max_failed_times or setting.PROXY_MAX_FAILED_TIMES
+
+        self._tab_proxy_pool = setting.TAB_PROXY_POOL.format(redis_key=redis_key)
+        self._tab_proxy_stats = setting.TAB_PROXY_STATS.format(redis_key=redis_key)
+        self._tab_proxy_lease = setting.TAB_PROXY_LEASE.format(redis_key=redis_key)
+
+        self._redis_url = redis_url
+        self._redisdb = RedisDB(url=redis_url)
+        self._lease_id = uuid.uuid4().hex
+
+        # 本地缓存的租用代理
+        self._proxies = []
+        self._scores = {}
+        self._lease_expire_at = 0
+        self._discarded = set()  # 本地不再使用、待归还的代理
+        self._lock = threading.RLock()
+
+        # 本地汇总的请求结果
+        self._reports = {}
+        self._last_report_time = time.time()
+        self._report_lock = threading.Lock()
+
+        self._refill_event = threading.Event()
+        self._refill_thread = None
+
+    def _start_refill_thread(self):
+        if self._refill_thread is None:
+            with self._lock:
+                if self._refill_thread is None:
+                    self._refill_thread = threading.Thread(
+                        target=self._refill, name="redis_proxy_pool_refill", daemon=True
+                    )
+                    self._refill_thread.start()
+
+    def _refill(self):
+        while True:
+            self._refill_event.wait(self.refill_interval)
+            self._refill_event.clear()
+
+            try:
+                # 空闲的节点也定时上报请求结果
+                if time.time() - self._last_report_time >= self.report_interval:
+                    self.flush_reports()
+
+                if self.proxy_count() > self.min_size:
+                    continue
+
+                with RedisLock(
+                    key=self._tab_proxy_pool,
+                    wait_timeout=0,
+                    lock_timeout=60,
+                    redis_url=self._redis_url,
+                ) as lock:
+                    # 只有一个节点提取代理
+                    if lock.locked and self.proxy_count() <= self.min_size:
+                        self.add_proxies(self.pull_proxies())
+            except Exception as e:
+                log.error(f"提取代理失败: {e}")
+
+    def proxy_count(self):
+        """
+        redis中的代理数量
+        """
+        return self._redisdb.zget_count(self._tab_proxy_pool)
+
+    def add_proxies(self, proxies):
+        """
+        添加代理，已存在的代理保留原有的评分
+        Args:
+            proxies: [ip:port, ...]
+
+        Returns: 新增的数量
+
+        """
+        proxies = [proxy.strip() for proxy in proxies if proxy.strip()]
+        if not proxies:
+            return 0
+
+        # 新代理的评分：成功率0.5，延迟按基准延迟
+        cmd = self._redisdb.register_script(ADD_LUA)
+        count = cmd(keys=[self._tab_proxy_pool], args=[0.25, *proxies])
+        metrics.emit_counter("total", count, classify="proxy")
+        return count
+
+    def _lease(self, count=None):
+        """
+        归还本地缓存的代理，并租用新的一批，需在锁内调用
+        """
+        self.flush_reports()
+
+        now = time.time()
+        cmd = self._redisdb.register_script(LEASE_LUA)
+        result = cmd(
+            keys=[self._tab_proxy_pool, self._tab_proxy_stats, self._tab_proxy_lease],
+            args=[
+                now,
+                now + self.lease_time,
+                self.lease_size if count is None else count,
+                self.max_leases,
+                self._lease_id,
+                *self._proxies,
+                *self._discarded,
+            ],
+        )
+        self._discarded.clear()
+
+        self._proxies = result[0::2]
+        self._scores = {
+            proxy: float(score) for proxy, score in zip(result[0::2], result[1::2])
+        }
+        # 在redis中的租约过期前重新租用
+        self._lease_expire_at = now + self.lease_time * 0.8
+
+    def _discard_local(self, proxies):
+        with self._lock:
+            for proxy in proxies:
+                if proxy in self._scores:
+                    del self._scores[proxy]
+                    self._proxies.remove(proxy)
+                    self._discarded.add(proxy)
+
+    def get_proxy(self):
+        return self.acquire_proxy(self.wait_timeout)
+
+    def acquire_proxy(self, timeout=None):
+        """
+        获取代理，无代理时每秒重新租用一次，直到超时
+        Args:
+            timeout: 最长等待时间 秒，为None时一直等待
+
+        Returns:
+            {"http": "xxx", "https": "xxx"}，超时返回None
+        """
+        self._start_refill_thread()
+
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            with self._lock:
+                if not self._proxies or time.time() >= self._lease_expire_at:
+                    self._lease()
+
+                if self._proxies:
+                    proxy = random.choices(
+                        self._proxies,
+                        weights=[self._scores[proxy] for proxy in self._proxies],
+                    )[0]
+                    break
+
+            self._refill_event.set()
+            if deadline is None:
+                time.sleep(1)
+                continue
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            time.sleep(min(1, remaining))
+
+        metrics.emit_counter("used_times", 1, classify="proxy")
+        return self.format_proxy(proxy)
+
+    def del_proxy(self, proxy):
+        """
+        @summary: 删除代理，所有节点生效
+        ---------
+        @param proxy: ip:port
+        """
+        self._discard_local([proxy])
+        cmd = self._redisdb.register_script(DELETE_LUA)
+        if cmd(keys=[self._tab_proxy_pool, self._tab_proxy_stats], args=[proxy]):
+            metrics.emit_counter("invalid", 1, classify="proxy")
+
+    def report_proxy(self, proxy, success, elapsed=None):
+        """
+        反馈代理的请求结果，本地汇总后定时上报
+        Args:
+            proxy: ip:port
+            success: 是否成功
+            elapsed: 请求耗时 秒
+
+        Returns:
+
+        """
+        if proxy not in self._scores:
+            return
+
+        with self._report_lock:
+            report = self._reports.get(proxy)
+            if not report:
+                report = self._reports[proxy] = _Report()
+
+            if success:
+                report.success_times += 1
+                report.continuous_failed_times = 0
+                if elapsed is not None:
+                    report.latencies.append(elapsed)
+            else:
+                report.failed_times += 1
+                report.continuous_failed_times += 1
+
+            # 本节点连续失败达到上限时，先不再使用，上报后由redis判断是否删除
+            discard = report.continuous_failed_times >= self.max_failed_times
+            need_flush = (
+                time.time() - self._last_report_time >= self.report_interval
+            )
+
+        metrics.emit_counter("success" if success else "failed", 1, classify="proxy")
+
+        if discard:
+            self._discard_local([proxy])
+        if discard or need_flush:
+            self.flush_reports()
+
+    def flush_reports(self):
+        """
+        上报本地汇总的请求结果
+        """
+        with self._report_lock:
+            reports, self._reports = self._reports, {}
+            self._last_report_time = time.time()
+
+        if not reports:
+            return
+
+        args = [self.ewma_alpha, self.latency_base, self.max_failed_times]
+        for proxy, report in reports.items():
+            args.extend(
+                [
+                    proxy,
+                    report.success_times,
+                    report.failed_times,
+                    report.continuous_failed_times,
+                    sum(report.latencies) / len(report.latencies)
+                    if report.latencies
+                    else "",
+                ]
+            )
+
+        try:
+            cmd = self._redisdb.register_script(REPORT_LUA)
+            removed = cmd(
+                keys=[self._tab_proxy_pool, self._tab_proxy_stats], args=args
+            )
+        except Exception as e:
+            log.error(f"上报代理请求结果失败: {e}")
+            return
+
+        if removed:
+            self._discard_local(removed)
+            metrics.emit_counter("invalid", len(removed), classify="proxy")
+
+    def close(self):
+        """
+        上报请求结果并归还租用的代理
+        """
+        with self._lock:
+            self._lease(count=0)
@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: 按健康度评分选择代理的代理池。记录每个代理的成功率、延迟（指数加权移动平均）及连续失败次数，
+    按评分加权选择代理；代理数量低于水位时由后台线程提前提取，取代理时无需等待
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import random
+import threading
+import time
+
+import feapder.setting as setting
+from feapder.network.proxy_pool.proxy_pool import ProxyPool
+from feapder.utils import metrics
+from feapder.utils import tools
+from feapder.utils.log import log
+
+
+class ProxyStat:
+    """
+    代理的健康度统计
+    """
+
+    __slots__ = (
+        "proxy",
+        "index",
+        "used_times",
+        "success_times",
+        "failed_times",
+        "continuous_failed_times",
+        "latency",
+    )
+
+    def __init__(self, proxy, index):
+        self.proxy = proxy
+        self.index = index  # 在代理列表中的下标，用于O(1)删除
+        self.used_times = 0
+        self.success_times = 0
+        self.failed_times = 0
+        self.continuous_failed_times = 0
+        self.latency = None  # 延迟的指数加权移动平均 秒
+
+    def score(self, latency_base):
+        """
+        评分 = 成功率 / (1 + 延迟 / 基准延迟)
+        成功率做了平滑处理，新代理为0.5；无延迟数据时按基准延迟计算
+        """
+        success_rate = (self.success_times + 1) / (
+            self.success_times + self.failed_times + 2
+        )
+        latency = latency_base if self.latency is None else self.latency
+        return success_rate / (1 + latency / latency_base)
+
+    def to_dict(self, latency_base):
+        return {
+            "proxy": self.proxy,
+            "used_times": self.used_times,
+            "success_times": self.success_times,
+            "failed_times": self.failed_times,
+            "continuous_failed_times": self.continuous_failed_times,
+            "latency": self.latency,
+            "score": self.score(latency_base),
+        }
+
+
+class ScoredProxyPool(ProxyPool):
+    """
+    通过API提取代理，按健康度评分选择代理
+    - 每次随机抽取 sample_size 个代理，按评分加权选择其一，取代理的耗时与代理数量无关
+    - 代理连续失败 PROXY_MAX_FAILED_TIMES 次自动删除，删除为O(1)
+    - 代理数量不高于 min_size 时，后台线程提前提取代理
+    """
+
+    def __init__(
+        self,
+        proxy_api=None,
+        min_size=None,
+        sample_size=None,
+        ewma_alpha=None,
+        latency_base=None,
+        wait_timeout=None,
+        refill_interval=None,
+        max_failed_times=None,
+        **kwargs,
+    ):
+        """
+        Args:
+            proxy_api: 代理提取API，默认为 setting.PROXY_EXTRACT_API
+            min_size: 代理数量不高于此值时提前提取代理
+            sample_size: 每次取代理时抽取的候选数量，越大越倾向于评分高的代理
+            ewma_alpha: 延迟的指数加权移动平均系数，越大越偏向最近的延迟
+            latency_base: 基准延迟 秒，用于计算评分
+            wait_timeout: 无代理时最长等待时间 秒，超时返回None
+            refill_interval: 两次提取代理的最小间隔 秒，代理池为空时不受限制
+            max_failed_times: 代理连续失败的最大次数，默认为 setting.PROXY_MAX_FAILED_TIMES
+        """
+        super().__init__(proxy_api=proxy_api, **kwargs)
+
+        proxy_pool_setting = setting.PROXY_POOL_SETTING
+        self.min_size = (
+            proxy_pool_setting.get("min_size", 5) if min_size is None else min_size
+        )
+        self.sample_size = max(
+            1,
+            proxy_pool_setting.get("sample_size", 3)
+            if sample_size is None
+            else sample_size,
+        )
+        self.ewma_alpha = (
+            proxy_pool_setting.get("ewma_alpha", 0.3)
+            if ewma_alpha is None
+            else ewma_alpha
+        )
+        self.latency_base = (
+            proxy_pool_setting.get("latency_base", 1)
+            if latency_base is None
+            else latency_base
+        )
+        self.wait_timeout = (
+            proxy_pool_setting.get("wait_timeout", 10)
+            if wait_timeout is None
+            else wait_timeout
+        )
+        self.refill_interval = (
+            proxy_pool_setting.get("refill_interval", 3)
+            if refill_interval is None
+            else refill_interval
+        )
+        self.max_failed_times = max_failed_times or setting.PROXY_MAX_FAILED_TIMES
+
+        self._proxies = []  # 代理列表，用于O(1)随机抽取
+        self._stats = {}  # proxy: ProxyStat
+
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._refill_event = threading.Event()
+        self._refill_thread = None
+
+    def __len__(self):
+        return len(self._proxies)
+
+    def _start_refill_thread(self):
+        if self._refill_thread is None:
+            with self._lock:
+                if self._refill_thread is None:
+                    self._refill_thread = threading.Thread(
+                        target=self._refill, name="proxy_pool_refill", daemon=True
+                    )
+                    self._refill_thread.start()
+
+    def _refill(self):
+        while True:
+            self._refill_event.wait(self.refill_interval)
+            self._refill_event.clear()
+
+            if len(self._proxies) > self.min_size:
+                continue
+
+            try:
+                proxies = self.pull_proxies()
+            except Exception as e:
+                log.error(f"提取代理失败: {e}")
+                tools.send_msg("获取代理失败", level="error")
+            else:
+                self.add_proxies(proxies)
+
+            if self._proxies:
+                # 提取到的代理少于 min_size 时，避免频繁调用API
+                time.sleep(self.refill_interval)
+
+    def add_proxies(self, proxies):
+        """
+        添加代理，已存在的代理保留原有的统计
+        Args:
+            proxies: [ip:port, ...]
+
+        Returns: 新增的数量
+
+        """
+        count = 0
+        with self._lock:
+            for proxy in proxies:
+                proxy = proxy.strip()
+                if not proxy or proxy in self._stats:
+                    continue
+                self._stats[proxy] = ProxyStat(proxy, len(self._proxies))
+                self._proxies.append(proxy)
+                count += 1
+
+            if count:
+                self._not_empty.notify_all()
+
+        metrics.emit_counter("total", count, classify="proxy")
+        return count
+
+    def _remove(self, proxy):
+        """
+        删除代理，需在锁内调用。与列表最后一个元素交换后删除，O(1)
+        """
+        stat = self._stats.pop(proxy, None)
+        if not stat:
+            return False
+
+        last_proxy = self._proxies.pop()
+        if last_proxy != proxy:
+            self._proxies[stat.index] = last_proxy
+            self._stats[last_proxy].index = stat.index
+
+        if len(self._proxies) <= self.min_size:
+            self._refill_event.set()
+        return True
+
+    def get_proxy(self):
+        return self.acquire_proxy(self.wait_timeout)
+
+    def acquire_proxy(self, timeout=None):
+        """
+        获取代理，无代理时等待后台提取，提取到代理后立即唤醒
+        Args:
+            timeout: 最长等待时间 秒，为None时一直等待
+
+        Returns:
+            {"http": "xxx", "https": "xxx"}，超时返回None
+        """
+        self._start_refill_thread()
+
+        with self._lock:
+            if len(self._proxies) <= self.min_size:
+                self._refill_event.set()
+
+            if not self._proxies:
+                self._not_empty.wait_for(lambda: self._proxies, timeout)
+                if not self._proxies:
+                    return None
+
+            candidates = [
+                self._stats[proxy]
+                for proxy in random.sample(
+                    self._proxies, min(self.sample_size, len(self._proxies))
+                )
+            ]
+            if len(candidates) == 1:
+                stat = candidates[0]
+            else:
+                stat = random.choices(
+                    candidates,
+                    weights=[
+                        candidate.score(self.latency_base) for candidate in candidates
+                    ],
+                )[0]
+            stat.used_times += 1
+
+        metrics.emit_counter("used_times", 1, classify="proxy")
+        return self.format_proxy(stat.proxy)
+
+    def del_proxy(self, proxy):
+        """
+        @summary: 删除代理
+        ---------
+        @param proxy: ip:port
+        """
+        with self._lock:
+            removed = self._remove(proxy)
+
+        if removed:
+            metrics.emit_counter("invalid", 1, classify="proxy")
+
+    def report_proxy(self, proxy, success, elapsed=None):
+        """
+        反馈代理的请求结果，更新健康度。连续失败 max_failed_times 次时删除代理
+        Args:
+            proxy: ip:port
+            success: 是否成功
+            elapsed: 请求耗时 秒
+
+        Returns:
+
+        """
+        removed = False
+        with self._lock:
+            stat = self._stats.get(proxy)
+            if not stat:
+                return
+
+            if success:
+                stat.success_times += 1
+                stat.continuous_failed_times = 0
+                if elapsed is not None:
+                    stat.latency = (
+                        elapsed
+                        if stat.latency is None
+                        else self.ewma_alpha * elapsed
+                        + (1 - self.ewma_alpha) * stat.latency
+                    )
+            else:
+                stat.failed_times += 1
+                stat.continuous_failed_times += 1
+                if stat.continuous_failed_times >= self.max_failed_times:
+                    removed = self._remove(proxy)
+
+        metrics.emit_counter(
+            "success" if success else "failed", 1, classify="proxy"
+        )
+        if removed:
+            metrics.emit_counter("invalid", 1, classify="proxy")
+
+    def proxy_stats(self):
+        """
+        各代理的健康度，按评分从高到低排序
+        """
+        with self._lock:
+            stats = [
+                self._stats[proxy].to_dict(self.latency_base) for proxy in self._proxies
+            ]
+        return sorted(stats, key=lambda stat: stat["score"], reverse=True)
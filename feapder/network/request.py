@@ -11,6 +11,8 @@ Created on 2018-07-25 11:49:08
 import copy
 import os
 import re
+import threading
+import time
 
 import requests
 from requests.cookies import RequestsCookieJar
@@ -19,10 +21,13 @@ from requests.packages.urllib3.exceptions import InsecureRequestWarning
 import feapder.setting as setting
 import feapder.utils.tools as tools
 from feapder.db.redisdb import RedisDB
-from feapder.network import user_agent
+from feapder.network import content_encoding, user_agent
 from feapder.network.downloader.base import Downloader, RenderDownloader
-from feapder.network.proxy_pool import BaseProxyPool
+from feapder.network.proxy_pool import BaseProxyPool, ProxyUnavailableError
 from feapder.network.response import Response
+from feapder.network.response_cache import BaseResponseCache, HttpCache
+from feapder.network.session_pool import SessionIdentity, SessionPool
+from feapder.utils import metrics
 from feapder.utils.log import log
 
 # 屏蔽warning信息
@@ -32,10 +37,13 @@ requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 class Request:
     user_agent_pool = user_agent
     proxies_pool: BaseProxyPool = None
+    session_pool: SessionPool = None  # 会话池，见 session_key
 
     cache_db = None  # redis / pika
+    response_cache: BaseResponseCache = None  # 缓存存储，见 setting.RESPONSE_CACHE
     cached_redis_key = None  # 缓存response的文件文件夹 response_cached:cached_redis_key:md5
     cached_expire_time = 1200  # 缓存过期时间
+    http_cache: HttpCache = None  # 条件请求缓存，见 setting.HTTP_CACHE_ENABLE
 
     # 下载器
     downloader: Downloader = None
@@ -78,14 +86,33 @@ class Request:
         render=False,
         render_time=0,
         make_absolute_links=None,
+        stream_to=None,
+        max_body_size=None,
+        session_key=None,
     )
 
     _CUSTOM_PROPERTIES_ = {
         "requests_kwargs",
         "custom_ua",
         "custom_proxies",
+        "session_identity",
+        "correlation_id",
     }
 
+    # 框架参数及自定义属性存于slots，requests参数及其他属性（如 Request(item=item)）存于 _attrs
+    # 内存队列中常驻大量request，不为每个request创建 __dict__
+    __slots__ = (
+        *_DEFAULT_KEY_VALUE_,
+        "_requests_kwargs",
+        "custom_ua",
+        "custom_proxies",
+        "session_identity",
+        "correlation_id",
+        "_attrs",
+        "_attrs_refs",  # [共享 _attrs 的request数, 锁]，写时复制，见 copy()
+    )
+    _SLOT_ATTRS_ = {*__slots__, "requests_kwargs"}
+
     def __init__(
         self,
         url="",
@@ -103,6 +130,9 @@ class Request:
         render=False,
         render_time=0,
         make_absolute_links=None,
+        stream_to=None,
+        max_body_size=None,
+        session_key=None,
         **kwargs,
     ):
         """
@@ -123,7 +153,10 @@ class Request:
         @param is_abandoned: 当发生异常时是否放弃重试 True/False. 默认False
         @param render: 是否用浏览器渲染
         @param render_time: 渲染时长，即打开网页等待指定时间后再获取源码
-        @param make_absolute_links: 是否转成绝对连接，默认是
+        @param make_absolute_links: 是否转成绝对连接，默认是. 可设置为"lazy"，仅在xpath/css提取href、src及re匹配时补全
+        @param stream_to: 响应体下载到的文件路径，边下载边写入，不占用内存。可通过 response.content_path、response.content_mmap() 访问
+        @param max_body_size: 响应体最大字节数（压缩的响应体按解压后计算），超过时中止下载且不再重试。默认为setting.RESPONSE_MAX_BODY_SIZE
+        @param session_key: 会话标识，相同session_key的请求使用同一组代理、User-Agent、cookie及HTTP连接，见setting.SESSION_POOL_SETTING
         --
         以下参数与requests参数使用方式一致
         @param method: 请求方式，如POST或GET，默认根据data值是否为空来判断
@@ -146,6 +179,10 @@ class Request:
         @result:
         """
 
+        self._attrs = None
+        self._attrs_refs = None
+        self._requests_kwargs = None  # 使用时再生成
+
         self.url = url
         self.method = None
         self.retry_times = retry_times
@@ -166,17 +203,19 @@ class Request:
             if make_absolute_links is not None
             else setting.MAKE_ABSOLUTE_LINKS
         )
+        self.stream_to = stream_to
+        self.max_body_size = max_body_size
+        self.session_key = session_key
 
-        # 自定义属性，不参与序列化
-        self.requests_kwargs = {}
-        for key, value in kwargs.items():
-            if key in self.__class__.__REQUEST_ATTRS__:  # 取requests参数
-                self.requests_kwargs[key] = value
-
-            self.__dict__[key] = value
+        # requests参数及其他属性
+        if kwargs:
+            self._attrs = kwargs
 
+        # 自定义属性，不参与序列化
         self.custom_ua = False
         self.custom_proxies = False
+        self.session_identity: SessionIdentity = None
+        self.correlation_id = None  # 日志的关联id，串联从取出到数据入库的日志
 
     def __repr__(self):
         try:
@@ -191,16 +230,124 @@ class Request:
         @param value:
         @return:
         """
-        self.__dict__[key] = value
+        if key in self.__class__._SLOT_ATTRS_:
+            object.__setattr__(self, key, value)
+            return
+
+        self._own_attrs()[key] = value
+        if (
+            key in self.__class__.__REQUEST_ATTRS__
+            and self._requests_kwargs is not None
+        ):
+            self._requests_kwargs[key] = value
+
+    def __getattr__(self, item):
+        # 实例及类中无此属性时调用，取requests参数及其他属性
+        if item.startswith("__"):
+            # copy、pickle 等探测的特殊方法
+            raise AttributeError(item)
+
+        attrs = object.__getattribute__(self, "_attrs")
+        if attrs and item in attrs:
+            if self._attrs_refs is not None:
+                # 取出的值可能被修改，与拷贝共享时先复制
+                attrs = self._own_attrs()
+            return attrs[item]
+
+        raise AttributeError("Request has no attribute %s" % item)
+
+    def __copy__(self):
+        """
+        copy.copy(request)：保留所有属性，_attrs 与原request写时复制，任一方修改不影响另一方
+        """
+        request = self.__class__.__new__(self.__class__)
+        for key in self.__class__.__slots__:
+            object.__setattr__(request, key, getattr(self, key))
+
+        self._share_attrs(request)
+        if self._requests_kwargs is not None:
+            object.__setattr__(request, "_requests_kwargs", dict(self._requests_kwargs))
+        return request
+
+    def __getstate__(self):
+        state = {key: getattr(self, key) for key in Request.__slots__}
+        state["_attrs_refs"] = None  # 反序列化后不再与其他request共享
+        return state
+
+    def __setstate__(self, state):
+        for key, value in state.items():
+            object.__setattr__(self, key, value)
+
+    def _share_attrs(self, request):
+        """
+        拷贝的request与本request共享 _attrs，任一方修改时才复制
+        """
+        if not self._attrs:
+            object.__setattr__(request, "_attrs", None)
+            object.__setattr__(request, "_attrs_refs", None)
+            return
+
+        if self._attrs_refs is None:
+            self._attrs_refs = [1, threading.Lock()]
+        with self._attrs_refs[1]:
+            self._attrs_refs[0] += 1
+        object.__setattr__(request, "_attrs", self._attrs)
+        object.__setattr__(request, "_attrs_refs", self._attrs_refs)
+
+    def _own_attrs(self):
+        """
+        写时复制：与拷贝共享的 _attrs，修改前先复制一份
+        Returns: 本request独有的 _attrs
+        """
+        attrs_refs = self._attrs_refs
+        if attrs_refs is not None:
+            shared_attrs = self._attrs
+            attrs = None
+            with attrs_refs[1]:
+                # 复制完再减少共享数，否则其他线程中的拷贝会认为已独有，在复制过程中修改
+                if attrs_refs[0] > 1:
+                    attrs = copy.deepcopy(shared_attrs)
+                    attrs_refs[0] -= 1
+
+            if attrs is not None:
+                self._attrs = attrs
+                if self._requests_kwargs:
+                    # 已生成的requests参数中引用的共享对象，一并替换
+                    for key, value in self._requests_kwargs.items():
+                        if key in shared_attrs and shared_attrs[key] is value:
+                            self._requests_kwargs[key] = attrs[key]
+            self._attrs_refs = None
+
+        if self._attrs is None:
+            self._attrs = {}
+
+        return self._attrs
+
+    @property
+    def requests_kwargs(self):
+        """
+        requests的参数，首次使用时由requests参数生成
+        """
+        if self._attrs_refs is not None:
+            self._own_attrs()
+
+        if self._requests_kwargs is None:
+            attrs = self._attrs
+            self._requests_kwargs = (
+                {
+                    key: value
+                    for key, value in attrs.items()
+                    if key in self.__class__.__REQUEST_ATTRS__
+                }
+                if attrs
+                else {}
+            )
 
-        if key in self.__class__.__REQUEST_ATTRS__:
-            self.requests_kwargs[key] = value
+        return self._requests_kwargs
 
-    # def __getattr__(self, item):
-    #     try:
-    #         return self.__dict__[item]
-    #     except:
-    #         raise AttributeError("Request has no attribute %s" % item)
+    @requests_kwargs.setter
+    def requests_kwargs(self, requests_kwargs):
+        self._requests_kwargs = requests_kwargs
 
     def __lt__(self, other):
         return self.priority < other.priority
@@ -212,6 +359,13 @@ class Request:
 
         return self.__class__.proxies_pool
 
+    @property
+    def _session_pool(self):
+        if not self.__class__.session_pool:
+            self.__class__.session_pool = SessionPool(self.__class__.user_agent_pool)
+
+        return self.__class__.session_pool
+
     @property
     def _downloader(self):
         if not self.__class__.downloader:
@@ -267,14 +421,16 @@ class Request:
                 else self.download_midware
             )
 
-        for key, value in self.__dict__.items():
-            if (
-                key in self.__class__._DEFAULT_KEY_VALUE_
-                and self.__class__._DEFAULT_KEY_VALUE_.get(key) == value
-                or key in self.__class__._CUSTOM_PROPERTIES_
-            ):
-                continue
+        # 框架参数，默认值不序列化
+        for key, default_value in self.__class__._DEFAULT_KEY_VALUE_.items():
+            value = getattr(self, key)
+            if value != default_value:
+                if value is not None and not isinstance(value, (bool, float, int, str)):
+                    value = tools.dumps_obj(value)
+                request_dict[key] = value
 
+        # requests参数及其他属性
+        for key, value in (self._attrs or {}).items():
             if value is not None:
                 if key in self.__class__.__REQUEST_ATTRS__:
                     if not isinstance(
@@ -316,7 +472,7 @@ class Request:
         self.requests_kwargs.setdefault("verify", False)
 
         # 设置请求方法
-        method = self.__dict__.get("method")
+        method = self.method
         if not method:
             if "data" in self.requests_kwargs or "json" in self.requests_kwargs:
                 method = "POST"
@@ -324,10 +480,18 @@ class Request:
                 method = "GET"
         self.method = method
 
+        # 会话
+        if self.session_key is not None and not self.render:
+            self.session_identity = self._session_pool.get(self.session_key)
+
         # 设置user—agent
         headers = self.requests_kwargs.get("headers", {})
         if "user-agent" not in headers and "User-Agent" not in headers:
-            if self.random_user_agent and setting.RANDOM_HEADERS:
+            if self.session_identity:
+                # 使用会话固定的user—agent
+                headers.update({"User-Agent": self.session_identity.user_agent})
+                self.requests_kwargs.update(headers=headers)
+            elif self.random_user_agent and setting.RANDOM_HEADERS:
                 # 随机user—agent
                 ua = self.__class__.user_agent_pool.get(setting.USER_AGENT_TYPE)
                 headers.update({"User-Agent": ua})
@@ -340,19 +504,49 @@ class Request:
         else:
             self.custom_ua = True
 
+        # 协商压缩方式
+        if setting.ACCEPT_ENCODING_NEGOTIATE:
+            headers = self.requests_kwargs.get("headers") or {}
+            if not any(key.lower() == "accept-encoding" for key in headers):
+                self.requests_kwargs["headers"] = {
+                    **headers,
+                    "Accept-Encoding": content_encoding.ACCEPT_ENCODING,
+                }
+
         # 代理
         proxies = self.requests_kwargs.get("proxies", -1)
         if proxies == -1 and setting.PROXY_ENABLE and setting.PROXY_EXTRACT_API:
-            while True:
-                proxies = self._proxies_pool.get_proxy()
-                if proxies:
-                    self.requests_kwargs.update(proxies=proxies)
-                    break
-                else:
-                    log.debug("暂无可用代理 ...")
+            if self.session_identity:
+                # 使用会话固定的代理，会话首次请求时获取
+                with self.session_identity.lock:
+                    if not self.session_identity.proxies:
+                        self.session_identity.proxies = self.acquire_proxies()
+                    proxies = self.session_identity.proxies
+            else:
+                proxies = self.acquire_proxies()
+            self.requests_kwargs.update(proxies=proxies)
         else:
             self.custom_proxies = True
 
+    def acquire_proxies(self):
+        """
+        从代理池获取代理，最多等待 setting.PROXY_ACQUIRE_TIMEOUT 秒
+        Returns: {"https": "https://ip:port", "http": "http://ip:port"}
+        """
+        start_time = time.time()
+        proxies = self._proxies_pool.acquire_proxy(
+            timeout=setting.PROXY_ACQUIRE_TIMEOUT
+        )
+        wait_time = time.time() - start_time
+        if wait_time > 0.01:
+            # 等待代理的耗时，无需等待时不打点
+            metrics.emit_timer("acquire_wait", wait_time, classify="proxy")
+
+        if not proxies:
+            metrics.emit_counter("acquire_timeout", 1, classify="proxy")
+            raise ProxyUnavailableError(setting.PROXY_ACQUIRE_TIMEOUT)
+        return proxies
+
     def get_response(self, save_cached=False):
         """
         获取带有selector功能的response
@@ -361,32 +555,21 @@ class Request:
         """
         self.make_requests_kwargs()
 
-        log.debug(
-            """
-                -------------- %srequest for ----------------
-                url  = %s
-                method = %s
-                args = %s
+        if log.is_debug():  # debug未开启时不拼接日志，省去格式化requests_kwargs的开销
+            log.debug(
                 """
-            % (
-                ""
-                if not self.parser_name
-                else "%s.%s "
-                % (
-                    self.parser_name,
-                    (
-                        self.callback
-                        and callable(self.callback)
-                        and getattr(self.callback, "__name__")
-                        or self.callback
-                    )
-                    or "parse",
-                ),
+                    -------------- %srequest for ----------------
+                    url  = %s
+                    method = %s
+                    args = %s
+                    """,
+                "%s.%s " % (self.parser_name, self.callback_name or "parse")
+                if self.parser_name
+                else "",
                 self.url,
                 self.method,
                 self.requests_kwargs,
             )
-        )
 
         # def hooks(response, *args, **kwargs):
         #     print(response.url)
@@ -398,13 +581,20 @@ class Request:
             setting.USE_SESSION if self.use_session is None else self.use_session
         )
 
+        # 条件请求缓存，带上 If-None-Match / If-Modified-Since
+        http_cache = self._http_cache if setting.HTTP_CACHE_ENABLE and not self.render else None
+        cached_response = http_cache.prepare(self) if http_cache else None
+
         if self.render:
             response = self._render_downloader.download(self)
-        elif use_session:
+        elif use_session or self.session_identity:
             response = self._session_downloader.download(self)
         else:
             response = self._downloader.download(self)
 
+        if http_cache:
+            response = http_cache.process_response(self, response, cached_response)
+
         response.make_absolute_links = self.make_absolute_links
 
         if save_cached:
@@ -436,11 +626,35 @@ class Request:
             )
 
     def del_proxy(self):
+        proxies = self.get_proxies()
         proxy = self.get_proxy()
         if proxy:
             self._proxies_pool.del_proxy(proxy)
             del self.requests_kwargs["proxies"]
 
+            if self.session_identity:
+                # 会话下次请求时换用新的代理
+                with self.session_identity.lock:
+                    if self.session_identity.proxies == proxies:
+                        self.session_identity.proxies = None
+
+    def report_proxy(self, success, response=None):
+        """
+        向代理池反馈代理的请求结果
+        Args:
+            success: 是否成功
+            response: 成功时的response，用于统计代理的延迟
+
+        Returns:
+
+        """
+        proxy = self.get_proxy()
+        if proxy:
+            elapsed = getattr(response, "elapsed", None)
+            self._proxies_pool.report_proxy(
+                proxy, success, elapsed.total_seconds() if elapsed else None
+            )
+
     def get_headers(self) -> dict:
         return self.requests_kwargs.get("headers", {})
 
@@ -468,7 +682,7 @@ class Request:
         request唯一表识
         @return:
         """
-        url = self.__dict__.get("url", "")
+        url = self.url
         # url 归一化
         url = tools.canonicalize_url(url)
         args = [url]
@@ -486,6 +700,20 @@ class Request:
 
         return self.__class__.cache_db
 
+    @property
+    def _response_cache(self):
+        if not self.__class__.response_cache:
+            self.__class__.response_cache = tools.import_cls(setting.RESPONSE_CACHE)()
+
+        return self.__class__.response_cache
+
+    @property
+    def _http_cache(self):
+        if not self.__class__.http_cache:
+            self.__class__.http_cache = HttpCache()
+
+        return self.__class__.http_cache
+
     @property
     def _cached_redis_key(self):
         if self.__class__.cached_redis_key:
@@ -497,13 +725,13 @@ class Request:
 
     def save_cached(self, response, expire_time=1200):
         """
-        使用redis保存response 用于调试 不用每回都下载
+        保存response 用于调试 不用每回都下载。存储方式见 setting.RESPONSE_CACHE
         @param response:
         @param expire_time: 过期时间
         @return:
         """
 
-        self._cache_db.strset(self._cached_redis_key, response.to_dict, ex=expire_time)
+        self._response_cache.set(self._cached_redis_key, response, expire_time)
 
     def get_response_from_cached(self, save_cached=True):
         """
@@ -519,17 +747,14 @@ class Request:
         @param: save_cached 当无缓存 直接下载 下载完是否保存缓存
         @return:
         """
-        response_dict = self._cache_db.strget(self._cached_redis_key)
-        if not response_dict:
+        response_obj = self._response_cache.get(self._cached_redis_key)
+        if not response_obj:
             log.info("无response缓存  重新下载")
             response_obj = self.get_response(save_cached=save_cached)
-        else:
-            response_dict = eval(response_dict)
-            response_obj = Response.from_dict(response_dict)
         return response_obj
 
     def del_response_cached(self):
-        self._cache_db.clear(self._cached_redis_key)
+        self._response_cache.delete(self._cached_redis_key)
 
     @classmethod
     def from_dict(cls, request_dict):
@@ -540,4 +765,18 @@ class Request:
         return cls(**request_dict)
 
     def copy(self):
-        return self.__class__.from_dict(copy.deepcopy(self.to_dict))
+        """
+        拷贝request。requests参数及其他属性与原request共享，任一方修改时才复制（写时复制）
+        会话、关联id等运行时属性不拷贝，拷贝的request使用时重新生成requests参数
+        """
+        request = self.__class__.__new__(self.__class__)
+        for key in self.__class__._DEFAULT_KEY_VALUE_:
+            object.__setattr__(request, key, getattr(self, key))
+
+        self._share_attrs(request)
+        object.__setattr__(request, "_requests_kwargs", None)
+        object.__setattr__(request, "custom_ua", False)
+        object.__setattr__(request, "custom_proxies", False)
+        object.__setattr__(request, "session_identity", None)
+        object.__setattr__(request, "correlation_id", None)
+        return request
@@ -9,32 +9,56 @@ Created on 2018-07-26 11:40:28
 """
 
 import datetime
+import mmap
 import os
 import re
 import tempfile
 import webbrowser
-from urllib.parse import urlparse, urlunparse, urljoin
 
 from bs4 import UnicodeDammit, BeautifulSoup
 from requests.cookies import RequestsCookieJar
+from requests.exceptions import ChunkedEncodingError, ContentDecodingError
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import SSLError as RequestsSSLError
 from requests.models import Response as res
+from requests.structures import CaseInsensitiveDict
+from requests.utils import stream_decode_response_unicode
+from urllib3.exceptions import ProtocolError, ReadTimeoutError, SSLError
 from w3lib.encoding import http_content_type_encoding, html_body_declared_encoding
 
 from feapder import setting
-from feapder.network.selector import Selector
-from feapder.utils.log import log
+from feapder.network import content_encoding
+from feapder.network.encoding import can_decode, detect_encoding
+from feapder.network.selector import (
+    Selector,
+    absolute_links,
+    clean_html,
+    clean_html_body,
+    is_utf8,
+    make_absolute_link,
+)
+from feapder.utils import fast_json
 
 FAIL_ENCODING = "ISO-8859-1"
 
-# html 源码中的特殊字符，需要删掉，否则会影响etree的构建
-SPECIAL_CHARACTERS = [
-    # 移除控制字符 全部字符列表 https://zh.wikipedia.org/wiki/%E6%8E%A7%E5%88%B6%E5%AD%97%E7%AC%A6
-    "[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F]"
-]
+# 流式读取响应体时每次读取的字节数
+STREAM_CHUNK_SIZE = 64 * 1024
 
-SPECIAL_CHARACTER_PATTERNS = [
-    re.compile(special_character) for special_character in SPECIAL_CHARACTERS
-]
+
+class ResponseTooLargeError(Exception):
+    """
+    响应体超过大小限制，已中止下载
+    """
+
+    def __init__(self, url, max_body_size, size=None):
+        self.url = url
+        self.max_body_size = max_body_size
+        self.size = size
+        super().__init__(
+            "响应体超过大小限制 {}字节{}, 已中止下载: {}".format(
+                max_body_size, f", Content-Length: {size}" if size else "", url
+            )
+        )
 
 
 class Response(res):
@@ -43,7 +67,8 @@ class Response(res):
 
         Args:
             response: requests请求返回的response
-            make_absolute_links: 是否自动补全url
+            make_absolute_links: 是否自动补全url。True: 获取text时整篇补全（兼容模式）；
+                "lazy": 仅在 xpath/css 提取 href、src 及 re 匹配时补全
         """
         super(Response, self).__init__()
         self.__dict__.update(response.__dict__)
@@ -60,6 +85,14 @@ class Response(res):
 
         self._encoding = None
 
+        # 流式下载到文件时，响应体所在的文件路径
+        self.content_path = None
+        # 压缩的响应体及压缩方式，访问content时才解压
+        self._encoded_content = None
+        self._content_encodings = None
+        # 条件请求时页面未修改(304)，为缓存的页面
+        self.not_modified = False
+
         self.encoding_errors = "strict"  # strict / replace / ignore
         self.browser = self.driver = None
 
@@ -93,19 +126,40 @@ class Response(res):
         cookie_jar = RequestsCookieJar()
         cookie_jar.update(other=response_dict["cookies"])
         response_dict["cookies"] = cookie_jar
+        response_dict["headers"] = CaseInsensitiveDict(response_dict["headers"])
 
         response_dict["elapsed"] = datetime.timedelta(
             0, 0, response_dict["elapsed"]
         )  # 耗时
         response_dict["connection"] = None
         response_dict["_content_consumed"] = True
+        encodings = response_dict.pop("_content_encodings", None)
 
         response = res()
         response.__dict__.update(response_dict)
-        return cls(response)
+        response = cls(response)
+        if encodings:
+            # 压缩的响应体，访问content时才解压
+            response._encoded_content = response._content
+            response._content_encodings = encodings
+            response._content = False
+        return response
 
     @property
     def to_dict(self):
+        if self._encoded_content is not None:
+            # 未解压过的响应体保持压缩存储
+            return {
+                "_content": self._encoded_content,
+                "_content_encodings": self._content_encodings,
+                "cookies": self.cookies.get_dict(),
+                "encoding": self._encoding or self._headers_encoding(),
+                "headers": self.headers,
+                "status_code": self.status_code,
+                "elapsed": self.elapsed.microseconds,  # 耗时
+                "url": self.url,
+            }
+
         response_dict = {
             "_content": self.content,
             "cookies": self.cookies.get_dict(),
@@ -132,6 +186,7 @@ class Response(res):
             self._encoding
             or self._headers_encoding()
             or self._body_declared_encoding()
+            or self._detect_encoding()
             or self.apparent_encoding
         )
         return self._encoding
@@ -164,10 +219,24 @@ class Response(res):
 
         return html_body_declared_encoding(self.content)
 
+    def _detect_encoding(self):
+        """
+        根据content猜测编码：BOM > UTF-8校验 > 同域名缓存 > 统计探测（只看前64KB及末尾64KB）
+        """
+        return detect_encoding(self.content, self.url)
+
     def _get_unicode_html(self, html):
         if not html or not isinstance(html, bytes):
             return html
 
+        # 先用快速探测的编码解码，失败再用 UnicodeDammit 逐个尝试
+        encoding = detect_encoding(html, self.url)
+        if encoding:
+            try:
+                return str(html, encoding)
+            except (UnicodeDecodeError, LookupError):
+                pass
+
         converted = UnicodeDammit(html, is_html=True)
         if not converted.unicode_markup:
             raise Exception(
@@ -180,65 +249,24 @@ class Response(res):
 
     def _make_absolute(self, link):
         """Makes a given link absolute."""
-        try:
-
-            link = link.strip()
-
-            # Parse the link with stdlib.
-            parsed = urlparse(link)._asdict()
-
-            # If link is relative, then join it with base_url.
-            if not parsed["netloc"]:
-                return urljoin(self.url, link)
-
-            # Link is absolute; if it lacks a scheme, add one from base_url.
-            if not parsed["scheme"]:
-                parsed["scheme"] = urlparse(self.url).scheme
-
-                # Reconstruct the URL to incorporate the new scheme.
-                parsed = (v for v in parsed.values())
-                return urlunparse(parsed)
-
-        except Exception as e:
-            log.error(
-                "Invalid URL <{}> can't make absolute_link. exception: {}".format(
-                    link, e
-                )
-            )
-
-        # Link is absolute and complete with scheme; nothing to be done here.
-        return link
+        return make_absolute_link(link, self.url)
 
     def _absolute_links(self, text):
-        regexs = [
-            r'(<a.*?href\s*?=\s*?["\'])(.+?)(["\'])',  # a
-            r'(<img.*?src\s*?=\s*?["\'])(.+?)(["\'])',  # img
-            r'(<link.*?href\s*?=\s*?["\'])(.+?)(["\'])',  # css
-            r'(<script.*?src\s*?=\s*?["\'])(.+?)(["\'])',  # js
-        ]
-
-        for regex in regexs:
-
-            def replace_href(text):
-                # html = text.group(0)
-                link = text.group(2)
-                absolute_link = self._make_absolute(link)
-
-                # return re.sub(regex, r'\1{}\3'.format(absolute_link), html) # 使用正则替换，个别字符不支持。如该网址源代码http://permit.mep.gov.cn/permitExt/syssb/xxgk/xxgk!showImage.action?dataid=0b092f8115ff45c5a50947cdea537726
-                return text.group(1) + absolute_link + text.group(3)
+        return absolute_links(text, self.url)
 
-            text = re.sub(regex, replace_href, text, flags=re.S | re.I)
+    @property
+    def _is_lazy_absolute_links(self):
+        return self.make_absolute_links == "lazy"
 
-        return text
+    @property
+    def _is_eager_absolute_links(self):
+        return bool(self.make_absolute_links) and not self._is_lazy_absolute_links
 
     def _del_special_character(self, text):
         """
-        删除特殊字符
+        删除特殊字符。&nbsp; 需保留在text中，由Selector构建时处理
         """
-        for special_character_pattern in SPECIAL_CHARACTER_PATTERNS:
-            text = special_character_pattern.sub("", text)
-
-        return text
+        return clean_html(text, replace_nbsp=False)
 
     @property
     def __text(self):
@@ -282,7 +310,7 @@ class Response(res):
                 self._cached_text = self._get_unicode_html(self.content)
 
             if self._cached_text:
-                if self.make_absolute_links:
+                if self._is_eager_absolute_links:
                     self._cached_text = self._absolute_links(self._cached_text)
                 self._cached_text = self._del_special_character(self._cached_text)
 
@@ -291,24 +319,184 @@ class Response(res):
     @text.setter
     def text(self, html):
         self._cached_text = html
-        if self.make_absolute_links:
+        if self._is_eager_absolute_links:
             self._cached_text = self._absolute_links(self._cached_text)
         self._cached_text = self._del_special_character(self._cached_text)
-        self._cached_selector = Selector(self.text)
+        self._cached_selector = self._make_selector()
 
     @property
     def json(self, **kwargs):
         if self._cached_json is None:
             self.encoding = self.encoding or "utf-8"
-            self._cached_json = super(Response, self).json(**kwargs)
+            if self._can_loads_from_content():
+                try:
+                    # 直接解析content，跳过解码为text，有 orjson 时更快
+                    self._cached_json = fast_json.loads(
+                        clean_html_body(self.content, replace_nbsp=False)
+                    )
+                except Exception:
+                    pass
+
+            if self._cached_json is None:
+                self._cached_json = super(Response, self).json(**kwargs)
 
         return self._cached_json
 
     @property
     def content(self):
+        if self._content is False and self.content_path:
+            # 响应体在文件中，访问时才读入内存
+            with open(self.content_path, "rb") as file:
+                self._content = file.read()
+
+        elif self._content is False and self._encoded_content is not None:
+            try:
+                self._content = content_encoding.decompress(
+                    self._encoded_content, self._content_encodings
+                )
+            except Exception as e:
+                raise ContentDecodingError(
+                    f"解压响应体失败, Content-Encoding: {self._content_encodings}, error: {e}"
+                )
+            self._encoded_content = None
+
         content = super(Response, self).content
         return content
 
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        """
+        同 requests，响应体已由 read_body 读取（保留压缩或写入文件）时，从解压后的content或文件中按块返回
+        """
+        if self._content is False and self._encoded_content is not None:
+            self.content
+
+        elif self._content is False and self.content_path:
+            chunks = self._iter_file_content(chunk_size or STREAM_CHUNK_SIZE)
+            if decode_unicode:
+                chunks = stream_decode_response_unicode(chunks, self)
+            return chunks
+
+        return super(Response, self).iter_content(
+            chunk_size=chunk_size, decode_unicode=decode_unicode
+        )
+
+    def _iter_file_content(self, chunk_size):
+        with open(self.content_path, "rb") as file:
+            while True:
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def content_mmap(self):
+        """
+        以内存映射的方式打开响应体文件，不将整个文件读入内存，仅流式下载到文件时可用
+        用完需调用 close()
+        Returns: mmap.mmap，只读
+        """
+        if not self.content_path:
+            raise ValueError("响应体未下载到文件，请使用 Request(stream_to=文件路径)")
+
+        with open(self.content_path, "rb") as file:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def read_body(self, stream_to=None, max_body_size=0, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        流式读取响应体，需在请求时设置 stream=True（feapder默认）
+        Args:
+            stream_to: 文件路径。指定时响应体边下载边写入文件，不占用内存，通过 content_path、content_mmap() 访问
+            max_body_size: 响应体解压后的最大字节数，超过时中止下载并抛出 ResponseTooLargeError，0为不限制。
+                指定时压缩的响应体边下载边解压，不再延迟到访问content时
+            chunk_size: 每次读取的字节数
+
+        Returns:
+
+        """
+        if max_body_size:
+            content_length = self.headers.get("Content-Length", "")
+            if content_length.isdigit() and int(content_length) > max_body_size:
+                self.close()
+                raise ResponseTooLargeError(self.url, max_body_size, int(content_length))
+
+        encodings = None
+        if self._content is not False:
+            # 已读取过
+            chunks = [self._content or b""]
+        else:
+            # 自行解压，以便保留压缩的响应体，且支持 urllib3 不支持的压缩方式
+            encodings = content_encoding.get_content_encodings(self.headers)
+            chunks = (
+                self._iter_encoded_content(chunk_size)
+                if encodings
+                else self.iter_content(chunk_size)
+            )
+
+        if encodings and (stream_to or max_body_size):
+            # 写入文件或限制大小时边下载边解压，按解压后的大小计数，防止压缩炸弹
+            decoder = content_encoding.StreamDecoder(encodings, max_length=chunk_size)
+            chunks = self._iter_decoded(chunks, decoder)
+            encodings = None
+
+        if not stream_to:
+            body = bytearray()
+            for chunk in chunks:
+                body += chunk
+                if max_body_size and len(body) > max_body_size:
+                    self.close()
+                    raise ResponseTooLargeError(self.url, max_body_size)
+
+            if encodings:
+                self._encoded_content = bytes(body)
+                self._content_encodings = encodings
+            else:
+                self._content = bytes(body)
+            self._content_consumed = True
+            return
+
+        stream_to = os.path.abspath(stream_to)
+        os.makedirs(os.path.dirname(stream_to), exist_ok=True)
+        tmp_path = stream_to + ".tmp"
+        size = 0
+        try:
+            with open(tmp_path, "wb") as file:
+                for chunk in chunks:
+                    size += len(chunk)
+                    if max_body_size and size > max_body_size:
+                        self.close()
+                        raise ResponseTooLargeError(self.url, max_body_size)
+                    file.write(chunk)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        os.replace(tmp_path, stream_to)
+        self.__clear_cache()
+        self._content = False
+        self._content_consumed = True
+        self.content_path = stream_to
+
+    def _iter_encoded_content(self, chunk_size):
+        """
+        读取未解压的响应体，异常转换与 requests 的 iter_content 保持一致
+        """
+        try:
+            yield from self.raw.stream(chunk_size, decode_content=False)
+        except ProtocolError as e:
+            raise ChunkedEncodingError(e)
+        except ReadTimeoutError as e:
+            raise RequestsConnectionError(e)
+        except SSLError as e:
+            raise RequestsSSLError(e)
+        finally:
+            self.raw.release_conn()
+
+    @staticmethod
+    def _iter_decoded(chunks, decoder):
+        for chunk in chunks:
+            yield from decoder.decompress(chunk)
+        yield from decoder.flush()
+
     @property
     def is_html(self):
         content_type = self.headers.get("Content-Type", "")
@@ -317,10 +505,50 @@ class Response(res):
         else:
             return False
 
+    def _can_parse_from_content(self):
+        """
+        能否直接用content构建selector，跳过text的解码及重新编码。
+        需满足：未获取过text、非整篇补全链接模式（需要补全后的text）、content全部为合法的utf-8
+        含非法字节时lxml的处理与text的替换解码不一致，走text路径
+        """
+        if self._cached_text is not None or self._is_eager_absolute_links:
+            return False
+        if not self.content or not isinstance(self.content, bytes):
+            return False
+        return is_utf8(self.encoding) and can_decode(self.content, "utf-8", size=None)
+
+    def _can_loads_from_content(self):
+        """
+        能否直接用content解析json，需满足：未获取过text、content为utf-8编码（校验由解析时完成）。
+        整篇补全链接模式下，content中无 < 时补全链接的正则不会匹配，text与content一致
+        """
+        if self._cached_text is not None:
+            return False
+        if not self.content or not isinstance(self.content, bytes):
+            return False
+        if self._is_eager_absolute_links and b"<" in self.content:
+            return False
+        return is_utf8(self.encoding)
+
+    def _make_selector(self):
+        kwargs = {}
+        if self._is_lazy_absolute_links:
+            kwargs.update(base_url=self.url, make_absolute_links=True)
+
+        if self._can_parse_from_content():
+            return Selector(
+                body=self.content,
+                encoding="utf-8",
+                del_special_character=True,
+                **kwargs,
+            )
+
+        return Selector(self.text, **kwargs)
+
     @property
     def selector(self):
         if self._cached_selector is None:
-            self._cached_selector = Selector(self.text)
+            self._cached_selector = self._make_selector()
         return self._cached_selector
 
     def bs4(self, features="html.parser"):
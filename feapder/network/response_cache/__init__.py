@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: response缓存，用于调试及补采时不重复下载
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+from .base import BaseResponseCache, dumps_response, loads_response
+from .disk_cache import DiskResponseCache
+from .http_cache import HttpCache
+from .memory_cache import MemoryResponseCache
+from .redis_cache import RedisResponseCache
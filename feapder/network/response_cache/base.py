@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: response缓存基类及序列化
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import abc
+import ast
+import zlib
+
+import feapder.setting as setting
+from feapder.network.response import Response
+from feapder.utils import metrics
+from feapder.utils.log import log
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 序列化格式：MAGIC + 1字节压缩方式 + 压缩后的msgpack
+MAGIC = b"FRC1"
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+
+
+def dumps_response(response: Response, compression_level=3) -> bytes:
+    """
+    将response序列化为 msgpack，并用zstd压缩（未安装zstandard时用zlib）
+    """
+    if msgpack is None:
+        raise ImportError("response缓存依赖 msgpack，请先安装: pip install msgpack")
+
+    response_dict = response.to_dict
+    response_dict["headers"] = dict(response_dict["headers"])
+    data = msgpack.packb(response_dict, use_bin_type=True)
+
+    if zstandard:
+        return MAGIC + bytes([CODEC_ZSTD]) + zstandard.compress(data, compression_level)
+    return MAGIC + bytes([CODEC_ZLIB]) + zlib.compress(data, compression_level)
+
+
+def loads_response(data: bytes) -> Response:
+    """
+    反序列化response，兼容旧版本以 repr(response.to_dict) 存储的缓存
+    """
+    if not data.startswith(MAGIC):
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        return Response.from_dict(ast.literal_eval(data))
+
+    if msgpack is None:
+        raise ImportError("response缓存依赖 msgpack，请先安装: pip install msgpack")
+
+    codec = data[len(MAGIC)]
+    data = data[len(MAGIC) + 1 :]
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ImportError("该缓存使用zstd压缩，请先安装: pip install zstandard")
+        data = zstandard.decompress(data)
+    elif codec == CODEC_ZLIB:
+        data = zlib.decompress(data)
+
+    return Response.from_dict(msgpack.unpackb(data, raw=False))
+
+
+class BaseResponseCache:
+    """
+    response缓存，子类实现 bytes 的存取即可
+    """
+
+    def __init__(self, expire_time=None, compression_level=None, **kwargs):
+        """
+        Args:
+            expire_time: 默认过期时间 秒，默认为 setting.RESPONSE_CACHED_EXPIRE_TIME
+            compression_level: 压缩级别，默认为 setting.RESPONSE_CACHE_SETTING 中的 compression_level
+        """
+        self.expire_time = (
+            expire_time
+            if expire_time is not None
+            else setting.RESPONSE_CACHED_EXPIRE_TIME
+        )
+        if compression_level is None:
+            compression_level = setting.RESPONSE_CACHE_SETTING.get(
+                "compression_level", 3
+            )
+        self.compression_level = compression_level
+
+        self.hits = 0
+        self.misses = 0
+
+    @abc.abstractmethod
+    def get_data(self, key):
+        """
+        Returns: bytes，不存在或已过期返回None
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set_data(self, key, data: bytes, expire_time):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete(self, key):
+        raise NotImplementedError
+
+    def get(self, key):
+        """
+        获取缓存的response
+        Returns: Response，无缓存返回None
+        """
+        data = self.get_data(key)
+        response = None
+        if data:
+            try:
+                response = loads_response(data)
+            except Exception as e:
+                log.error(f"response缓存解析失败, 已删除. key: {key}, error: {e}")
+                self.delete(key)
+
+        if response is None:
+            self.misses += 1
+            metrics.emit_counter("miss", 1, classify="response_cache")
+        else:
+            self.hits += 1
+            metrics.emit_counter("hit", 1, classify="response_cache")
+
+        return response
+
+    def set(self, key, response: Response, expire_time=None):
+        """
+        缓存response
+        Args:
+            key:
+            response:
+            expire_time: 过期时间 秒，默认为 self.expire_time
+        """
+        data = dumps_response(response, self.compression_level)
+        self.set_data(
+            key, data, expire_time if expire_time is not None else self.expire_time
+        )
+        metrics.emit_counter("set", 1, classify="response_cache")
+        metrics.emit_counter("set_bytes", len(data), classify="response_cache")
+
+    def cache_info(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        pass
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: 基于本地磁盘的response缓存，适用于单机开发调试及补采
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import hashlib
+import os
+import struct
+import time
+
+import feapder.setting as setting
+from feapder.network.response_cache.base import BaseResponseCache
+from feapder.utils.log import log
+
+# 文件头：过期时间戳，0为永不过期
+EXPIRE_HEADER = struct.Struct(">d")
+
+
+class DiskResponseCache(BaseResponseCache):
+    """
+    每个缓存一个文件，按key的md5分两级目录存放，如 cache_dir/ab/cd/abcd...，避免单个目录文件过多
+    过期的缓存在读取时删除，也可调用 clear_expired() 批量清理
+    """
+
+    def __init__(self, cache_dir=None, **kwargs):
+        """
+        Args:
+            cache_dir: 缓存目录，默认为 setting.RESPONSE_CACHE_SETTING 中的 cache_dir
+            **kwargs: 见 BaseResponseCache
+        """
+        super().__init__(**kwargs)
+        if cache_dir is None:
+            cache_dir = setting.RESPONSE_CACHE_SETTING.get("cache_dir")
+        self.cache_dir = os.path.abspath(cache_dir)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _get_path(self, key):
+        md5 = hashlib.md5(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, md5[:2], md5[2:4], md5)
+
+    def get_data(self, key):
+        path = self._get_path(key)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            return None
+
+        (expire_at,) = EXPIRE_HEADER.unpack_from(data)
+        if expire_at and expire_at < time.time():
+            self.delete(key)
+            return None
+
+        return data[EXPIRE_HEADER.size :]
+
+    def set_data(self, key, data, expire_time):
+        path = self._get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        expire_at = time.time() + expire_time if expire_time else 0
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(EXPIRE_HEADER.pack(expire_at))
+            file.write(data)
+        os.replace(tmp_path, path)
+
+    def delete(self, key):
+        try:
+            os.remove(self._get_path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear_expired(self):
+        """
+        清理过期的缓存
+        Returns: 清理的数量
+        """
+        count = 0
+        now = time.time()
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    with open(path, "rb") as file:
+                        (expire_at,) = EXPIRE_HEADER.unpack(
+                            file.read(EXPIRE_HEADER.size)
+                        )
+                    if expire_at and expire_at < now:
+                        os.remove(path)
+                        count += 1
+                except (OSError, struct.error) as e:
+                    log.error(f"清理缓存文件出错: {path}, error: {e}")
+
+        return count
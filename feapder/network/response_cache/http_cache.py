@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: HTTP条件请求缓存。按request指纹缓存页面，再次请求时带上 If-None-Match / If-Modified-Since，
+    页面未修改(304)时直接使用缓存的页面，不重新下载
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import feapder.setting as setting
+import feapder.utils.tools as tools
+from feapder.network.response import Response
+from feapder.network.response_cache.base import BaseResponseCache
+from feapder.utils import metrics
+from feapder.utils.log import log
+
+VALIDATOR_HEADERS = {
+    "if-none-match": "ETag",
+    "if-modified-since": "Last-Modified",
+}
+
+POLICY_SERVE = "serve"  # 页面未修改时，使用缓存的页面调用解析函数
+POLICY_SKIP = "skip"  # 页面未修改时，跳过解析函数
+
+
+class HttpCache:
+    def __init__(self, store=None, expire_time=None, policy=None):
+        """
+        Args:
+            store: 页面的存储，BaseResponseCache 对象或类路径。默认为 setting.HTTP_CACHE_SETTING 中的 store
+            expire_time: 缓存时间 秒
+            policy: 页面未修改时的处理方式 serve / skip
+        """
+        http_cache_setting = setting.HTTP_CACHE_SETTING
+        if store is None:
+            store = http_cache_setting.get("store")
+        if expire_time is None:
+            expire_time = http_cache_setting.get("expire_time")
+        if policy is None:
+            policy = http_cache_setting.get("policy") or POLICY_SERVE
+
+        if policy not in (POLICY_SERVE, POLICY_SKIP):
+            raise ValueError(f"不支持的policy: {policy}, 可选 serve、skip")
+        self.policy = policy
+
+        if not isinstance(store, BaseResponseCache):
+            store = tools.import_cls(store)(expire_time=expire_time)
+        self.store = store
+
+    @staticmethod
+    def _get_key(request):
+        return f"http_cache:{request.fingerprint}"
+
+    def prepare(self, request):
+        """
+        查询缓存，有缓存时在请求头中加入校验信息，需在 make_requests_kwargs 之后调用
+        Args:
+            request: feapder.Request
+
+        Returns: 缓存的response，无缓存时返回None
+        """
+        if request.method != "GET":
+            return None
+
+        # 自定义了校验头时不处理
+        user_headers = getattr(request, "headers", None) or {}
+        if any(key.lower() in VALIDATOR_HEADERS for key in user_headers):
+            return None
+
+        # 去掉上次请求加上的校验头
+        headers = {
+            key: value
+            for key, value in (request.requests_kwargs.get("headers") or {}).items()
+            if key.lower() not in VALIDATOR_HEADERS
+        }
+
+        cached = self.store.get(self._get_key(request))
+        if cached:
+            for header, response_header in VALIDATOR_HEADERS.items():
+                value = cached.headers.get(response_header)
+                if value:
+                    headers[header.title()] = value
+
+        request.requests_kwargs["headers"] = headers
+        return cached
+
+    def process_response(self, request, response: Response, cached: Response = None):
+        """
+        处理响应：304时返回缓存的页面，200且有校验信息时缓存页面
+        Returns: response
+        """
+        if response.status_code == 304 and cached is not None:
+            response.close()
+            cached.not_modified = True
+            metrics.emit_counter("not_modified", 1, classify="http_cache")
+            metrics.emit_counter(
+                "saved_bytes", len(cached.content), classify="http_cache"
+            )
+            log.debug(f"页面未修改, 使用缓存 url: {request.url}")
+            return cached
+
+        if (
+            request.method == "GET"
+            and response.status_code == 200
+            and not response.content_path
+            and any(response.headers.get(h) for h in VALIDATOR_HEADERS.values())
+        ):
+            try:
+                self.store.set(self._get_key(request), response)
+                metrics.emit_counter("store", 1, classify="http_cache")
+            except Exception as e:
+                log.error(f"缓存页面失败 url: {request.url}, error: {e}")
+
+        return response
+
+    def is_skip(self, response):
+        """
+        是否跳过解析函数
+        """
+        return (
+            self.policy == POLICY_SKIP
+            and response is not None
+            and getattr(response, "not_modified", False)
+        )
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: 进程内的LRU response缓存，适用于同一进程内重复请求的场景
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import feapder.setting as setting
+from feapder.network.response_cache.base import BaseResponseCache
+
+
+class MemoryResponseCache(BaseResponseCache):
+    """
+    超过 max_count 条或 max_bytes 字节时，淘汰最久未使用的缓存
+    """
+
+    def __init__(self, max_count=None, max_bytes=None, **kwargs):
+        """
+        Args:
+            max_count: 最大缓存数，默认为 setting.RESPONSE_CACHE_SETTING 中的 max_count
+            max_bytes: 最大缓存字节数（压缩后），默认为 setting.RESPONSE_CACHE_SETTING 中的 max_bytes
+            **kwargs: 见 BaseResponseCache
+        """
+        super().__init__(**kwargs)
+        if max_count is None:
+            max_count = setting.RESPONSE_CACHE_SETTING.get("max_count")
+        if max_bytes is None:
+            max_bytes = setting.RESPONSE_CACHE_SETTING.get("max_bytes")
+        self.max_count = max_count or 0
+        self.max_bytes = max_bytes or 0
+
+        # key: (过期时间戳, data)
+        self._cache = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get_data(self, key):
+        with self._lock:
+            value = self._cache.get(key)
+            if not value:
+                return None
+
+            expire_at, data = value
+            if expire_at and expire_at < time.time():
+                self._pop(key)
+                return None
+
+            self._cache.move_to_end(key)
+            return data
+
+    def set_data(self, key, data, expire_time):
+        expire_at = time.time() + expire_time if expire_time else 0
+        with self._lock:
+            self._pop(key)
+            self._cache[key] = (expire_at, data)
+            self._size += len(data)
+
+            while self._cache and (
+                (self.max_count and len(self._cache) > self.max_count)
+                or (self.max_bytes and self._size > self.max_bytes)
+            ):
+                _, (_, evicted) = self._cache.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _pop(self, key):
+        value = self._cache.pop(key, None)
+        if value:
+            self._size -= len(value[1])
+
+    def delete(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def cache_info(self):
+        info = super().cache_info()
+        info.update(count=len(self._cache), bytes=self._size)
+        return info
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: 基于redis的response缓存，适用于分布式爬虫
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+from feapder.db.redisdb import RedisDB
+from feapder.network.response_cache.base import BaseResponseCache
+
+
+class RedisResponseCache(BaseResponseCache):
+    def __init__(self, redis_db: RedisDB = None, **kwargs):
+        """
+        Args:
+            redis_db: 默认按setting中的redis配置连接
+            **kwargs: 见 BaseResponseCache
+        """
+        super().__init__(**kwargs)
+        self._redis_db = redis_db
+
+    @property
+    def redis_db(self):
+        if not self._redis_db:
+            # 缓存为二进制，不能解码为字符串
+            self._redis_db = RedisDB(decode_responses=False)
+        return self._redis_db
+
+    def get_data(self, key):
+        return self.redis_db.strget(key)
+
+    def set_data(self, key, data, expire_time):
+        self.redis_db.strset(key, data, ex=expire_time or None)
+
+    def delete(self, key):
+        self.redis_db.clear(key)
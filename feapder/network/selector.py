@@ -7,7 +7,10 @@ Created on 2018-10-08 15:33:37
 @author: Boris
 @email:  boris_liu@foxmail.com
 """
+import codecs
+import functools
 import re
+from urllib.parse import urljoin, urlparse, urlunparse
 
 import parsel
 import six
@@ -16,8 +19,205 @@ from packaging import version
 from parsel import Selector as ParselSelector
 from parsel import SelectorList as ParselSelectorList
 from parsel import selector
+from parsel.csstranslator import GenericTranslator, HTMLTranslator
 from w3lib.html import replace_entities as w3lib_replace_entities
 
+from feapder.utils.log import log
+
+# 补全链接时，需要补全的标签及属性
+ABSOLUTE_LINK_PATTERNS = [
+    re.compile(regex, flags=re.S | re.I)
+    for regex in (
+        r'(<a.*?href\s*?=\s*?["\'])(.+?)(["\'])',  # a
+        r'(<img.*?src\s*?=\s*?["\'])(.+?)(["\'])',  # img
+        r'(<link.*?href\s*?=\s*?["\'])(.+?)(["\'])',  # css
+        r'(<script.*?src\s*?=\s*?["\'])(.+?)(["\'])',  # js
+    )
+]
+
+# html 源码中的特殊字符，需要删掉，否则会影响etree的构建
+# 移除控制字符（含\x00） 全部字符列表 https://zh.wikipedia.org/wiki/%E6%8E%A7%E5%88%B6%E5%AD%97%E7%AC%A6
+SPECIAL_CHARACTER_PATTERN = re.compile("[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F]")
+# utf-8 编码下的控制字符，\x80-\x9F 编码后为 \xc2\x80-\xc2\x9f
+SPECIAL_CHARACTER_BYTES_PATTERN = re.compile(rb"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]|\xc2[\x80-\x9f]")
+# 控制字符可能的首字节之外的所有字节，用 bytes.translate 删掉后为空即无需正则替换，比正则查找快一个数量级
+_NON_SPECIAL_BYTES = bytes(
+    c
+    for c in range(256)
+    if not (c <= 0x08 or c in (0x0B, 0x0C) or 0x0E <= c <= 0x1F or c in (0x7F, 0xC2))
+)
+
+# 编译后的xpath、css转换后的xpath缓存数量，进程内所有页面共享
+XPATH_CACHE_SIZE = 4096
+CSS_CACHE_SIZE = 4096
+
+# lxml 每次执行映射了这些命名空间的 XPath 对象时都会重新注册其函数，libxml2 2.13+ 下每次注册都会向该对象的错误日志追加一条且无法清除，
+# 缓存的对象会不断变大，因此用到这些命名空间的表达式不缓存，未用到的不传入（同 parsel 1.12）
+EXSLT_NAMESPACES = frozenset(
+    f"http://exslt.org/{name}"
+    for name in ("dates-and-times", "math", "sets", "strings")
+)
+
+# 提取的是链接属性的xpath，如 //a/@href、css转换后的 descendant-or-self::img/@src
+LINK_ATTRIBUTE_QUERY_PATTERN = re.compile(r"@(?:href|src)\s*$", flags=re.I)
+
+
+@functools.lru_cache(maxsize=1024)
+def _get_url_scheme(base_url):
+    return urlparse(base_url).scheme
+
+
+def make_absolute_link(link, base_url):
+    """
+    将链接补全为绝对链接
+    Args:
+        link: 链接
+        base_url: 页面的url
+
+    Returns: 绝对链接
+    """
+    try:
+        link = link.strip()
+
+        # Parse the link with stdlib.
+        parsed = urlparse(link)._asdict()
+
+        # If link is relative, then join it with base_url.
+        if not parsed["netloc"]:
+            return urljoin(base_url, link)
+
+        # Link is absolute; if it lacks a scheme, add one from base_url.
+        if not parsed["scheme"]:
+            parsed["scheme"] = _get_url_scheme(base_url)
+
+            # Reconstruct the URL to incorporate the new scheme.
+            parsed = (v for v in parsed.values())
+            return urlunparse(parsed)
+
+    except Exception as e:
+        log.error(
+            "Invalid URL <{}> can't make absolute_link. exception: {}".format(link, e)
+        )
+
+    # Link is absolute and complete with scheme; nothing to be done here.
+    return link
+
+
+def absolute_links(text, base_url):
+    """
+    将html中 a、img、link、script 标签的链接补全为绝对链接
+    """
+
+    def replace_href(match):
+        absolute_link = make_absolute_link(match.group(2), base_url)
+        # return re.sub(regex, r'\1{}\3'.format(absolute_link), html) # 使用正则替换，个别字符不支持。如该网址源代码http://permit.mep.gov.cn/permitExt/syssb/xxgk/xxgk!showImage.action?dataid=0b092f8115ff45c5a50947cdea537726
+        return match.group(1) + absolute_link + match.group(3)
+
+    for pattern in ABSOLUTE_LINK_PATTERNS:
+        text = pattern.sub(replace_href, text)
+
+    return text
+
+
+def clean_html(text, del_special_character=True, replace_nbsp=True):
+    """
+    清洗html，构建etree前的所有替换集中在这里处理
+    Args:
+        text: 网页源码
+        del_special_character: 是否删除控制字符（含\x00）
+        replace_nbsp: 是否将&nbsp; 转为空格，否则selector 会转为 \xa0
+
+    Returns: 清洗后的网页源码。无需替换时返回原字符串，不产生拷贝
+    """
+    if del_special_character:
+        text = SPECIAL_CHARACTER_PATTERN.sub("", text)
+    if replace_nbsp:
+        # str.replace 无匹配时不拷贝，比 re.sub 快
+        text = text.replace("&nbsp;", "\x20")
+    return text
+
+
+def clean_html_body(body, del_special_character=True, replace_nbsp=True):
+    """
+    clean_html 的 bytes 版本，body 需为 utf-8 编码
+    """
+    if del_special_character and body.translate(None, _NON_SPECIAL_BYTES):
+        body = SPECIAL_CHARACTER_BYTES_PATTERN.sub(b"", body)
+    if replace_nbsp:
+        body = body.replace(b"&nbsp;", b"\x20")
+    return body
+
+
+def is_utf8(encoding):
+    try:
+        return codecs.lookup(encoding).name == "utf-8"
+    except (LookupError, TypeError):
+        return False
+
+
+@functools.lru_cache(maxsize=XPATH_CACHE_SIZE)
+def compile_xpath(query, namespaces=(), smart_strings=False):
+    """
+    编译xpath，同一表达式只编译一次
+    Args:
+        query: xpath
+        namespaces: 命名空间 ((prefix, uri), ...)，需可哈希
+        smart_strings: 结果字符串是否带有getparent等属性
+
+    Returns: etree.XPath
+    """
+    return etree.XPath(query, namespaces=dict(namespaces), smart_strings=smart_strings)
+
+
+def get_xpath_evaluator(query, namespaces, smart_strings=False):
+    """
+    获取xpath对应的 etree.XPath，用到 EXSLT_NAMESPACES 的表达式每次重新编译，其他使用 compile_xpath 的缓存
+    Args:
+        query: xpath
+        namespaces: 命名空间 {prefix: uri}
+        smart_strings:
+
+    Returns: etree.XPath
+    """
+    namespaces = {
+        prefix: uri
+        for prefix, uri in namespaces.items()
+        if uri not in EXSLT_NAMESPACES or f"{prefix}:" in query
+    }
+    if EXSLT_NAMESPACES.intersection(namespaces.values()):
+        return etree.XPath(query, namespaces=namespaces, smart_strings=smart_strings)
+    return compile_xpath(query, tuple(sorted(namespaces.items())), smart_strings)
+
+
+@functools.lru_cache(maxsize=CSS_CACHE_SIZE)
+def css_to_xpath(query, type="html"):
+    """
+    将css选择器转为xpath
+    Args:
+        query: css选择器
+        type: html / xml
+
+    Returns: xpath
+    """
+    translator = GenericTranslator() if type == "xml" else HTMLTranslator()
+    return translator.css_to_xpath(query)
+
+
+def expression_cache_info():
+    """
+    xpath、css表达式缓存的命中情况
+    Returns: {"xpath": {"hits": 0, "misses": 0, "maxsize": 4096, "currsize": 0}, "css": {...}}
+    """
+    return {
+        "xpath": compile_xpath.cache_info()._asdict(),
+        "css": css_to_xpath.cache_info()._asdict(),
+    }
+
+
+def clear_expression_cache():
+    compile_xpath.cache_clear()
+    css_to_xpath.cache_clear()
+
 
 def extract_regex(regex, text, replace_entities=True, flags=0):
     """Extract a list of unicode strings from the given text/encoding using the following policies:
@@ -58,6 +258,7 @@ def extract_regex(regex, text, replace_entities=True, flags=0):
 
 def create_root_node(text, parser_cls, base_url=None):
     """Create root node for text using given parser class."""
+    # text 已经过 clean_html，strip、replace 无需替换时不产生拷贝
     body = text.strip().replace("\x00", "").encode("utf8") or b"<html/>"
     parser = parser_cls(recover=True, encoding="utf8", huge_tree=True)
     root = etree.fromstring(body, parser=parser, base_url=base_url)
@@ -117,11 +318,108 @@ class Selector(ParselSelector):
 
     __repr__ = __str__
 
-    def __init__(self, text=None, *args, **kwargs):
-        # 先将&nbsp; 转为空格，否则selector 会转为 \xa0
+    def __init__(
+        self,
+        text=None,
+        *args,
+        make_absolute_links=False,
+        del_special_character=False,
+        **kwargs,
+    ):
+        """
+        Args:
+            text: 网页源码
+            body: 网页源码 bytes，配合 encoding 使用。utf-8 编码时直接交给lxml解析，省去解码及重新编码
+            make_absolute_links: 是否在提取链接时补全为绝对链接（懒补全）。
+                开启后 xpath/css 提取 href、src 属性及 re 匹配时才补全，需同时传入 base_url
+            del_special_character: 是否删除控制字符，默认不删除。Response 由 content 构建时传True，与 Response.text 一致
+        """
+        # 按需删除控制字符，并将&nbsp; 转为空格，否则selector 会转为 \xa0
         if text:
-            text = re.sub("&nbsp;", "\x20", text)
+            text = clean_html(text, del_special_character=del_special_character)
+        elif kwargs.get("body"):
+            encoding = kwargs.get("encoding", "utf-8")
+            if is_utf8(encoding):
+                kwargs["body"] = clean_html_body(
+                    kwargs["body"], del_special_character=del_special_character
+                )
+            else:
+                # 非utf-8编码 lxml 无法可靠地直接解析，解码后按text处理
+                text = clean_html(
+                    bytes(kwargs.pop("body")).decode(encoding, errors="replace"),
+                    del_special_character=del_special_character,
+                )
+                kwargs.pop("encoding", None)
         super(Selector, self).__init__(text, *args, **kwargs)
+        self._make_absolute_links = make_absolute_links
+
+    @property
+    def base_url(self):
+        """
+        页面的url，解析时通过 base_url 传入，所有子节点共享
+        """
+        return getattr(self.root, "base", None)
+
+    def _xpath(self, query, namespaces=None, **kwargs):
+        """
+        使用缓存的 etree.XPath 执行查询。parsel 1.12 之前每次查询都重新编译表达式，1.12 起虽有缓存但无法查看命中情况，
+        因此统一使用 compile_xpath 的缓存；非html/xml节点（如提取出的字符串、json）交由parsel处理
+        """
+        if self.type not in ("html", "xml") or not hasattr(self.root, "xpath"):
+            return super(Selector, self).xpath(query, namespaces=namespaces, **kwargs)
+
+        nsp = dict(self.namespaces)
+        if namespaces is not None:
+            nsp.update(namespaces)
+        try:
+            xpathev = get_xpath_evaluator(query, nsp, self._lxml_smart_strings)
+            result = xpathev(self.root, **kwargs)
+        except etree.XPathError as exc:
+            raise ValueError(f"XPath error: {exc} in {query}")
+
+        if not isinstance(result, list):
+            result = [result]
+
+        return self.selectorlist_cls(
+            [
+                self.__class__(
+                    root=x,
+                    _expr=query,
+                    namespaces=self.namespaces,
+                    type=selector._xml_or_html(self.type),
+                )
+                for x in result
+            ]
+        )
+
+    def _css2xpath(self, query):
+        return css_to_xpath(query, selector._xml_or_html(self.type))
+
+    def xpath(self, query, namespaces=None, **kwargs):
+        result = self._xpath(query, namespaces=namespaces, **kwargs)
+        if not self._make_absolute_links:
+            return result
+
+        base_url = self.base_url
+        if base_url and LINK_ATTRIBUTE_QUERY_PATTERN.search(query):
+            result = self.selectorlist_cls(
+                [
+                    self.__class__(
+                        root=make_absolute_link(x.root, base_url),
+                        _expr=query,
+                        type=x.type,
+                    )
+                    if isinstance(x.root, str)
+                    else x
+                    for x in result
+                ]
+            )
+
+        # 子节点继续懒补全
+        for x in result:
+            x._make_absolute_links = True
+
+        return result
 
     def re_first(self, regex, default=None, replace_entities=True, flags=re.S):
         """
@@ -153,6 +451,8 @@ class Selector(ParselSelector):
         replacements.
         """
 
-        return extract_regex(
-            regex, self.get(), replace_entities=replace_entities, flags=flags
-        )
+        text = self.get()
+        if self._make_absolute_links and self.base_url:
+            text = absolute_links(text, self.base_url)
+
+        return extract_regex(regex, text, replace_entities=replace_entities, flags=flags)
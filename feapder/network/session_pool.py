@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: 会话池。同一 session_key 的请求固定使用同一组代理、User-Agent、cookie及HTTP连接
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import feapder.setting as setting
+from feapder.utils import metrics
+
+
+class SessionIdentity:
+    """
+    一个会话的身份：代理 + User-Agent + cookie + HTTP连接
+    """
+
+    __slots__ = (
+        "session_key",
+        "user_agent",
+        "proxies",
+        "session",
+        "lock",
+        "last_used",
+    )
+
+    def __init__(self, session_key, user_agent, pool_maxsize=10):
+        self.session_key = session_key
+        self.user_agent = user_agent
+        self.proxies = None  # 首次请求时从代理池获取
+        self.session = requests.Session()  # 自带cookie，响应的set-cookie自动保存
+        http_adapter = HTTPAdapter(pool_connections=10, pool_maxsize=pool_maxsize)
+        self.session.mount("http", http_adapter)
+        self.lock = threading.Lock()  # 同一会话并发请求时，只获取一次代理
+        self.last_used = time.time()
+
+    @property
+    def cookies(self):
+        return self.session.cookies
+
+    def close(self):
+        self.session.close()
+
+
+class SessionPool:
+    """
+    按 session_key 管理会话，LRU淘汰
+    - 存活的会话数超过 max_sessions 时，淘汰最久未使用的会话
+    - 会话空闲超过 idle_timeout 秒后失效，下次使用时重新分配代理、UA及cookie
+    """
+
+    def __init__(self, user_agent_pool, max_sessions=None, idle_timeout=None):
+        """
+        Args:
+            user_agent_pool: 生成User-Agent的模块或对象，需实现 get(ua_type)
+            max_sessions: 同时存活的会话数上限，默认为 setting.SESSION_POOL_SETTING.max_sessions
+            idle_timeout: 会话的空闲超时 秒，0为不超时，默认为 setting.SESSION_POOL_SETTING.idle_timeout
+        """
+        session_pool_setting = setting.SESSION_POOL_SETTING
+        self.user_agent_pool = user_agent_pool
+        self.max_sessions = (
+            session_pool_setting.get("max_sessions", 1000)
+            if max_sessions is None
+            else max_sessions
+        )
+        self.idle_timeout = (
+            session_pool_setting.get("idle_timeout", 600)
+            if idle_timeout is None
+            else idle_timeout
+        )
+        self.pool_maxsize = session_pool_setting.get("pool_maxsize", 10)
+
+        self._sessions = OrderedDict()  # session_key: SessionIdentity，按使用时间排序
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, session_key):
+        return session_key in self._sessions
+
+    def _new_identity(self, session_key):
+        if setting.RANDOM_HEADERS:
+            user_agent = self.user_agent_pool.get(setting.USER_AGENT_TYPE)
+        else:
+            user_agent = setting.DEFAULT_USERAGENT
+        return SessionIdentity(session_key, user_agent, self.pool_maxsize)
+
+    def get(self, session_key) -> SessionIdentity:
+        """
+        获取会话，不存在或已失效时新建
+        """
+        now = time.time()
+        expired = []
+        with self._lock:
+            identity = self._sessions.get(session_key)
+            if (
+                identity
+                and self.idle_timeout
+                and now - identity.last_used > self.idle_timeout
+            ):
+                expired.append(self._sessions.pop(session_key))
+                identity = None
+
+            if identity:
+                self._sessions.move_to_end(session_key)
+            else:
+                identity = self._new_identity(session_key)
+                self._sessions[session_key] = identity
+                while len(self._sessions) > self.max_sessions:
+                    expired.append(self._sessions.popitem(last=False)[1])
+
+            identity.last_used = now
+
+        for expired_identity in expired:
+            expired_identity.close()
+        if expired:
+            metrics.emit_counter("evicted", len(expired), classify="session")
+
+        return identity
+
+    def remove(self, session_key):
+        """
+        删除会话，下次使用时重新分配代理、UA及cookie
+        """
+        with self._lock:
+            identity = self._sessions.pop(session_key, None)
+
+        if identity:
+            identity.close()
+
+    def clear(self):
+        with self._lock:
+            identities = list(self._sessions.values())
+            self._sessions.clear()
+
+        for identity in identities:
+            identity.close()
@@ -1,14 +1,28 @@
 import abc
+import ast
+import copy
 import json
 import random
+import threading
 import time
 from datetime import datetime
 
 from feapder.db.redisdb import RedisDB
+from feapder.utils import fast_json
 from feapder.utils.log import log
 from feapder.utils.tools import get_md5, timestamp_to_date
 
 
+def loads_user(user_str):
+    """
+    解析redis中存储的用户。用户以json存储，兼容旧版本以str(dict)存储的用户，不使用eval
+    """
+    try:
+        return fast_json.loads(user_str)
+    except ValueError:
+        return ast.literal_eval(user_str)
+
+
 class GuestUser:
     def __init__(self, user_agent=None, proxies=None, cookies=None, **kwargs):
         self.__dict__.update(kwargs)
@@ -32,8 +46,19 @@ class GuestUser:
                 data[key] = value
         return data
 
+    def to_json(self):
+        """
+        序列化为紧凑的json，用于存储到redis
+        """
+        return fast_json.dumps(self.to_dict())
+
+    @classmethod
     def from_dict(cls, data):
-        return cls.__init__(**data)
+        return cls(**data)
+
+    @classmethod
+    def from_json(cls, user_str):
+        return cls(**loads_user(user_str))
 
 
 class NormalUser(GuestUser):
@@ -93,7 +118,7 @@ class GoldUser(NormalUser):
         self.__dict__.update(ohter.to_dict())
 
     def sycn_to_redis(self):
-        self.redisdb.hset(self.redis_key, self.user_id, self.to_dict())
+        self.redisdb.hset(self.redis_key, self.user_id, self.to_json())
 
     def set_delay_use(self, seconds):
         self._delay_use = seconds
@@ -171,6 +196,149 @@ class GoldUser(NormalUser):
         return False
 
 
+class UserCache:
+    """
+    用户的本地缓存
+    - 用户在redis中添加、删除时递增版本号并发布通知，各进程收到通知后增量更新缓存
+    - 缓存有效时取用户不访问redis，不重复反序列化
+    - 等待用户的线程在用户变化时被唤醒，无需轮询
+    """
+
+    def __init__(self, redisdb: RedisDB, tab_user_pool, user_cls, check_interval=10):
+        """
+        @param redisdb:
+        @param tab_user_pool: 用户表
+        @param user_cls: 用户类，需实现 from_json
+        @param check_interval: 未收到通知时，校验版本号的间隔 秒，防止通知丢失
+        """
+        self._redisdb = redisdb
+        self._tab_user_pool = tab_user_pool
+        self._tab_version = f"{tab_user_pool}:version"  # 版本号，同时作为通知的频道
+        self._user_cls = user_cls
+        self._check_interval = check_interval
+
+        self._users = {}  # user_id: user
+        self._user_strs = {}  # user_id: user_str，用于判断用户是否变化
+        self._version = None  # 为None时需重新加载
+
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)
+        self._listen_thread = None
+
+    def _start_listen_thread(self):
+        if self._listen_thread is None:
+            with self._lock:
+                if self._listen_thread is None:
+                    self._listen_thread = threading.Thread(
+                        target=self._listen, name="user_cache_listen", daemon=True
+                    )
+                    self._listen_thread.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redisdb.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self._tab_version)
+                # 订阅前的变化收不到通知，重新校验版本号
+                self._on_version(self._get_remote_version())
+                while True:
+                    message = pubsub.get_message(timeout=self._check_interval)
+                    if message:
+                        self._on_version(int(message["data"]))
+                    else:
+                        self._on_version(self._get_remote_version())
+            except Exception as e:
+                log.error(f"用户池通知异常: {e}")
+                self._invalidate()
+                time.sleep(1)
+
+    def _get_remote_version(self):
+        return int(self._redisdb.get(self._tab_version) or 0)
+
+    def _on_version(self, version):
+        with self._lock:
+            if self._version is None or version > self._version:
+                self._invalidate()
+
+    def _invalidate(self):
+        with self._lock:
+            self._version = None
+            self._changed.notify_all()
+
+    def _bump_version(self):
+        version = self._redisdb.incr(self._tab_version)
+        self._redisdb.publish(self._tab_version, version)
+
+    def _refresh(self):
+        """
+        缓存失效时从redis加载，只反序列化有变化的用户。需在锁内调用
+        """
+        if self._version is not None:
+            return
+
+        version = self._get_remote_version()
+        user_strs = self._redisdb.hgetall(self._tab_user_pool)
+        users = {}
+        for user_id, user_str in user_strs.items():
+            if self._user_strs.get(user_id) == user_str:
+                users[user_id] = self._users[user_id]
+            else:
+                try:
+                    users[user_id] = self._user_cls.from_json(user_str)
+                except Exception as e:
+                    log.error(f"用户 {user_id} 解析失败: {e}")
+
+        self._users = users
+        self._user_strs = user_strs
+        self._version = version
+
+    def user_ids(self):
+        self._start_listen_thread()
+        with self._lock:
+            self._refresh()
+            return list(self._users)
+
+    def get(self, user_id):
+        """
+        获取用户，返回的是缓存的深拷贝，cookies、proxies 等可随意修改，不影响缓存及其他线程
+        """
+        self._start_listen_thread()
+        with self._lock:
+            self._refresh()
+            user = self._users.get(str(user_id))
+        return user and copy.deepcopy(user)
+
+    def count(self):
+        self._start_listen_thread()
+        with self._lock:
+            self._refresh()
+            return len(self._users)
+
+    def save(self, user):
+        self._redisdb.hset(self._tab_user_pool, user.user_id, user.to_json())
+        self._bump_version()
+        self._invalidate()
+
+    def delete(self, user_id):
+        self._redisdb.hdel(self._tab_user_pool, user_id)
+        self._bump_version()
+        self._invalidate()
+
+    def wait(self, timeout=None):
+        """
+        等待用户变化
+        @param timeout: 最长等待时间 秒
+        @return: 是否有变化
+        """
+        self._start_listen_thread()
+        with self._lock:
+            self._refresh()
+            version = self._version
+            return self._changed.wait_for(
+                lambda: self._version != version, timeout=timeout
+            )
+
+
 class UserPoolInterface(metaclass=abc.ABCMeta):
     @abc.abstractmethod
     def login(self, *args, **kwargs):
@@ -11,6 +11,7 @@ Created on 2018/12/27 11:32 AM
 import os
 import random
 import time
+from datetime import datetime, timedelta
 from enum import Enum, unique
 from typing import Optional, List
 
@@ -22,6 +23,93 @@ from feapder.utils.log import log
 from feapder.utils.redis_lock import RedisLock
 from feapder.utils.tools import send_msg
 
+# 可用索引：available 为用户可被使用的时间；独占的用户在 exclusive 中记录独占的爬虫可使用的时间，
+# owner 中记录独占的爬虫；取出的用户在 leased 中记录租约过期时间，过期未更新的用户（如进程异常退出）重新可用
+# KEYS: available、exclusive、owner、leased
+# ARGV: 当前时间、租约时长、爬虫名、指定的用户、可用时间上限
+# 返回: 用户id
+POP_USER_LUA = """
+    local now = tonumber(ARGV[1])
+    local lease_time = tonumber(ARGV[2])
+    local spider_name = ARGV[3]
+    local user_id = ARGV[4]
+    local max_score = ARGV[5]
+
+    -- 回收过期的租约
+    local expired = redis.call('zrangebyscore', KEYS[4], '-inf', now)
+    for i = 1, #expired do
+        redis.call('zrem', KEYS[4], expired[i])
+        redis.call('zadd', KEYS[1], now, expired[i])
+    end
+
+    local function take(id)
+        redis.call('zrem', KEYS[1], id)
+        redis.call('zrem', KEYS[2], id)
+        redis.call('zadd', KEYS[4], now + lease_time, id)
+        return id
+    end
+
+    local function is_owner(id)
+        return spider_name ~= '' and redis.call('hget', KEYS[3], id) == spider_name
+    end
+
+    local function is_due(key, id)
+        local score = redis.call('zscore', key, id)
+        return score and (max_score == '+inf' or tonumber(score) <= tonumber(max_score))
+    end
+
+    if user_id ~= '' then
+        if is_due(KEYS[1], user_id) or (is_owner(user_id) and is_due(KEYS[2], user_id)) then
+            return take(user_id)
+        end
+        return false
+    end
+
+    -- 优先使用本爬虫独占的用户
+    if spider_name ~= '' then
+        local ids = redis.call('zrangebyscore', KEYS[2], '-inf', max_score)
+        for i = 1, #ids do
+            if is_owner(ids[i]) then
+                return take(ids[i])
+            end
+        end
+    end
+
+    local ids = redis.call('zrangebyscore', KEYS[1], '-inf', max_score, 'limit', 0, 1)
+    if #ids > 0 then
+        return take(ids[1])
+    end
+    return false
+"""
+
+# 更新用户的可用索引
+# KEYS: available、exclusive、owner、leased
+# ARGV: 用户id、可被使用的时间（为空时表示不可用，如未登录）、独占的爬虫可使用的时间、独占的爬虫、是否仅在不存在时添加
+UPDATE_USER_LUA = """
+    local user_id = ARGV[1]
+    if ARGV[5] == '1' and (redis.call('zscore', KEYS[1], user_id) or redis.call('zscore', KEYS[4], user_id)) then
+        return 0
+    end
+
+    redis.call('zrem', KEYS[4], user_id)
+    if ARGV[2] == '' then
+        redis.call('zrem', KEYS[1], user_id)
+        redis.call('zrem', KEYS[2], user_id)
+        redis.call('hdel', KEYS[3], user_id)
+        return 1
+    end
+
+    redis.call('zadd', KEYS[1], ARGV[2], user_id)
+    if ARGV[4] ~= '' then
+        redis.call('zadd', KEYS[2], ARGV[3], user_id)
+        redis.call('hset', KEYS[3], user_id, ARGV[4])
+    else
+        redis.call('zrem', KEYS[2], user_id)
+        redis.call('hdel', KEYS[3], user_id)
+    end
+    return 1
+"""
+
 
 @unique
 class GoldUserStatus(Enum):
@@ -47,21 +135,28 @@ class GoldUserPool(UserPoolInterface):
         *,
         users: List[GoldUser],
         keep_alive=False,
+        lease_time=60,
     ):
         """
         @param redis_key: user存放在redis中的key前缀
         @param users: 账号信息
         @param keep_alive: 是否保持常驻，以便user不足时立即补充
+        @param lease_time: 取出用户后更新可用时间的最长时间 秒，超时未更新（如进程异常退出）则重新可用
         """
         self._tab_user_pool = setting.TAB_USER_POOL.format(
             redis_key=redis_key, user_type="gold"
         )
+        # 可用索引
+        self._tab_available = f"{self._tab_user_pool}:available"
+        self._tab_exclusive = f"{self._tab_user_pool}:exclusive"
+        self._tab_owner = f"{self._tab_user_pool}:owner"
+        self._tab_leased = f"{self._tab_user_pool}:leased"
+        self._lease_time = lease_time
 
         self.users = users
         self._keep_alive = keep_alive
 
         self._redisdb = RedisDB()
-        self._users_id = []
 
         if not users:
             raise ValueError("not users")
@@ -73,6 +168,7 @@ class GoldUserPool(UserPoolInterface):
         self.__init_metrics()
         self.__sync_users_base_info()
         self.__sycn_users_info()
+        self.__init_available_index()
 
     def __init_metrics(self):
         metrics.init(**setting.METRICS_OTHER_ARGS)
@@ -94,17 +190,187 @@ class GoldUserPool(UserPoolInterface):
             if cache_user:
                 self.users[index] = cache_user
 
-    def _load_users_id(self):
-        self._users_id = self._redisdb.hkeys(self._tab_user_pool)
-        if self._users_id:
-            random.shuffle(self._users_id)
+    def __init_available_index(self):
+        # 兼容未建立可用索引的用户，已在索引中的用户不更新，防止覆盖其他进程的租约
+        for user in self.users:
+            self._update_available(user, only_absent=True)
 
-    def _get_user_id(self):
-        if not self._users_id:
-            self._load_users_id()
+    @staticmethod
+    def _next_work_time(user: GoldUser, timestamp):
+        """
+        timestamp 之后最近的工作时间
+        """
+        start_hour, end_hour = user.work_time
+        date = datetime.fromtimestamp(timestamp)
+        if date.hour in range(start_hour, end_hour):
+            return timestamp
+
+        work_date = date.replace(hour=start_hour, minute=0, second=0, microsecond=0)
+        if date.hour >= start_hour:
+            work_date += timedelta(days=1)
+        return work_date.timestamp()
+
+    @classmethod
+    def _next_use_time(cls, user: GoldUser):
+        """
+        用户下次可被使用的时间，考虑使用间隔、延时使用、每日使用次数及工作时间
+        """
+        if user._delay_use:
+            interval = user._delay_use
+        elif isinstance(user.use_interval, (tuple, list)):
+            interval = random.randint(*user.use_interval)
+        else:
+            interval = user.use_interval
+        next_use_time = user.get_last_use_time() + interval
+
+        today = datetime.now().strftime("%Y-%m-%d")
+        if (
+            user._reset_use_times_date == today
+            and user._use_times > user.max_use_times
+        ):
+            # 次日重置使用次数
+            tomorrow = datetime.now().replace(
+                hour=0, minute=0, second=0, microsecond=0
+            ) + timedelta(days=1)
+            next_use_time = max(next_use_time, tomorrow.timestamp())
+
+        return cls._next_work_time(user, next_use_time)
+
+    def _update_available(self, user: GoldUser, only_absent=False):
+        """
+        更新用户的可用索引，未登录的用户从索引中删除
+        """
+        next_use_time = exclusive_use_time = ""
+        spider_name = ""
+        if user.cookies:
+            exclusive_use_time = self._next_use_time(user)
+            next_use_time = exclusive_use_time
+            spider_name = user.get_used_for_spider_name() or ""
+            if spider_name:
+                # 其他爬虫需等待独占时长后才可使用
+                next_use_time = max(
+                    next_use_time,
+                    self._next_work_time(
+                        user, user.get_last_use_time() + user.exclusive_time
+                    ),
+                )
+
+        self._update_index(
+            user.user_id, next_use_time, exclusive_use_time, spider_name, only_absent
+        )
 
-        if self._users_id:
-            return self._users_id.pop()
+    def _remove_available(self, user_id):
+        """
+        从可用索引中删除用户，如用户已删除
+        """
+        self._update_index(user_id, "", "", "")
+
+    def _release_user(self, user_id):
+        """
+        将取出但未使用的用户放回可用索引
+        """
+        user = self.get_user_by_id(user_id)
+        if user:
+            self._update_available(user)
+        else:
+            self._remove_available(user_id)
+
+    def _update_index(
+        self, user_id, next_use_time, exclusive_use_time, spider_name, only_absent=False
+    ):
+        cmd = self._redisdb.register_script(UPDATE_USER_LUA)
+        cmd(
+            keys=[
+                self._tab_available,
+                self._tab_exclusive,
+                self._tab_owner,
+                self._tab_leased,
+            ],
+            args=[
+                user_id,
+                next_use_time,
+                exclusive_use_time,
+                spider_name,
+                int(only_absent),
+            ],
+        )
+
+    def _pop_available_user(
+        self, username=None, used_for_spider_name=None, max_score=None
+    ):
+        """
+        原子地取出可用时间最早的用户，取出后在租约时长内其他进程不可取
+        @param max_score: 可用时间上限，默认为当前时间
+        @return: user_id
+        """
+        now = time.time()
+        cmd = self._redisdb.register_script(POP_USER_LUA)
+        return cmd(
+            keys=[
+                self._tab_available,
+                self._tab_exclusive,
+                self._tab_owner,
+                self._tab_leased,
+            ],
+            args=[
+                now,
+                self._lease_time,
+                used_for_spider_name or "",
+                username or "",
+                now if max_score is None else max_score,
+            ],
+        )
+
+    def _count_logged_out_users(self, username=None):
+        """
+        不在可用索引中的用户数，即未登录、已删除或cookie过期，需重新登录的用户
+        """
+        users = [
+            user.user_id
+            for user in self.users
+            if not username or user.username == username
+        ]
+        if username:
+            return sum(
+                1
+                for user_id in users
+                if self._redisdb.zscore(self._tab_available, user_id) is None
+                and self._redisdb.zscore(self._tab_leased, user_id) is None
+            )
+
+        return len(users) - (
+            self._redisdb.zget_count(self._tab_available)
+            + self._redisdb.zget_count(self._tab_leased)
+        )
+
+    def _wait_available(self, username=None, used_for_spider_name=None):
+        """
+        无可用用户时，登录已退出的用户，并等到最早的用户可用
+        """
+        if self._count_logged_out_users(username) > 0:
+            # 有用户已删除或cookie过期，重新登录，否则可用的用户越来越少
+            self._keep_alive = False
+            self.run(username)
+
+        if username:
+            scores = [
+                self._redisdb.zscore(self._tab_available, username),
+                self._redisdb.zscore(self._tab_exclusive, username),
+            ]
+        else:
+            scores = [
+                item[1]
+                for table in (self._tab_available, self._tab_exclusive)
+                for item in self._redisdb.zrange(table, 0, 0, withscores=True)
+            ]
+        scores = [score for score in scores if score is not None]
+
+        # 无已登录的用户（如未到登录时间）或均已被取出时，1秒后重新检查
+        wait_time = min(scores) - time.time() if scores else 1
+        if wait_time > 0:
+            log.debug("暂无可用用户，{:.1f}秒后重新检查".format(min(wait_time, 60)))
+            # 等待期间可能有新用户登录，最多等60秒重新检查
+            time.sleep(min(wait_time, 60))
 
     def login(self, user: GoldUser) -> GoldUser:
         """
@@ -115,7 +381,7 @@ class GoldUserPool(UserPoolInterface):
     def get_user_by_id(self, user_id: str) -> GoldUser:
         user_str = self._redisdb.hget(self._tab_user_pool, user_id)
         if user_str:
-            user = GoldUser(**eval(user_str))
+            user = GoldUser.from_json(user_str)
             return user
 
     def get_user(
@@ -132,80 +398,85 @@ class GoldUserPool(UserPoolInterface):
         @params not_limit_frequence: 不限制使用频率
         @return: GoldUser
         """
+        checked_users_id = set()  # 不限制使用频率时，已检查过不可用的用户
         while True:
             try:
-                user_id = username or self._get_user_id()
-                user_str = None
-                if user_id:
-                    user_str = self._redisdb.hget(self._tab_user_pool, user_id)
-
-                if (not user_id or not user_str) and block:
-                    self._keep_alive = False
-                    self.run(username)
+                # 不限制使用频率时，不按可用时间过滤，取出后再校验独占、使用次数及工作时间
+                user_id = self._pop_available_user(
+                    username,
+                    used_for_spider_name,
+                    max_score="+inf" if not_limit_use_interval else None,
+                )
+                if not user_id or user_id in checked_users_id:
+                    if user_id:
+                        # 用户均已检查过，放回并等待
+                        self._release_user(user_id)
+                        checked_users_id.clear()
+                    if not block:
+                        return None
+                    self._wait_available(username, used_for_spider_name)
                     continue
 
-                # 取到用户
-                user = GoldUser(**eval(user_str))
-
-                # 独占式使用，若为其他爬虫，检查等待使用时间是否超过独占时间，若超过则可以使用
-                if (
-                    user.get_used_for_spider_name()
-                    and user.get_used_for_spider_name() != used_for_spider_name
-                ):
-                    wait_time = time.time() - user.get_last_use_time()
-                    if wait_time < user.exclusive_time:
-                        log.info(
-                            "用户{} 被 {} 爬虫独占，需等待 {} 秒后才可使用".format(
-                                user.username,
-                                user.get_used_for_spider_name(),
-                                user.exclusive_time - wait_time,
-                            )
-                        )
-                        time.sleep(1)
-                        continue
-
-                if not user.is_overwork() and user.is_at_work_time():
-                    if not user.cookies:
-                        log.debug(f"用户 {user.username} 未登录，尝试登录")
-                        self._keep_alive = False
-                        self.run(username)
-                        continue
-
-                    if not_limit_use_interval or user.is_time_to_use():
-                        user.set_used_for_spider_name(used_for_spider_name)
-                        log.debug("使用用户 {}".format(user.username))
-                        self.record_user_status(user.user_id, GoldUserStatus.USED)
-                        return user
-                    else:
-                        log.debug("{} 用户使用间隔过短 查看下一个用户".format(user.username))
-                        time.sleep(1)
-                        continue
-                else:
-                    if not user.is_at_work_time():
-                        log.info("用户 {} 不在工作时间 sleep 60s".format(user.username))
-                        if block:
-                            time.sleep(60)
-                            continue
-                        else:
-                            return None
+                user = self.get_user_by_id(user_id)
+                if not user or not user.cookies:
+                    # 已删除或cookie已失效的用户，从索引中删除
+                    self._remove_available(user_id)
+                    continue
+
+                if self._is_available(user, used_for_spider_name):
+                    user._delay_use = 0
+                    user.set_used_for_spider_name(used_for_spider_name)
+                    self._update_available(user)
+                    log.debug("使用用户 {}".format(user.username))
+                    self.record_user_status(user.user_id, GoldUserStatus.USED)
+                    return user
+
+                # 索引与用户状态不一致（如使用次数在其他地方修改），按用户状态更新索引
+                self._update_available(user)
+                checked_users_id.add(user_id)
 
             except Exception as e:
                 log.exception(e)
                 time.sleep(1)
 
+    def _is_available(self, user: GoldUser, used_for_spider_name=None):
+        """
+        校验用户的独占、使用次数及工作时间，使用间隔由可用索引保证
+        """
+        # 独占式使用，若为其他爬虫，检查等待使用时间是否超过独占时间，若超过则可以使用
+        if (
+            user.get_used_for_spider_name()
+            and user.get_used_for_spider_name() != used_for_spider_name
+        ):
+            wait_time = time.time() - user.get_last_use_time()
+            if wait_time < user.exclusive_time:
+                log.info(
+                    "用户{} 被 {} 爬虫独占，需等待 {} 秒后才可使用".format(
+                        user.username,
+                        user.get_used_for_spider_name(),
+                        user.exclusive_time - wait_time,
+                    )
+                )
+                return False
+
+        return not user.is_overwork() and user.is_at_work_time()
+
     def del_user(self, user_id: str):
         user = self.get_user_by_id(user_id)
         if user:
             user.set_cookies(None)
+            self._remove_available(user.user_id)
             self.record_user_status(user.user_id, GoldUserStatus.OVERDUE)
 
     def add_user(self, user: GoldUser):
         user.sycn_to_redis()
+        self._update_available(user)
 
     def delay_use(self, user_id: str, delay_seconds: int):
         user = self.get_user_by_id(user_id)
         if user:
             user.set_delay_use(delay_seconds)
+            self._update_available(user)
 
         self.record_user_status(user_id, GoldUserStatus.SLEEP)
 
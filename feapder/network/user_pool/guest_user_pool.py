@@ -14,7 +14,11 @@ from typing import Optional
 import feapder.utils.tools as tools
 from feapder import setting
 from feapder.db.redisdb import RedisDB
-from feapder.network.user_pool.base_user_pool import UserPoolInterface, GuestUser
+from feapder.network.user_pool.base_user_pool import (
+    UserPoolInterface,
+    GuestUser,
+    UserCache,
+)
 from feapder.utils.log import log
 from feapder.utils.webdriver import WebDriver
 
@@ -66,9 +70,10 @@ class GuestUserPool(UserPoolInterface):
         self._kwargs.setdefault("headless", True)
 
         self._users_id = []
+        self._user_cache = UserCache(self._redisdb, self._tab_user_pool, GuestUser)
 
     def _load_users_id(self):
-        self._users_id = self._redisdb.hkeys(self._tab_user_pool)
+        self._users_id = self._user_cache.user_ids()
         if self._users_id:
             random.shuffle(self._users_id)
 
@@ -100,7 +105,7 @@ class GuestUserPool(UserPoolInterface):
 
     def add_user(self, user: GuestUser):
         log.debug("add {}".format(user))
-        self._redisdb.hset(self._tab_user_pool, user.user_id, user.to_dict())
+        self._user_cache.save(user)
 
     def get_user(self, block=True) -> Optional[GuestUser]:
         """
@@ -114,11 +119,11 @@ class GuestUserPool(UserPoolInterface):
         while True:
             try:
                 user_id = self._get_user_id()
-                user_str = None
+                user = None
                 if user_id:
-                    user_str = self._redisdb.hget(self._tab_user_pool, user_id)
+                    user = self._user_cache.get(user_id)
                     # 如果没取到user，可能是其他爬虫将此用户删除了，需要重刷新本地缓存的用户id
-                    if not user_str:
+                    if not user:
                         self._load_users_id()
                         continue
 
@@ -126,15 +131,18 @@ class GuestUserPool(UserPoolInterface):
                     self._keep_alive = False
                     self._min_users = 1
                     self.run()
+                    if not self._user_cache.count():
+                        # 其他进程正在生产user，等待其添加后唤醒
+                        self._user_cache.wait(timeout=10)
                     continue
 
-                return user_str and GuestUser(**eval(user_str))
+                return user
             except Exception as e:
                 log.exception(e)
                 tools.delay_time(1)
 
     def del_user(self, user_id: str):
-        self._redisdb.hdel(self._tab_user_pool, user_id)
+        self._user_cache.delete(user_id)
         self._load_users_id()
 
     def run(self):
@@ -16,7 +16,11 @@ import feapder.utils.tools as tools
 from feapder import setting
 from feapder.db.mysqldb import MysqlDB
 from feapder.db.redisdb import RedisDB
-from feapder.network.user_pool.base_user_pool import UserPoolInterface, NormalUser
+from feapder.network.user_pool.base_user_pool import (
+    UserPoolInterface,
+    NormalUser,
+    UserCache,
+)
 from feapder.utils.log import log
 from feapder.utils.redis_lock import RedisLock
 
@@ -65,11 +69,12 @@ class NormalUserPool(UserPoolInterface):
 
         self._redisdb = RedisDB()
         self._mysqldb = MysqlDB()
+        self._user_cache = UserCache(self._redisdb, self._tab_user_pool, NormalUser)
 
         self._create_userbase()
 
     def _load_users_id(self):
-        self._users_id = self._redisdb.hkeys(self._tab_user_pool)
+        self._users_id = self._user_cache.user_ids()
         if self._users_id:
             random.shuffle(self._users_id)
 
@@ -135,7 +140,7 @@ class NormalUserPool(UserPoolInterface):
 
     def add_user(self, user: NormalUser):
         log.debug("add {}".format(user))
-        self._redisdb.hset(self._tab_user_pool, user.user_id, user.to_dict())
+        self._user_cache.save(user)
 
         sql = "update {table_userbase} set {login_state_key} = 1 where id = {user_id}".format(
             table_userbase=self._table_userbase,
@@ -149,20 +154,23 @@ class NormalUserPool(UserPoolInterface):
         while True:
             try:
                 user_id = self._get_user_id()
-                user_str = None
+                user = None
                 if user_id:
-                    user_str = self._redisdb.hget(self._tab_user_pool, user_id)
+                    user = self._user_cache.get(user_id)
                     # 如果没取到user，可能是其他爬虫将此用户删除了，需要重刷新本地缓存的用户id
-                    if not user_str:
+                    if not user:
                         self._load_users_id()
                         continue
 
                 if not user_id and block:
                     self._keep_alive = False
                     self.run()
+                    if not self._user_cache.count():
+                        # 其他进程正在生产user，等待其添加后唤醒
+                        self._user_cache.wait(timeout=10)
                     continue
 
-                return user_str and NormalUser(**eval(user_str))
+                return user
             except Exception as e:
                 log.exception(e)
                 tools.delay_time(1)
@@ -172,7 +180,7 @@ class NormalUserPool(UserPoolInterface):
         删除失效的user
         @return:
         """
-        self._redisdb.hdel(self._tab_user_pool, user_id)
+        self._user_cache.delete(user_id)
         self._load_users_id()
 
         sql = "update {table_userbase} set {login_state_key} = 0 where id = {user_id}".format(
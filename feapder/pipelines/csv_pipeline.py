@@ -9,13 +9,155 @@ Created on 2025-10-16
 """
 
 import csv
+import datetime
+import gzip
+import io
 import os
+import queue
 import threading
+import time
+from collections import deque
 from typing import Dict, List, Tuple
 
 from feapder.pipelines import BasePipeline
 from feapder.utils.log import log
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class _CsvFileWriter:
+    """
+    常驻的CSV文件句柄，供高吞吐模式使用
+
+    文件写入 {table}.csv（压缩时为 {table}.csv.gz / {table}.csv.zst），
+    滚动时将其重命名为 {table}-{时间}.csv 后重新打开。
+    每批数据整批写入，压缩时单独压缩为一个 gzip member / zstd frame，多段拼接后解压时视为一个整体，
+    写入失败时截断到上一批的结尾，重试时不会出现半行或重复的数据
+    """
+
+    SUFFIX = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+    def __init__(self, csv_dir, table, fieldnames, compression=None):
+        self.csv_dir = csv_dir
+        self.table = table
+        self.fieldnames = fieldnames
+        self.compression = compression
+        self.path = os.path.join(csv_dir, f"{table}.csv{self.SUFFIX[compression]}")
+
+        if compression == "gzip":
+            self._compress = gzip.compress
+        elif compression == "zstd":
+            self._compress = zstandard.ZstdCompressor().compress
+        else:
+            self._compress = None
+
+        self._raw = None
+        self._header = None  # 新文件待写入的表头，与第一批数据一起写入
+        self._offset = 0  # 已完整写入的数据的结尾
+        self.broken = False  # 写入失败且未能截断，下次写入前需先截断
+        self.opened_time = None
+
+    @property
+    def opened(self):
+        return self._raw is not None
+
+    def open(self):
+        has_content = os.path.exists(self.path) and os.path.getsize(self.path) > 0
+
+        # 整批写入，不需要缓冲，写入成功即交给操作系统
+        self._raw = open(self.path, "ab", buffering=0)
+        self._offset = self._raw.seek(0, os.SEEK_END)
+        self.broken = False
+        if not has_content:
+            header = io.StringIO()
+            csv.DictWriter(header, fieldnames=self.fieldnames).writeheader()
+            self._header = header.getvalue()
+
+        self.opened_time = time.time()
+
+    @property
+    def size(self):
+        return self._offset if self._raw else 0
+
+    def _truncate(self):
+        self._raw.truncate(self._offset)
+        self._raw.seek(self._offset)
+
+    def write(self, rows):
+        """
+        写入一批数据，失败时截断到写入前的位置后抛出异常
+        Args:
+            rows: 已序列化的CSV行
+        """
+        if not self._raw:
+            self.open()
+        if self.broken:
+            self._truncate()
+            self.broken = False
+
+        data = ((self._header or "") + rows).encode("utf-8")
+        if self._compress:
+            data = self._compress(data)
+
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[self._raw.write(view) :]
+        except BaseException:
+            try:
+                self._truncate()
+            except Exception:
+                self.broken = True
+            raise
+
+        self._offset += len(data)
+        self._header = None
+
+    def sync(self):
+        """
+        将数据刷到磁盘
+        """
+        if not self._raw:
+            return
+
+        os.fsync(self._raw.fileno())
+
+    def close(self):
+        if not self._raw:
+            return
+
+        raw, self._raw = self._raw, None
+        try:
+            if self.broken:
+                # 截断未完整写入的数据后再关闭
+                raw.truncate(self._offset)
+                self.broken = False
+            os.fsync(raw.fileno())
+        finally:
+            raw.close()
+
+    def rotate(self):
+        """
+        关闭当前文件并重命名为带时间戳的文件名，下次写入时重新打开
+        """
+        self.close()
+        if not os.path.exists(self.path):
+            return
+
+        rotated_path = os.path.join(
+            self.csv_dir,
+            "{}-{}.csv{}".format(
+                self.table,
+                datetime.datetime.now().strftime("%Y%m%d%H%M%S%f"),
+                self.SUFFIX[self.compression],
+            ),
+        )
+        os.replace(self.path, rotated_path)
+        log.info(f"CSV文件已滚动: {rotated_path}")
+
 
 class CsvPipeline(BasePipeline):
     """
@@ -29,8 +171,18 @@ class CsvPipeline(BasePipeline):
     - 支持追加模式，便于断点续爬
     - 通过fsync确保数据落盘
     - 表级别的字段名缓存，确保跨批字段顺序一致
+
+    高吞吐模式（async_write=True）：
+    - 每个表常驻一个文件句柄，不再每批打开文件，每批整批写入，失败时截断，重试不会产生半行或重复的数据
+    - save_items 在调用线程校验并序列化数据后入队即返回，由独立的写入线程写文件
+    - 写入失败的批次由写入线程重试，期间 save_items 返回False，由ItemBuffer按入库失败处理
+    - 支持 gzip / zstd 压缩，按文件大小或时间滚动，按 fsync_interval 间隔刷盘
+    - 注意：进程被强制杀掉时，队列中的数据会丢失，断电时未刷盘的数据会丢失
     """
 
+    # 写入队列的结束标记
+    _STOP = object()
+
     # 用于保护每个表的文件写入操作（Per-Table Lock）
     _file_locks = {}
 
@@ -38,7 +190,7 @@ class CsvPipeline(BasePipeline):
     # 确保跨批次、跨线程的字段顺序一致
     _table_fieldnames = {}
 
-    def __init__(self, csv_dir=None):
+    def __init__(self, csv_dir=None, **kwargs):
         """
         初始化CSV Pipeline
 
@@ -47,18 +199,44 @@ class CsvPipeline(BasePipeline):
                     - 如果不传，从 setting.CSV_EXPORT_PATH 读取
                     - 支持相对路径（如 "data/csv"）
                     - 支持绝对路径（如 "/Users/xxx/exports/csv"）
+            **kwargs: 覆盖 setting.CSV_EXPORT_SETTING 中的配置，如 async_write=True
         """
         super().__init__()
 
+        import feapder.setting as setting
+
         # 如果未传入参数，从配置文件读取
         if csv_dir is None:
-            import feapder.setting as setting
             csv_dir = setting.CSV_EXPORT_PATH
 
+        export_setting = dict(getattr(setting, "CSV_EXPORT_SETTING", None) or {})
+        export_setting.update(kwargs)
+
+        self.async_write = export_setting.get("async_write", False)
+        self.compression = export_setting.get("compression") or None
+        if self.compression not in _CsvFileWriter.SUFFIX:
+            raise ValueError(f"不支持的压缩方式: {self.compression}, 可选 gzip、zstd")
+        if self.compression == "zstd" and zstandard is None:
+            raise ImportError("zstd 压缩依赖 zstandard，请先安装: pip install zstandard")
+        self.max_file_size = export_setting.get("max_file_size") or 0
+        self.rotate_interval = export_setting.get("rotate_interval") or 0
+        self.fsync_interval = export_setting.get("fsync_interval") or 0
+        self.queue_size = export_setting.get("queue_size") or 0
+
         # 支持绝对路径和相对路径，统一转换为绝对路径
         self.csv_dir = os.path.abspath(csv_dir)
         self._ensure_csv_dir_exists()
 
+        # 高吞吐模式下每个表常驻的文件句柄及写入线程
+        self._file_writers = {}
+        self._write_queue = None
+        self._write_thread = None
+        self._write_thread_lock = threading.Lock()
+        self._last_sync_time = time.time()
+        # 待写入的批次，写入失败时保留在队首重试
+        self._pending_writes = deque()
+        self._write_error = None
+
     def _ensure_csv_dir_exists(self):
         """确保CSV保存目录存在"""
         if not os.path.exists(self.csv_dir):
@@ -167,6 +345,9 @@ class CsvPipeline(BasePipeline):
         if not items:
             return True
 
+        if self.async_write:
+            return self._put_to_write_queue(table, items)
+
         csv_file = self._get_csv_file_path(table)
 
         # 使用缓存机制获取字段名（关键！确保跨批字段顺序一致）
@@ -240,15 +421,144 @@ class CsvPipeline(BasePipeline):
         # 若需要真正的UPDATE操作，建议在应用层处理
         return self.save_items(table, items)
 
+    def _put_to_write_queue(self, table, items):
+        """
+        高吞吐模式：在调用线程校验并序列化数据，入队后由写入线程写文件
+        """
+        fieldnames = self._get_and_cache_fieldnames(table, items)
+        if not fieldnames:
+            log.warning(f"无法提取字段名，items: {items}")
+            return False
+
+        if self._write_error:
+            # 写入线程有失败的批次待重试，暂不接收数据，由ItemBuffer按入库失败处理
+            log.error(
+                f"CSV写入失败, {len(self._pending_writes)} 批数据待重试. table: {table}, error: {self._write_error}"
+            )
+            return False
+
+        try:
+            # 字段不一致等错误在此抛出，与同步模式一样返回False由ItemBuffer重试
+            buffer = io.StringIO()
+            csv.DictWriter(buffer, fieldnames=fieldnames).writerows(items)
+        except Exception as e:
+            log.error(f"CSV写入失败. table: {table}, error: {e}")
+            return False
+
+        if not self._write_thread:
+            with self._write_thread_lock:
+                if not self._write_thread:
+                    self._write_queue = queue.Queue(maxsize=self.queue_size)
+                    self._write_thread = threading.Thread(
+                        target=self._write_loop, name="CsvPipelineWriter", daemon=True
+                    )
+                    self._write_thread.start()
+
+        self._write_queue.put((table, buffer.getvalue(), len(items)))
+        return True
+
+    def _get_file_writer(self, table):
+        file_writer = self._file_writers.get(table)
+        if not file_writer:
+            file_writer = _CsvFileWriter(
+                self.csv_dir,
+                table,
+                CsvPipeline._table_fieldnames[table],
+                compression=self.compression,
+            )
+            self._file_writers[table] = file_writer
+        return file_writer
+
+    def _need_rotate(self, file_writer):
+        if not file_writer.opened:
+            return False
+        if self.max_file_size and file_writer.size >= self.max_file_size:
+            return True
+        if self.rotate_interval and (
+            time.time() - file_writer.opened_time >= self.rotate_interval
+        ):
+            return True
+        return False
+
+    def _sync_files(self):
+        for file_writer in self._file_writers.values():
+            try:
+                file_writer.sync()
+            except Exception as e:
+                log.error(f"CSV刷盘失败. table: {file_writer.table}, error: {e}")
+        self._last_sync_time = time.time()
+
+    def _write_pending(self):
+        """
+        按顺序写入待写入的批次，失败时保留在队首，下次重试
+        """
+        while self._pending_writes:
+            table, rows, count = self._pending_writes[0]
+            file_writer = self._get_file_writer(table)
+            try:
+                with self._get_lock(table):
+                    if self._need_rotate(file_writer):
+                        file_writer.rotate()
+                    file_writer.write(rows)
+            except Exception as e:
+                log.error(
+                    f"CSV写入失败, {count} 条数据稍后重试. table: {table}, csv_file: {file_writer.path}, error: {e}"
+                )
+                # 已写入的部分已截断（截断失败时在重试前截断），重试时接着写入
+                self._write_error = e
+                return False
+
+            self._pending_writes.popleft()
+            log.info(
+                f"共导出 {count} 条数据 到 {table}.csv (文件路径: {file_writer.path})"
+            )
+
+        self._write_error = None
+        return True
+
+    def _write_loop(self):
+        """
+        写入线程：消费队列，写入常驻的文件句柄，并按间隔刷盘
+        """
+        while True:
+            try:
+                task = self._write_queue.get(timeout=self.fsync_interval or 1)
+            except queue.Empty:
+                task = None
+
+            if task is self._STOP:
+                self._write_pending()
+                break
+
+            if task:
+                self._pending_writes.append(task)
+            if self._pending_writes:
+                self._write_pending()
+
+            if time.time() - self._last_sync_time >= self.fsync_interval:
+                self._sync_files()
+
     def close(self):
         """
         关闭Pipeline，释放资源
 
-        在爬虫结束时由ItemBuffer自动调用。
+        在爬虫结束时由ItemBuffer自动调用。高吞吐模式下会等待队列写完并关闭文件。
         """
         try:
-            # 清理文件锁字典（可选，用于释放内存）
-            # 在长期运行的场景下，可能需要定期清理
-            pass
+            if self._write_thread:
+                self._write_queue.put(self._STOP)
+                self._write_thread.join()
+                self._write_thread = None
+
+            # 关闭时仍写入失败的数据记录到日志，不静默丢弃
+            for table, rows, count in self._pending_writes:
+                log.error(
+                    f"CSV写入失败, {count} 条数据记录到日志. table: {table}, rows:\n{rows}"
+                )
+            self._pending_writes.clear()
+
+            for file_writer in self._file_writers.values():
+                file_writer.close()
+            self._file_writers.clear()
         except Exception as e:
             log.error(f"关闭CSV Pipeline时出错: {e}")
@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: JSON Lines（NDJSON）数据导出Pipeline
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import datetime
+import gzip
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Dict, List, Tuple
+
+from feapder.pipelines import BasePipeline
+from feapder.utils import fast_json
+from feapder.utils.log import log
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class _Segment:
+    """
+    一个正在写入的数据分段文件。写入时为 {文件名}.{pid}.tmp，关闭后重命名为正式文件名。
+    压缩时每批数据单独压缩为一个 gzip member / zstd frame 追加写入，多段拼接后解压时视为一个整体，
+    写入失败时可截断到上一批的结尾，分段中只保留完整的批次
+    """
+
+    SUFFIX = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+    def __init__(self, jsonl_dir, table, compression=None):
+        self.path = os.path.join(
+            jsonl_dir,
+            "{}-{}.jsonl{}".format(
+                table,
+                datetime.datetime.now().strftime("%Y%m%d%H%M%S%f"),
+                self.SUFFIX[compression],
+            ),
+        )
+        self.tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        self.opened_time = time.time()
+
+        if compression == "gzip":
+            self._compress = gzip.compress
+        elif compression == "zstd":
+            self._compress = zstandard.ZstdCompressor().compress
+        else:
+            self._compress = None
+
+        # 整批写入，不需要缓冲，写入成功即交给操作系统
+        self._raw = open(self.tmp_path, "wb", buffering=0)
+        # 写入失败且无法截断，分段中有不完整的数据
+        self.broken = False
+
+    @property
+    def size(self):
+        return self._raw.tell()
+
+    def write(self, data: bytes):
+        """
+        写入一批数据，失败时截断到写入前的位置后抛出异常
+        """
+        if self._compress:
+            data = self._compress(data)
+
+        offset = self._raw.tell()
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[self._raw.write(view) :]
+        except BaseException:
+            try:
+                self._raw.truncate(offset)
+                self._raw.seek(offset)
+            except Exception:
+                self.broken = True
+            raise
+
+    def close(self):
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+        os.replace(self.tmp_path, self.path)
+
+    def discard(self):
+        """
+        关闭但不发布，保留 .tmp 文件由 recover_segment 恢复
+        """
+        try:
+            self._raw.close()
+        except Exception:
+            pass
+
+
+def _decompressobj(compression):
+    if compression == "gzip":
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    return zstandard.ZstdDecompressor().decompressobj()
+
+
+def _complete_length(file, compression, chunk_size=64 * 1024):
+    """
+    分段文件中完整数据的字节数：未压缩时到最后一个换行，压缩时到最后一个完整的 gzip member / zstd frame
+    """
+    if not compression:
+        size = file.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            start = max(0, end - chunk_size)
+            file.seek(start)
+            index = file.read(end - start).rfind(b"\n")
+            if index >= 0:
+                return start + index + 1
+            end = start
+        return 0
+
+    length = position = 0
+    decompressor = _decompressobj(compression)
+    try:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            while chunk:
+                decompressor.decompress(chunk)
+                if not decompressor.eof:
+                    position += len(chunk)
+                    break
+                rest = decompressor.unused_data
+                position += len(chunk) - len(rest)
+                length = position
+                decompressor = _decompressobj(compression)
+                chunk = rest
+    except Exception:
+        # 不完整或损坏的数据
+        pass
+    return length
+
+
+def recover_segment(tmp_path):
+    """
+    恢复进程崩溃时残留的分段：截断不完整的批次后重命名为正式文件名
+    Args:
+        tmp_path: {文件名}.{pid}.tmp
+
+    Returns: 恢复后的文件路径，没有完整数据时删除文件并返回None
+    """
+    path = tmp_path.rsplit(".", 2)[0]
+    compression = {".gz": "gzip", ".zst": "zstd"}.get(os.path.splitext(path)[1])
+
+    with open(tmp_path, "rb+") as file:
+        length = _complete_length(file, compression)
+        file.truncate(length)
+        os.fsync(file.fileno())
+
+    if not length:
+        os.remove(tmp_path)
+        return None
+
+    os.replace(tmp_path, path)
+    return path
+
+
+def _is_process_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except Exception:
+        # 无权限等，视为存活
+        return True
+    return True
+
+
+class JsonlPipeline(BasePipeline):
+    """
+    JSON Lines（NDJSON）数据导出Pipeline
+
+    特点：
+    - 有 orjson 时使用 orjson 序列化（pip install orjson），否则使用标准库
+    - 支持 gzip / zstd（需安装zstandard）流式压缩
+    - 按文件大小或写入时长滚动分段，文件名为 {table}-{时间}.jsonl[.gz|.zst]
+    - 写入中的分段以 .tmp 结尾，写完后重命名，下游只会看到完整的文件
+    - 写入失败时分段截断到上一批的结尾，由ItemBuffer重试；进程崩溃残留的 .tmp 在下次启动时截断不完整的批次后发布
+    """
+
+    def __init__(self, jsonl_dir=None, **kwargs):
+        """
+        Args:
+            jsonl_dir: 文件保存目录，默认为 setting.JSONL_EXPORT_PATH
+            **kwargs: 覆盖 setting.JSONL_EXPORT_SETTING 中的配置
+        """
+        super().__init__()
+
+        import feapder.setting as setting
+
+        if jsonl_dir is None:
+            jsonl_dir = setting.JSONL_EXPORT_PATH
+
+        export_setting = dict(setting.JSONL_EXPORT_SETTING)
+        export_setting.update(kwargs)
+
+        self.compression = export_setting.get("compression") or None
+        if self.compression not in _Segment.SUFFIX:
+            raise ValueError(f"不支持的压缩方式: {self.compression}, 可选 gzip、zstd")
+        if self.compression == "zstd" and zstandard is None:
+            raise ImportError("zstd 压缩依赖 zstandard，请先安装: pip install zstandard")
+        self.max_file_size = export_setting.get("max_file_size") or 0
+        self.rotate_interval = export_setting.get("rotate_interval") or 0
+
+        self.jsonl_dir = os.path.abspath(jsonl_dir)
+        os.makedirs(self.jsonl_dir, exist_ok=True)
+
+        self._segments = {}
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+        self._recover_segments()
+
+    def _recover_segments(self):
+        """
+        恢复上次进程崩溃时残留的 .tmp 分段，其他存活进程正在写入的分段不处理
+        """
+        for file_name in os.listdir(self.jsonl_dir):
+            match = re.match(r".+\.jsonl(?:\.gz|\.zst)?\.(\d+)\.tmp$", file_name)
+            if not match or _is_process_alive(int(match.group(1))):
+                continue
+
+            tmp_path = os.path.join(self.jsonl_dir, file_name)
+            try:
+                path = recover_segment(tmp_path)
+                log.info(f"已恢复上次未完成的数据文件: {path or tmp_path}")
+            except Exception as e:
+                log.error(f"恢复JSONL文件失败: {tmp_path}, error: {e}")
+
+    def _get_lock(self, table):
+        lock = self._locks.get(table)
+        if not lock:
+            with self._locks_lock:
+                lock = self._locks.setdefault(table, threading.Lock())
+        return lock
+
+    def _need_rotate(self, segment: _Segment):
+        if self.max_file_size and segment.size >= self.max_file_size:
+            return True
+        if self.rotate_interval and (
+            time.time() - segment.opened_time >= self.rotate_interval
+        ):
+            return True
+        return False
+
+    def _close_segment(self, table):
+        segment = self._segments.pop(table, None)
+        if segment:
+            segment.close()
+            log.info(f"表 {table} 数据文件已生成: {segment.path}")
+
+    def save_items(self, table, items: List[Dict]) -> bool:
+        """
+        保存数据
+        Args:
+            table: 表名
+            items: 数据，[{},{},...]
+
+        Returns: 是否保存成功 True / False
+                 若False，不会将本批数据入到去重库，以便再次入库
+
+        """
+        if not items:
+            return True
+
+        try:
+            data = fast_json.dumps_lines(items)
+            with self._get_lock(table):
+                segment = self._segments.get(table)
+                if segment and self._need_rotate(segment):
+                    self._close_segment(table)
+                    segment = None
+
+                if not segment:
+                    segment = _Segment(self.jsonl_dir, table, self.compression)
+                    self._segments[table] = segment
+
+                segment.write(data)
+
+            log.info(f"共导出 {len(items)} 条数据 到 {table} (文件路径: {segment.path})")
+            return True
+
+        except Exception as e:
+            log.exception(e)
+            log.error(f"JSONL写入失败. table: {table}, error: {e}")
+            # 写入失败时分段已截断到上一批的结尾，由ItemBuffer重试本批数据。截断也失败时，分段留待下次启动时恢复
+            with self._get_lock(table):
+                segment = self._segments.get(table)
+                if segment and segment.broken:
+                    self._segments.pop(table).discard()
+            return False
+
+    def update_items(self, table, items: List[Dict], update_keys=Tuple) -> bool:
+        """
+        JSONL 文件不支持更新，按追加写入处理
+        """
+        return self.save_items(table, items)
+
+    def close(self):
+        """
+        关闭并重命名所有分段文件
+        """
+        for table in list(self._segments.keys()):
+            with self._get_lock(table):
+                try:
+                    self._close_segment(table)
+                except Exception as e:
+                    log.error(f"关闭JSONL文件出错. table: {table}, error: {e}")
@@ -0,0 +1,446 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: Parquet / Arrow IPC 列式数据导出Pipeline
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import datetime
+import os
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import feapder.utils.tools as tools
+from feapder.pipelines import BasePipeline
+from feapder.utils import fast_json
+from feapder.utils.log import log
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+
+class _TableWriter:
+    """
+    单个表的写入状态：行缓冲 + 当前文件的writer
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.lock = threading.Lock()
+        self.rows = []
+        self.first_buffered_time = None
+
+        self.writer = None
+        self.sink = None
+        self.schema = None
+        self.tmp_path = None
+        self.path = None
+        self.opened_time = None
+
+
+class ParquetPipeline(BasePipeline):
+    """
+    Parquet / Arrow IPC 列式数据导出Pipeline，依赖 pyarrow（pip install pyarrow）
+
+    特点：
+    - 按表缓冲数据，攒够 row_group_size 行或超过 flush_interval 秒写入一个行组
+    - 新增字段时自动滚动到新文件（新文件的schema为新旧字段的合集），缺失字段补null
+    - 按文件大小或写入时长滚动文件
+    - 写入中的文件以 .tmp 结尾，关闭时重命名，下游不会读到不完整的文件
+    - 后台线程按 flush_interval、rotate_interval 定时写入及滚动，没有新数据的表也会按时落盘
+
+    文件名为 {table}-{时间}.parquet 或 {table}-{时间}.arrow
+
+    注意：非持久化写入。save_items 返回True时数据可能仍在缓冲或未关闭的 .tmp 文件中（文件关闭时才写入footer），
+    进程崩溃时会丢失最近 rotate_interval 内的数据。对数据完整性要求高时请调小 rotate_interval 或使用其他pipeline
+    已返回True的数据写入失败且无法恢复时（如数据本身有问题），转存到 {table}-{时间}.failed.jsonl 并打印错误日志
+    """
+
+    FILE_SUFFIX = {"parquet": "parquet", "arrow": "arrow"}
+
+    def __init__(self, parquet_dir=None, **kwargs):
+        """
+        Args:
+            parquet_dir: 文件保存目录，默认为 setting.PARQUET_EXPORT_PATH
+            **kwargs: 覆盖 setting.PARQUET_EXPORT_SETTING 中的配置
+        """
+        super().__init__()
+
+        if pa is None:
+            raise ImportError("ParquetPipeline 依赖 pyarrow，请先安装: pip install pyarrow")
+
+        import feapder.setting as setting
+
+        if parquet_dir is None:
+            parquet_dir = setting.PARQUET_EXPORT_PATH
+
+        export_setting = dict(setting.PARQUET_EXPORT_SETTING)
+        export_setting.update(kwargs)
+
+        self.file_format = export_setting.get("file_format", "parquet")
+        if self.file_format not in self.FILE_SUFFIX:
+            raise ValueError(f"不支持的文件格式: {self.file_format}, 可选 parquet、arrow")
+
+        compression = export_setting.get("compression", "zstd")
+        self.compression = None if compression in (None, "none") else compression
+        if self.file_format == "arrow" and self.compression not in (
+            None,
+            "zstd",
+            "lz4",
+        ):
+            raise ValueError(f"arrow 格式仅支持 zstd、lz4 压缩, 当前为: {compression}")
+        self.row_group_size = export_setting.get("row_group_size") or 10000
+        self.flush_interval = export_setting.get("flush_interval") or 0
+        self.max_file_size = export_setting.get("max_file_size") or 0
+        self.rotate_interval = export_setting.get("rotate_interval") or 0
+
+        self.parquet_dir = os.path.abspath(parquet_dir)
+        os.makedirs(self.parquet_dir, exist_ok=True)
+
+        self._table_writers = {}
+        self._table_writers_lock = threading.Lock()
+
+        # 定时写入及滚动的线程
+        self._flush_thread = None
+        self._flush_thread_lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def _get_table_writer(self, table) -> _TableWriter:
+        table_writer = self._table_writers.get(table)
+        if not table_writer:
+            with self._table_writers_lock:
+                table_writer = self._table_writers.setdefault(
+                    table, _TableWriter(table)
+                )
+        return table_writer
+
+    @staticmethod
+    def _format_value(value):
+        # 嵌套结构在不同item间字段不一致时会导致schema频繁变化，统一转为json字符串
+        if isinstance(value, (list, dict, tuple)):
+            return tools.dumps_json(value, indent=None)
+        if isinstance(value, datetime.time):
+            return str(value)
+        return value
+
+    def _to_arrow_table(self, rows):
+        columns = {}
+        for row in rows:
+            for key in row:
+                columns[key] = None
+
+        datas = {
+            column: [self._format_value(row.get(column)) for row in rows]
+            for column in columns
+        }
+        arrays = []
+        for column, values in datas.items():
+            try:
+                arrays.append(pa.array(values))
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # 同一字段类型不一致，如 int 与 str 混用，退化为字符串
+                arrays.append(
+                    pa.array([None if v is None else str(v) for v in values])
+                )
+
+        return pa.Table.from_arrays(arrays, names=list(datas.keys()))
+
+    @staticmethod
+    def _merge_type(old_type, new_type):
+        if old_type == new_type or pa.types.is_null(new_type):
+            return old_type
+        if pa.types.is_null(old_type):
+            return new_type
+        if pa.types.is_integer(old_type) and pa.types.is_integer(new_type):
+            return pa.int64()
+        if (pa.types.is_integer(old_type) or pa.types.is_floating(old_type)) and (
+            pa.types.is_integer(new_type) or pa.types.is_floating(new_type)
+        ):
+            return pa.float64()
+        return pa.string()
+
+    @classmethod
+    def _merge_schema(cls, file_schema, batch_schema):
+        """
+        合并schema。返回 (新schema, 是否需要换文件)
+        """
+        fields = {field.name: field for field in file_schema}
+        need_new_file = False
+        for field in batch_schema:
+            old_field = fields.get(field.name)
+            if old_field is None:
+                fields[field.name] = field
+                need_new_file = True
+                continue
+
+            merged_type = cls._merge_type(old_field.type, field.type)
+            if merged_type != old_field.type:
+                fields[field.name] = pa.field(field.name, merged_type)
+                need_new_file = True
+
+        return pa.schema(list(fields.values())), need_new_file
+
+    @staticmethod
+    def _conform_to_schema(arrow_table, schema):
+        """
+        将本批数据对齐到文件的schema：缺失的列补null，类型按schema转换
+        """
+        arrays = []
+        for field in schema:
+            if field.name in arrow_table.column_names:
+                column = arrow_table.column(field.name)
+                if column.type != field.type:
+                    if pa.types.is_string(field.type) and not pa.types.is_null(
+                        column.type
+                    ):
+                        column = pa.array(
+                            [None if v is None else str(v) for v in column.to_pylist()],
+                            type=field.type,
+                        )
+                    else:
+                        column = column.cast(field.type)
+                arrays.append(column)
+            else:
+                arrays.append(pa.nulls(arrow_table.num_rows, type=field.type))
+
+        return pa.Table.from_arrays(arrays, schema=schema)
+
+    def _open_file(self, table_writer: _TableWriter, schema):
+        file_name = "{}-{}.{}".format(
+            table_writer.table,
+            datetime.datetime.now().strftime("%Y%m%d%H%M%S%f"),
+            self.FILE_SUFFIX[self.file_format],
+        )
+        table_writer.path = os.path.join(self.parquet_dir, file_name)
+        table_writer.tmp_path = table_writer.path + ".tmp"
+        table_writer.schema = schema
+        table_writer.opened_time = time.time()
+
+        if self.file_format == "parquet":
+            table_writer.writer = pq.ParquetWriter(
+                table_writer.tmp_path, schema, compression=self.compression
+            )
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=self.compression)
+            table_writer.sink = pa.OSFile(table_writer.tmp_path, "wb")
+            table_writer.writer = pa.ipc.new_file(
+                table_writer.sink, schema, options=options
+            )
+
+    def _close_file(self, table_writer: _TableWriter):
+        if not table_writer.writer:
+            return
+
+        table_writer.writer.close()
+        if table_writer.sink:
+            table_writer.sink.close()
+            table_writer.sink = None
+        os.replace(table_writer.tmp_path, table_writer.path)
+        log.info(f"表 {table_writer.table} 数据文件已生成: {table_writer.path}")
+
+        table_writer.writer = None
+        table_writer.tmp_path = None
+        table_writer.path = None
+
+    def _need_rotate(self, table_writer: _TableWriter):
+        if self.rotate_interval and (
+            time.time() - table_writer.opened_time >= self.rotate_interval
+        ):
+            return True
+        if self.max_file_size and (
+            os.path.getsize(table_writer.tmp_path) >= self.max_file_size
+        ):
+            return True
+        return False
+
+    def _flush_table(self, table_writer: _TableWriter):
+        """
+        将缓冲的数据作为一个行组写入文件，调用方需持有 table_writer.lock
+        """
+        if not table_writer.rows:
+            return
+
+        arrow_table = self._to_arrow_table(table_writer.rows)
+
+        if table_writer.writer:
+            schema, need_new_file = self._merge_schema(
+                table_writer.schema, arrow_table.schema
+            )
+            if need_new_file or self._need_rotate(table_writer):
+                self._close_file(table_writer)
+        else:
+            schema = arrow_table.schema
+
+        if not table_writer.writer:
+            self._open_file(table_writer, schema)
+
+        arrow_table = self._conform_to_schema(arrow_table, table_writer.schema)
+        if self.file_format == "parquet":
+            table_writer.writer.write_table(
+                arrow_table, row_group_size=self.row_group_size
+            )
+        else:
+            table_writer.writer.write_table(arrow_table)
+
+        log.info(
+            f"共导出 {len(table_writer.rows)} 条数据 到 {table_writer.table} (文件路径: {table_writer.path})"
+        )
+        table_writer.rows = []
+        table_writer.first_buffered_time = None
+
+    def _set_aside_rows(self, table_writer: _TableWriter, error):
+        """
+        将缓冲中无法写入的数据转存为jsonl文件，避免反复重试拖垮后续写入。调用方需持有 table_writer.lock
+        这些数据 save_items 已返回过True，不能再交给ItemBuffer重试
+        """
+        rows = table_writer.rows
+        table_writer.rows = []
+        table_writer.first_buffered_time = None
+        if not rows:
+            return
+
+        path = os.path.join(
+            self.parquet_dir,
+            "{}-{}.failed.jsonl".format(
+                table_writer.table, datetime.datetime.now().strftime("%Y%m%d%H%M%S%f")
+            ),
+        )
+        try:
+            with open(path, "ab") as file:
+                file.write(fast_json.dumps_lines(rows))
+        except Exception as e:
+            log.exception(e)
+            log.error(
+                f"表 {table_writer.table} 有 {len(rows)} 条数据无法写入{self.file_format}文件，转存也失败，数据如下: {rows}"
+            )
+        else:
+            log.error(
+                f"表 {table_writer.table} 有 {len(rows)} 条数据无法写入{self.file_format}文件，已转存到 {path}，请检查后手动导入. error: {error}"
+            )
+
+    def save_items(self, table, items: List[Dict]) -> bool:
+        """
+        保存数据。数据先缓冲，攒够一个行组或超过 flush_interval 后写入文件
+
+        Args:
+            table: 表名
+            items: 数据，[{},{},...]
+
+        Returns: 是否保存成功 True / False
+        """
+        if not items:
+            return True
+
+        self._start_flush_thread()
+
+        table_writer = self._get_table_writer(table)
+        try:
+            with table_writer.lock:
+                table_writer.rows.extend(items)
+                if table_writer.first_buffered_time is None:
+                    table_writer.first_buffered_time = time.time()
+
+                if len(table_writer.rows) >= self.row_group_size or (
+                    self.flush_interval
+                    and time.time() - table_writer.first_buffered_time
+                    >= self.flush_interval
+                ):
+                    self._flush_table(table_writer)
+
+            return True
+
+        except Exception as e:
+            log.exception(e)
+            log.error(f"{self.file_format} 写入失败. table: {table}, error: {e}")
+            with table_writer.lock:
+                # 本批数据移出缓冲，交由ItemBuffer重试，避免重复写入
+                del table_writer.rows[-len(items) :]
+                # 之前已返回成功的数据单独写入，仍失败说明这些数据本身写不进去，转存后不再重试
+                try:
+                    self._flush_table(table_writer)
+                except Exception as e:
+                    log.exception(e)
+                    self._set_aside_rows(table_writer, e)
+            return False
+
+    def _start_flush_thread(self):
+        if self._flush_thread or not (self.flush_interval or self.rotate_interval):
+            return
+
+        with self._flush_thread_lock:
+            if not self._flush_thread:
+                self._flush_thread = threading.Thread(
+                    target=self._flush_loop, name="ParquetPipelineFlusher", daemon=True
+                )
+                self._flush_thread.start()
+
+    def _flush_loop(self):
+        """
+        定时将超过 flush_interval 的缓冲写入文件，关闭超过 rotate_interval 的文件
+        """
+        check_interval = min(
+            interval
+            for interval in (self.flush_interval, self.rotate_interval, 1)
+            if interval
+        )
+        while not self._stop_event.wait(check_interval):
+            for table_writer in list(self._table_writers.values()):
+                with table_writer.lock:
+                    try:
+                        if (
+                            self.flush_interval
+                            and table_writer.first_buffered_time is not None
+                            and time.time() - table_writer.first_buffered_time
+                            >= self.flush_interval
+                        ):
+                            self._flush_table(table_writer)
+
+                        if (
+                            self.rotate_interval
+                            and table_writer.writer
+                            and time.time() - table_writer.opened_time
+                            >= self.rotate_interval
+                        ):
+                            self._close_file(table_writer)
+                    except Exception as e:
+                        log.exception(e)
+                        log.error(
+                            f"{self.file_format} 定时写入失败, 稍后重试. table: {table_writer.table}, error: {e}"
+                        )
+
+    def update_items(self, table, items: List[Dict], update_keys=Tuple) -> bool:
+        """
+        列式文件不支持更新，按追加写入处理
+        """
+        return self.save_items(table, items)
+
+    def close(self):
+        """
+        写出剩余缓冲，关闭并重命名所有文件。剩余缓冲写入失败时转存为jsonl文件
+        """
+        if self._flush_thread:
+            self._stop_event.set()
+            self._flush_thread.join()
+            self._flush_thread = None
+            self._stop_event.clear()
+
+        for table_writer in list(self._table_writers.values()):
+            with table_writer.lock:
+                try:
+                    self._flush_table(table_writer)
+                except Exception as e:
+                    log.exception(e)
+                    self._set_aside_rows(table_writer, e)
+
+                try:
+                    self._close_file(table_writer)
+                except Exception as e:
+                    log.exception(e)
+                    log.error(f"关闭{self.file_format}文件出错. table: {table_writer.table}, error: {e}")
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: SQLite 数据导出Pipeline，适用于单机采集
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Tuple
+
+import feapder.utils.tools as tools
+from feapder.pipelines import BasePipeline
+from feapder.utils.log import log
+
+
+class SqlitePipeline(BasePipeline):
+    """
+    SQLite 数据导出Pipeline，无需部署数据库服务，数据可直接用sql查询
+
+    特点：
+    - 开启 WAL 模式，读写互不阻塞
+    - 每批数据在一个事务内用 executemany 批量写入
+    - 表不存在时根据数据自动建表，出现新字段时自动加列
+    - save_items 为 INSERT OR IGNORE，与 MysqlPipeline 的 insert ignore 一致
+    - update_items 为 INSERT ... ON CONFLICT DO UPDATE，配合 UpdateItem 使用
+
+    唯一索引：按 unique_keys 中配置的字段建立唯一索引（与Item的__unique_key__保持一致即可），
+    如 unique_keys={"spider_data": ("url",)}，已存在的表也会补建。未配置时使用表中已有的唯一索引或主键。
+    update_items 依赖唯一索引判断数据是否已存在，表没有唯一索引时不执行更新，返回False
+    """
+
+    SQLITE_TYPES = ((bool, "INTEGER"), (int, "INTEGER"), (float, "REAL"), (bytes, "BLOB"))
+
+    def __init__(self, db_path=None, **kwargs):
+        """
+        Args:
+            db_path: 数据库文件路径，默认为 setting.SQLITE_EXPORT_PATH
+            **kwargs: 覆盖 setting.SQLITE_EXPORT_SETTING 中的配置
+        """
+        super().__init__()
+
+        import feapder.setting as setting
+
+        if db_path is None:
+            db_path = setting.SQLITE_EXPORT_PATH
+
+        export_setting = dict(setting.SQLITE_EXPORT_SETTING)
+        export_setting.update(kwargs)
+
+        self.unique_keys = {
+            table: (keys,) if isinstance(keys, str) else tuple(keys)
+            for table, keys in (export_setting.get("unique_keys") or {}).items()
+        }
+        self.synchronous = export_setting.get("synchronous") or "NORMAL"
+
+        self.db_path = os.path.abspath(db_path)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+
+        self._conn = None
+        self._lock = threading.Lock()
+        # 缓存每个表已有的字段 {table: {column, ...}}
+        self._table_columns = {}
+        # 缓存每个表的唯一索引字段 {table: (column, ...)}，没有唯一索引时为None
+        self._table_unique_keys = {}
+        # 已按 unique_keys 建立过唯一索引的表
+        self._unique_indexed_tables = set()
+
+    @property
+    def conn(self):
+        if not self._conn:
+            self._conn = sqlite3.connect(
+                self.db_path, check_same_thread=False, isolation_level=None
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(f"PRAGMA synchronous={self.synchronous}")
+
+        return self._conn
+
+    @classmethod
+    def _get_column_type(cls, value):
+        for python_type, sqlite_type in cls.SQLITE_TYPES:
+            if isinstance(value, python_type):
+                return sqlite_type
+        return "TEXT"
+
+    def _get_table_columns(self, table):
+        if table not in self._table_columns:
+            cursor = self.conn.execute(f'PRAGMA table_info("{table}")')
+            self._table_columns[table] = {row[1] for row in cursor.fetchall()}
+        return self._table_columns[table]
+
+    @staticmethod
+    def _format_value(value):
+        if isinstance(value, (tuple, set)):
+            # sqlite不支持绑定元组，与列表一样存为json
+            value = list(value)
+        return tools.format_sql_value(value)
+
+    def _get_unique_key(self, table):
+        """
+        获取表的唯一索引字段，取第一个唯一索引，没有时取主键
+        """
+        if table not in self._table_unique_keys:
+            unique_key = None
+            for index in self.conn.execute(f'PRAGMA index_list("{table}")').fetchall():
+                # (seq, name, unique, origin, partial)
+                if not index[2] or index[4]:
+                    continue
+                unique_key = tuple(
+                    row[2]
+                    for row in self.conn.execute(f'PRAGMA index_info("{index[1]}")')
+                )
+                if None not in unique_key:  # 排除表达式索引
+                    break
+                unique_key = None
+
+            if not unique_key:
+                # rowid表的 INTEGER PRIMARY KEY 不在index_list中
+                pk_columns = sorted(
+                    (row[5], row[1])
+                    for row in self.conn.execute(f'PRAGMA table_info("{table}")')
+                    if row[5]
+                )
+                unique_key = tuple(column for _, column in pk_columns) or None
+
+            self._table_unique_keys[table] = unique_key
+        return self._table_unique_keys[table]
+
+    def _ensure_unique_index(self, table, exist_columns):
+        """
+        按 unique_keys 建立唯一索引，表已存在时同样补建
+        """
+        unique_key = self.unique_keys.get(table)
+        if not unique_key or table in self._unique_indexed_tables:
+            return
+        if not set(unique_key) <= exist_columns:
+            # 唯一索引的字段尚未出现在数据中
+            return
+
+        try:
+            self.conn.execute(
+                'CREATE UNIQUE INDEX IF NOT EXISTS "uk_{table}" ON "{table}" ({keys})'.format(
+                    table=table,
+                    keys=", ".join(f'"{key}"' for key in unique_key),
+                )
+            )
+        except sqlite3.IntegrityError as e:
+            # 已有重复数据，不影响插入，更新时会因没有唯一索引而失败
+            log.error(f"表 {table} 建立唯一索引 {unique_key} 失败，请先清理重复数据: {e}")
+        self._unique_indexed_tables.add(table)
+        self._table_unique_keys.pop(table, None)
+
+    def _ensure_table(self, table, columns, datas):
+        """
+        表不存在时自动建表，缺少字段时自动加列，并按 unique_keys 建立唯一索引
+        """
+        exist_columns = self._get_table_columns(table)
+        missing_columns = [column for column in columns if column not in exist_columns]
+        if not missing_columns:
+            self._ensure_unique_index(table, exist_columns)
+            return
+
+        # 取第一个非空值推断字段类型
+        column_types = {}
+        for column in missing_columns:
+            value = next(
+                (data[column] for data in datas if data.get(column) is not None), None
+            )
+            column_types[column] = self._get_column_type(value)
+
+        if not exist_columns:
+            columns_sql = ", ".join(
+                f'"{column}" {column_types[column]}' for column in missing_columns
+            )
+            self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({columns_sql})')
+            log.info(
+                f"自动创建表 {table}, 字段: {missing_columns}, 唯一索引: {self.unique_keys.get(table)}"
+            )
+        else:
+            for column in missing_columns:
+                self.conn.execute(
+                    f'ALTER TABLE "{table}" ADD COLUMN "{column}" {column_types[column]}'
+                )
+            log.info(f"表 {table} 新增字段: {missing_columns}")
+
+        exist_columns.update(missing_columns)
+        self._ensure_unique_index(table, exist_columns)
+
+    def _make_sql(self, table, columns, update_keys=None):
+        keys = ", ".join(f'"{column}"' for column in columns)
+        values_placeholder = ", ".join(["?"] * len(columns))
+
+        if update_keys is None:
+            return f'INSERT OR IGNORE INTO "{table}" ({keys}) VALUES ({values_placeholder})'
+
+        unique_key = self._get_unique_key(table)
+        if not unique_key:
+            # 没有唯一索引时无法判断数据是否已存在，直接插入会产生重复数据
+            raise ValueError(
+                f"表 {table} 没有唯一索引，无法更新数据，请在 SQLITE_EXPORT_SETTING 的 unique_keys 中配置"
+            )
+
+        conflict_target = ", ".join(f'"{key}"' for key in unique_key)
+        update_columns = [
+            column
+            for column in update_keys
+            if column in columns and column not in unique_key
+        ]
+        if not update_columns:
+            return f'INSERT OR IGNORE INTO "{table}" ({keys}) VALUES ({values_placeholder})'
+
+        update_sql = ", ".join(f'"{column}"=excluded."{column}"' for column in update_columns)
+        return f'INSERT INTO "{table}" ({keys}) VALUES ({values_placeholder}) ON CONFLICT({conflict_target}) DO UPDATE SET {update_sql}'
+
+    def _execute_batch(self, table, items, update_keys=None):
+        columns = tuple(dict.fromkeys(key for item in items for key in item))
+        values = [
+            [self._format_value(item.get(column)) for column in columns]
+            for item in items
+        ]
+
+        with self._lock:
+            self._ensure_table(table, columns, items)
+            sql = self._make_sql(table, columns, update_keys)
+
+            conn = self.conn
+            conn.execute("BEGIN")
+            try:
+                before_changes = conn.total_changes
+                conn.executemany(sql, values)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            return conn.total_changes - before_changes
+
+    def save_items(self, table, items: List[Dict]) -> bool:
+        """
+        保存数据
+        Args:
+            table: 表名
+            items: 数据，[{},{},...]
+
+        Returns: 是否保存成功 True / False
+                 若False，不会将本批数据入到去重库，以便再次入库
+
+        """
+        if not items:
+            return True
+
+        try:
+            add_count = self._execute_batch(table, items)
+        except Exception as e:
+            log.exception(e)
+            log.error(f"SQLite写入失败. table: {table}, error: {e}")
+            return False
+
+        datas_size = len(items)
+        log.info(
+            "共导出 %s 条数据 到 %s, 重复 %s 条" % (datas_size, table, datas_size - add_count)
+        )
+        return True
+
+    def update_items(self, table, items: List[Dict], update_keys=Tuple) -> bool:
+        """
+        更新数据
+        Args:
+            table: 表名
+            items: 数据，[{},{},...]
+            update_keys: 更新的字段, 如 ("title", "publish_time")
+
+        Returns: 是否更新成功 True / False
+                 若False，不会将本批数据入到去重库，以便再次入库
+
+        """
+        if not items:
+            return True
+
+        if not update_keys or not isinstance(update_keys, (tuple, list)):
+            update_keys = list(items[0].keys())
+
+        try:
+            update_count = self._execute_batch(table, items, update_keys=update_keys)
+        except Exception as e:
+            log.exception(e)
+            log.error(f"SQLite更新失败. table: {table}, error: {e}")
+            return False
+
+        msg = "共更新 %s 条数据 到 %s" % (update_count, table)
+        if update_keys:
+            msg += " 更新字段为 {}".format(update_keys)
+        log.info(msg)
+        return True
+
+    def close(self):
+        """
+        关闭数据库连接
+        """
+        with self._lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
@@ -33,9 +33,40 @@
 #     "feapder.pipelines.mysql_pipeline.MysqlPipeline",
 #     # "feapder.pipelines.mongo_pipeline.MongoPipeline",
 #     # "feapder.pipelines.csv_pipeline.CsvPipeline",
+#     # "feapder.pipelines.jsonl_pipeline.JsonlPipeline",
+#     # "feapder.pipelines.parquet_pipeline.ParquetPipeline",
+#     # "feapder.pipelines.sqlite_pipeline.SqlitePipeline",
 #     # "feapder.pipelines.console_pipeline.ConsolePipeline",
 # ]
 # CSV_EXPORT_PATH = "data/csv"  # CSV文件保存路径，支持相对路径和绝对路径
+# CSV_EXPORT_SETTING = dict(
+#     async_write=False,  # 高吞吐模式：文件句柄常驻，由独立线程异步写入；以下配置仅在此模式下生效
+#     compression=None,  # 压缩方式 None、gzip、zstd（需安装zstandard）
+#     max_file_size=0,  # 单个文件最大字节数，超过则滚动新文件; 0表示不限制
+#     rotate_interval=0,  # 单个文件最长写入时间 秒，超时则滚动新文件; 0表示不限制
+#     fsync_interval=1,  # 刷盘间隔 秒; 0表示每批都刷盘
+#     queue_size=100,  # 写入队列最多缓存的批数，满时阻塞; 0表示不限制
+# )
+# JSONL_EXPORT_PATH = "data/jsonl"  # JsonlPipeline 文件保存路径，支持相对路径和绝对路径
+# JSONL_EXPORT_SETTING = dict(
+#     compression="gzip",  # 压缩方式 None、gzip、zstd（需安装zstandard）
+#     max_file_size=128 * 1024 * 1024,  # 单个文件最大字节数（压缩后），超过则滚动新文件; 0表示不限制
+#     rotate_interval=3600,  # 单个文件最长写入时间 秒，超时则滚动新文件; 0表示不限制
+# )
+# PARQUET_EXPORT_PATH = "data/parquet"  # ParquetPipeline 文件保存路径，支持相对路径和绝对路径
+# PARQUET_EXPORT_SETTING = dict(
+#     file_format="parquet",  # parquet 或 arrow（Arrow IPC）
+#     compression="zstd",  # 压缩方式 parquet支持 zstd、snappy、gzip、none; arrow支持 zstd、lz4、none
+#     row_group_size=10000,  # 每个行组的行数，数据按表缓冲够此数量后写入
+#     flush_interval=10,  # 数据最长缓冲时间 秒，超时即写入（后台定时检查）; 0表示不按时间写入
+#     max_file_size=128 * 1024 * 1024,  # 单个文件最大字节数，超过则滚动新文件; 0表示不限制
+#     rotate_interval=600,  # 单个文件最长写入时间 秒，超时则关闭并滚动新文件（后台定时检查），进程崩溃时最多丢失这段时间的数据; 0表示不限制
+# )
+# SQLITE_EXPORT_PATH = "data/sqlite/feapder.db"  # SqlitePipeline 数据库文件路径，支持相对路径和绝对路径
+# SQLITE_EXPORT_SETTING = dict(
+#     unique_keys={},  # 建立的唯一索引（update_items依赖），与Item的__unique_key__保持一致，如 {"spider_data": ("url",)}
+#     synchronous="NORMAL",  # 刷盘策略 OFF、NORMAL、FULL，WAL模式下NORMAL即可保证数据库不损坏
+# )
 # EXPORT_DATA_MAX_FAILED_TIMES = 10  # 导出数据时最大的失败次数，包括保存和更新，超过这个次数报警
 # EXPORT_DATA_MAX_RETRY_TIMES = 10  # 导出数据时最大的重试次数，包括保存和更新，超过这个次数则放弃重试
 #
@@ -55,7 +86,7 @@
 # SESSION_DOWNLOADER = "feapder.network.downloader.RequestsSessionDownloader"
 # RENDER_DOWNLOADER = "feapder.network.downloader.SeleniumDownloader"  # 渲染下载器
 # # RENDER_DOWNLOADER="feapder.network.downloader.PlaywrightDownloader"
-# MAKE_ABSOLUTE_LINKS = True  # 自动转成绝对连接
+# MAKE_ABSOLUTE_LINKS = True  # 自动转成绝对连接 True: 整篇源码补全（兼容模式）; "lazy": 仅在xpath/css提取href、src及re匹配时补全，utf-8页面直接从bytes解析，大页面更快; False: 不补全
 
 # # 浏览器渲染
 # WEBDRIVER = dict(
@@ -107,6 +138,8 @@
 # REQUEST_LOST_TIMEOUT = 600  # 10分钟
 # # request网络请求超时时间
 # REQUEST_TIMEOUT = 22  # 等待服务器响应的超时时间，浮点数，或(connect timeout, read timeout)元组
+# # 响应体最大字节数（按解压后计算），超过时中止下载（不重试），0为不限制。可通过Request的max_body_size参数单独指定
+# RESPONSE_MAX_BODY_SIZE = 0
 # # item在内存队列中最大缓存数量
 # ITEM_MAX_CACHED_COUNT = 5000
 # # item每批入库的最大数量
@@ -116,16 +149,51 @@
 # # 内存任务队列最大缓存的任务数，默认不限制；仅对AirSpider有效。
 # TASK_MAX_CACHED_SIZE = 0
 #
-# # 下载缓存 利用redis缓存，但由于内存大小限制，所以建议仅供开发调试代码时使用，防止每次debug都需要网络请求
+# # 下载缓存 默认利用redis缓存，但由于内存大小限制，所以建议仅供开发调试代码时使用，防止每次debug都需要网络请求
 # RESPONSE_CACHED_ENABLE = False  # 是否启用下载缓存 成本高的数据或容易变需求的数据，建议设置为True
 # RESPONSE_CACHED_EXPIRE_TIME = 3600  # 缓存时间 秒
 # RESPONSE_CACHED_USED = False  # 是否使用缓存 补采数据时可设置为True
+# # 缓存存储方式 RedisResponseCache: redis; DiskResponseCache: 本地磁盘; MemoryResponseCache: 进程内LRU
+# RESPONSE_CACHE = "feapder.network.response_cache.RedisResponseCache"
+# RESPONSE_CACHE_SETTING = dict(
+#     cache_dir="data/response_cache",  # DiskResponseCache 的缓存目录
+#     max_count=10000,  # MemoryResponseCache 的最大缓存数
+#     max_bytes=512 * 1024 * 1024,  # MemoryResponseCache 的最大缓存字节数（压缩后）
+#     compression_level=3,  # 压缩级别，有zstandard时使用zstd压缩，否则使用zlib
+# )
+#
+# # HTTP条件请求缓存 按request指纹缓存带有ETag/Last-Modified的页面，再次请求时自动带上If-None-Match/If-Modified-Since，页面未修改(304)时不重新下载。适用于批次爬虫增量采集
+# HTTP_CACHE_ENABLE = False
+# HTTP_CACHE_SETTING = dict(
+#     store="feapder.network.response_cache.DiskResponseCache",  # 页面的存储方式，同 RESPONSE_CACHE
+#     expire_time=7 * 24 * 3600,  # 缓存时间 秒
+#     # 页面未修改时 serve: 使用缓存的页面调用解析函数; skip: 跳过解析函数，改为调用parser的not_modified。
+#     # 注意skip时解析函数中产出的request、item均不会产出，需要的结果（如批次爬虫标记任务完成）在not_modified中产出，
+#     # TaskSpider、BatchSpider默认将 request.task_id 对应的任务状态置为1
+#     policy="serve",
+# )
 #
 # # 设置代理
 # PROXY_EXTRACT_API = None  # 代理提取API ，返回的代理分割符为\r\n
 # PROXY_ENABLE = True
 # PROXY_MAX_FAILED_TIMES = 5  # 代理最大失败次数，超过则不使用，自动删除
-# PROXY_POOL = "feapder.network.proxy_pool.ProxyPool"  # 代理池
+# PROXY_ACQUIRE_TIMEOUT = 10  # 获取代理的最长等待时间 秒，超时后request延迟重新入库，不占用线程
+# PROXY_REQUEUE_DELAY = 30  # 获取代理超时的request重新入库的延迟 秒
+# PROXY_POOL = "feapder.network.proxy_pool.ProxyPool"  # 代理池，可选 feapder.network.proxy_pool.ScoredProxyPool 按成功率及延迟评分选择代理; feapder.network.proxy_pool.RedisProxyPool 多节点通过redis共享代理
+# PROXY_POOL_SETTING = dict(  # ScoredProxyPool、RedisProxyPool 的配置
+#     min_size=5,  # 代理数量不高于此值时，后台提前提取代理
+#     sample_size=3,  # 每次取代理时抽取的候选数量，按评分加权选择其一
+#     ewma_alpha=0.3,  # 延迟的指数加权移动平均系数，越大越偏向最近的延迟
+#     latency_base=1,  # 基准延迟 秒，评分 = 成功率 / (1 + 延迟 / 基准延迟)
+#     wait_timeout=10,  # 无代理时最长等待时间 秒
+#     refill_interval=3,  # 两次提取代理的最小间隔 秒
+#     # 以下为 RedisProxyPool 的配置
+#     redis_key="feapder",  # 代理池在redis中的key前缀，相同前缀的节点共享代理
+#     lease_size=10,  # 每次租用的代理数量，缓存在本地
+#     lease_time=60,  # 租约时长 秒，节点异常退出时租约到期自动回收
+#     max_leases=0,  # 单个代理同时被租用的最大次数，0为不限制
+#     report_interval=5,  # 上报请求结果的间隔 秒
+# )
 #
 # # 随机headers
 # RANDOM_HEADERS = True
@@ -133,8 +201,16 @@
 # USER_AGENT_TYPE = "chrome"
 # # 默认使用的浏览器头
 # DEFAULT_USERAGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14_2) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/73.0.3683.103 Safari/537.36"
+# # 请求头自动带上支持的压缩方式 Accept-Encoding: gzip, deflate, br, zstd（br需安装brotli，zstd需安装zstandard），节省带宽
+# ACCEPT_ENCODING_NEGOTIATE = True
 # # requests 使用session
 # USE_SESSION = False
+# # 会话池，Request指定session_key时，相同session_key的请求使用同一组代理、User-Agent、cookie及HTTP连接
+# SESSION_POOL_SETTING = dict(
+#     max_sessions=1000,  # 同时存活的会话数上限，超过时淘汰最久未使用的会话
+#     idle_timeout=600,  # 会话空闲超过此时间 秒 后失效，重新分配代理、UA及cookie，0为不失效
+#     pool_maxsize=10,  # 每个会话保持的最大连接数
+# )
 #
 # # 去重
 # ITEM_FILTER_ENABLE = False  # item 去重
@@ -187,6 +263,11 @@
 # LOG_MAX_BYTES = 10 * 1024 * 1024  # 每个日志文件的最大字节数
 # LOG_BACKUP_COUNT = 20  # 日志文件保留数量
 # LOG_ENCODING = "utf8"  # 日志文件编码
+# LOG_ASYNC = False  # 是否异步写日志，由单独的线程批量写入，避免磁盘IO阻塞抓取线程
+# LOG_ASYNC_QUEUE_SIZE = 10000  # 异步日志队列的最大长度
+# LOG_ASYNC_BATCH_SIZE = 100  # 异步日志每批写入的最大条数
+# LOG_ASYNC_FULL_POLICY = "drop"  # 队列满时的策略 drop: 丢弃并打点统计丢弃数 block: 阻塞等待
+# LOG_JSON = False  # 是否输出结构化日志，每条日志为一行json，带有爬虫名、url、关联id等字段，便于日志系统采集
 # OTHERS_LOG_LEVAL = "ERROR"  # 第三方库的log等级
 #
 # # 切换工作路径为当前项目路径
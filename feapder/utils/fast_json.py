@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: json序列化及反序列化。安装了 orjson / ujson 时使用加速库，否则使用标准库，结果与标准库一致
+    loads: orjson > ujson > json，加速库解析失败（如超过64位的整数、NaN）时交由标准库处理
+    dumps: 仅 orjson，且为紧凑格式时使用（输出与标准库一致），其他情况使用标准库。
+        含有 orjson 与标准库结果不一致的值（Enum、NaN、Infinity）时也使用标准库
+        tools.dumps_json 用于打印，为带缩进或默认分隔符的格式，orjson不支持，仍使用标准库
+    dumps_lines: 序列化为 JSON Lines，供 JsonlPipeline 使用，规则同 dumps
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import datetime
+import json
+from enum import Enum
+
+try:
+    import orjson  # pip install orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson  # pip install ujson
+except ImportError:
+    ujson = None
+
+COMPACT_SEPARATORS = (",", ":")
+
+if orjson:
+    _fast_loads = orjson.loads
+elif ujson:
+    _fast_loads = ujson.loads
+else:
+    _fast_loads = None
+
+# 时间、dataclass 等交由 default 处理，与标准库 default=str 的结果一致（如 2026-10-19 12:00:00）
+_ORJSON_OPTION = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    if orjson
+    else 0
+)
+
+# orjson 与标准库结果一致的类型（float 的 NaN、Infinity 除外，见 _has_non_finite）
+_SAFE_TYPES = frozenset(
+    {str, int, bool, float, type(None), datetime.datetime, datetime.date, datetime.time}
+)
+_CONTAINER_TYPES = frozenset({dict, list, tuple})
+
+# 数字统一替换为0，其他字符替换为空格
+_DIGIT_TABLE = bytes(48 if 48 <= c <= 57 else 32 for c in range(256))
+_NINETEEN_DIGITS = b"0" * 19
+# 分块查找，避免复制整个数据；相邻的块重叠18个字符，防止跨块的数字被截断
+_SCAN_CHUNK_SIZE = 16 * 1024
+_SCAN_STEP = _SCAN_CHUNK_SIZE - len(_NINETEEN_DIGITS) + 1
+
+
+def get_backend():
+    """
+    当前使用的加速库名称
+    """
+    if orjson:
+        return "orjson"
+    if ujson:
+        return "ujson"
+    return "json"
+
+
+def _may_have_big_int(data):
+    """
+    是否可能含有超过64位的整数。orjson 会将其解析为浮点数，丢失精度，需交由标准库处理。
+    超过64位的整数至少有19位数字，将数字之外的字符替换为空格后查找连续的19个数字，比正则快一个数量级。
+    按块处理，只复制一个块的大小，耗时约为orjson解析的5%
+    """
+    if isinstance(data, str):
+        for start in range(0, len(data), _SCAN_STEP):
+            chunk = data[start : start + _SCAN_CHUNK_SIZE].encode(
+                "utf-8", "surrogatepass"
+            )
+            if _NINETEEN_DIGITS in chunk.translate(_DIGIT_TABLE):
+                return True
+        return False
+
+    if not isinstance(data, (bytes, bytearray)):
+        data = bytes(data)
+    for start in range(0, len(data), _SCAN_STEP):
+        chunk = data[start : start + _SCAN_CHUNK_SIZE]
+        if _NINETEEN_DIGITS in chunk.translate(_DIGIT_TABLE):
+            return True
+    return False
+
+
+def loads(data):
+    """
+    反序列化
+    Args:
+        data: str 或 utf-8 编码的 bytes
+
+    Returns:
+
+    """
+    if _fast_loads and not _may_have_big_int(data):
+        try:
+            return _fast_loads(data)
+        except Exception:
+            # 如 NaN、非utf-8编码，交由标准库处理或抛出标准库的异常
+            pass
+
+    return json.loads(data)
+
+
+def _can_use_orjson(indent, separators, ensure_ascii):
+    # skipkeys 无需判断：orjson 遇到非字符串的key时报错，交由标准库处理
+    if not orjson or ensure_ascii or indent is not None:
+        return False
+    return tuple(separators or ()) == COMPACT_SEPARATORS
+
+
+def _has_special_type(obj):
+    """
+    是否含有 orjson 与标准库结果不一致的类型，如 Enum：orjson 输出其value，标准库交由 default 处理（默认为 str(enum)），
+    str、int、float 的子类除外。先按类型整体判断，只含有安全类型的容器无需逐个检查
+    Args:
+        obj: dict / list / tuple
+    """
+    values = obj.values() if isinstance(obj, dict) else obj
+    if _SAFE_TYPES.issuperset(map(type, values)):
+        return False
+
+    for value in values:
+        value_type = type(value)
+        if value_type in _SAFE_TYPES:
+            continue
+        if value_type in _CONTAINER_TYPES or isinstance(value, (dict, list, tuple)):
+            if _has_special_type(value):
+                return True
+        elif isinstance(value, Enum) and not isinstance(value, (str, int, float)):
+            return True
+    return False
+
+
+def _has_non_finite(obj):
+    """
+    是否含有 NaN、Infinity：orjson 输出为 null，标准库为 NaN、Infinity。
+    仅在 orjson 的结果中有 null 时检查
+    Args:
+        obj: dict / list / tuple
+    """
+    values = obj.values() if isinstance(obj, dict) else obj
+    for value in values:
+        if isinstance(value, float):
+            # NaN、Infinity 减去自身不为0
+            if value - value != 0:
+                return True
+        elif isinstance(value, (dict, list, tuple)):
+            if _has_non_finite(value):
+                return True
+    return False
+
+
+def _orjson_dumps(obj, default, option):
+    """
+    使用 orjson 序列化，结果与标准库不一致时返回None
+    """
+    container = obj if isinstance(obj, (dict, list, tuple)) else (obj,)
+    if _has_special_type(container):
+        return None
+    try:
+        data = orjson.dumps(obj, default=default, option=option)
+    except orjson.JSONEncodeError:
+        # 如超过64位的整数、非字符串的key，orjson不支持或结果与标准库不一致
+        return None
+    if b"null" in data and _has_non_finite(container):
+        return None
+    return data
+
+
+def dumps_bytes(
+    obj,
+    indent=None,
+    sort_keys=False,
+    separators=COMPACT_SEPARATORS,
+    ensure_ascii=False,
+    skipkeys=False,
+    default=str,
+) -> bytes:
+    """
+    序列化为 utf-8 编码的 bytes，默认为紧凑格式。参数同 json.dumps
+    注：使用 orjson 时，科学计数法的浮点数输出为 1e20（标准库为 1e+20），解析后的值一致
+    """
+    if _can_use_orjson(indent, separators, ensure_ascii):
+        option = _ORJSON_OPTION
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        data = _orjson_dumps(obj, default, option)
+        if data is not None:
+            return data
+
+    return json.dumps(
+        obj,
+        indent=indent,
+        sort_keys=sort_keys,
+        separators=separators,
+        ensure_ascii=ensure_ascii,
+        skipkeys=skipkeys,
+        default=default,
+    ).encode("utf-8")
+
+
+def dumps(
+    obj,
+    indent=None,
+    sort_keys=False,
+    separators=COMPACT_SEPARATORS,
+    ensure_ascii=False,
+    skipkeys=False,
+    default=str,
+) -> str:
+    """
+    序列化为字符串，默认为紧凑格式。参数同 json.dumps
+    """
+    if _can_use_orjson(indent, separators, ensure_ascii):
+        return dumps_bytes(
+            obj,
+            indent=indent,
+            sort_keys=sort_keys,
+            separators=separators,
+            skipkeys=skipkeys,
+            default=default,
+        ).decode("utf-8")
+
+    return json.dumps(
+        obj,
+        indent=indent,
+        sort_keys=sort_keys,
+        separators=separators,
+        ensure_ascii=ensure_ascii,
+        skipkeys=skipkeys,
+        default=default,
+    )
+
+
+def dumps_lines(items, default=str) -> bytes:
+    """
+    将多条数据序列化为 JSON Lines（utf-8 编码），每条一行，紧凑格式，结果与标准库一致
+    """
+    if orjson and not _has_special_type(items):
+        option = _ORJSON_OPTION | orjson.OPT_APPEND_NEWLINE
+        try:
+            data = b"".join(
+                orjson.dumps(item, default=default, option=option) for item in items
+            )
+        except orjson.JSONEncodeError:
+            data = None
+        if data is not None and not (b"null" in data and _has_non_finite(items)):
+            return data
+
+    return "".join(
+        json.dumps(
+            item, ensure_ascii=False, separators=COMPACT_SEPARATORS, default=default
+        )
+        + "\n"
+        for item in items
+    ).encode("utf-8")
@@ -8,21 +8,47 @@ Created on 2018-12-08 16:50
 @email: boris_liu@foxmail.com
 """
 
+import contextvars
 import logging
 import os
+import queue
 import sys
+import threading
+import uuid
+from contextlib import contextmanager
 from logging.handlers import BaseRotatingHandler
 
 import loguru
 from better_exceptions import format_exception
 
 import feapder.setting as setting
+from feapder.utils import fast_json
+
+# 当前线程的日志上下文，结构化日志中每条日志均带上这些字段
+_log_context = contextvars.ContextVar("log_context", default={})
+
+# LogRecord自带的属性，其余的属性为通过extra传入的字段
+_RECORD_ATTRS = set(logging.makeLogRecord({}).__dict__) | {
+    "message",
+    "asctime",
+    "log_context",
+}
 
 
 class InterceptHandler(logging.Handler):
     def emit(self, record):
-        # Retrieve context where the logging call occurred, this happens to be in the 6th frame upward
-        logger_opt = loguru.logger.opt(depth=6, exception=record.exc_info)
+        if record.thread == threading.get_ident():
+            # Retrieve context where the logging call occurred, this happens to be in the 6th frame upward
+            logger_opt = loguru.logger.opt(depth=6, exception=record.exc_info)
+        else:
+            # 异步写日志时，调用栈已不是打日志的位置，取record中记录的位置
+            logger_opt = loguru.logger.patch(
+                lambda loguru_record: loguru_record.update(
+                    name=record.module,
+                    function=record.funcName,
+                    line=record.lineno,
+                )
+            ).opt(exception=record.exc_info)
         logger_opt.log(record.levelname, record.getMessage())
 
 
@@ -77,6 +103,173 @@ class RotatingFileHandler(BaseRotatingHandler):
         return 0
 
 
+class ContextFilter(logging.Filter):
+    """
+    在打日志的线程中取日志上下文，异步写日志时也不会错乱
+    """
+
+    def filter(self, record):
+        record.log_context = _log_context.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    结构化日志，每条日志输出一行json，带有日志上下文及extra中的字段
+    """
+
+    def format(self, record):
+        message = record.getMessage()
+        if "\n" in message:
+            # 多行的日志块去掉缩进及空行
+            message = "\n".join(
+                line.strip() for line in message.splitlines() if line.strip()
+            )
+
+        log_data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "message": message.strip(),
+        }
+        log_data.update(getattr(record, "log_context", None) or {})
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                log_data[key] = value
+
+        log_data["thread"] = record.threadName
+        log_data["file"] = record.filename
+        log_data["func"] = record.funcName
+        log_data["line"] = record.lineno
+
+        if record.exc_info and record.exc_info[0]:
+            log_data.setdefault("exception_type", record.exc_info[0].__name__)
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            log_data["exception"] = record.exc_text
+
+        return fast_json.dumps(log_data)
+
+
+class AsyncHandler(logging.Handler):
+    """
+    异步写日志。调用线程只将日志放入有界队列，由单独的线程批量写入实际的handler，
+    磁盘IO慢时不阻塞抓取线程，各线程也不再竞争handler的锁
+    """
+
+    def __init__(
+        self, handlers, queue_size=10000, batch_size=100, full_policy="drop"
+    ):
+        """
+        Args:
+            handlers: 实际写日志的handler
+            queue_size: 队列的最大长度
+            batch_size: 每批写入的最大条数
+            full_policy: 队列满时的策略 drop: 丢弃 block: 阻塞等待
+        """
+        super().__init__()
+        if full_policy not in ("drop", "block"):
+            raise ValueError("full_policy 须为 drop 或 block")
+
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.full_policy = full_policy
+
+        self.dropped_count = 0  # 累计丢弃的日志数
+        self._unreported_dropped_count = 0  # 未打点的丢弃数
+        self._dropped_lock = threading.Lock()
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(
+            target=self._run, name="AsyncLogWriter", daemon=True
+        )
+        self._thread.start()
+
+    def prepare(self, record):
+        # 在调用线程生成日志内容，避免写入前参数被修改
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text and self.formatter:
+            record.exc_text = self.formatter.formatException(record.exc_info)
+        return record
+
+    def emit(self, record):
+        try:
+            record = self.prepare(record)
+            if self.full_policy == "block":
+                self._queue.put(record)
+                return
+
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                with self._dropped_lock:
+                    self.dropped_count += 1
+                    self._unreported_dropped_count += 1
+        except Exception:
+            self.handleError(record)
+
+    def _write(self, records):
+        for handler in self.handlers:
+            handler.acquire()
+            try:
+                for record in records:
+                    if record.levelno >= handler.level and handler.filter(record):
+                        handler.emit(record)
+            finally:
+                handler.release()
+
+    def _report_dropped(self):
+        with self._dropped_lock:
+            dropped_count = self._unreported_dropped_count
+            self._unreported_dropped_count = 0
+
+        if dropped_count:
+            from feapder.utils import metrics
+
+            metrics.emit_counter("dropped", dropped_count, classify="log")
+
+    def _run(self):
+        is_stop = False
+        while not is_stop:
+            try:
+                record = self._queue.get(timeout=1)
+            except queue.Empty:
+                self._report_dropped()
+                continue
+
+            records = []
+            while record is not None:
+                records.append(record)
+                if len(records) >= self.batch_size:
+                    break
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            else:
+                is_stop = True  # 收到结束标记
+
+            try:
+                self._write(records)
+                self._report_dropped()
+            except Exception:
+                # 写日志出错不能中止写线程，否则之后的日志全部堆积在队列中
+                self.handleError(records[-1])
+
+    def flush(self):
+        for handler in self.handlers:
+            handler.flush()
+
+    def close(self):
+        # 写完队列中剩余的日志再退出
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=10)
+        self.flush()
+        super().close()
+
+
 def get_logger(
     name=None,
     path=None,
@@ -88,6 +281,8 @@ def get_logger(
     max_bytes=None,
     backup_count=None,
     encoding=None,
+    is_async=None,
+    is_json=None,
 ):
     """
     @summary: 获取log
@@ -102,6 +297,8 @@ def get_logger(
     @param max_bytes： 每个日志文件的最大字节数
     @param backup_count：日志文件保留数量
     @param encoding：日志文件编码
+    @param is_async：是否异步写日志
+    @param is_json：是否输出结构化的json日志
     ---------
     @result:
     """
@@ -124,6 +321,8 @@ def get_logger(
     max_bytes = max_bytes or setting.LOG_MAX_BYTES
     backup_count = backup_count or setting.LOG_BACKUP_COUNT
     encoding = encoding or setting.LOG_ENCODING
+    is_async = is_async if is_async is not None else setting.LOG_ASYNC
+    is_json = is_json if is_json is not None else setting.LOG_JSON
 
     # logger 配置
     name = name.split(os.sep)[-1].split(".")[0]  # 取文件名
@@ -131,10 +330,17 @@ def get_logger(
     logger = logging.getLogger(name)
     logger.setLevel(log_level)
 
-    formatter = logging.Formatter(setting.LOG_FORMAT)
-    if setting.PRINT_EXCEPTION_DETAILS:
-        formatter.formatException = lambda exc_info: format_exception(*exc_info)
-
+    if is_json:
+        formatter = JsonFormatter()
+        color = False  # 带颜色的日志不是json格式
+        if not any(isinstance(_filter, ContextFilter) for _filter in logger.filters):
+            logger.addFilter(ContextFilter())
+    else:
+        formatter = logging.Formatter(setting.LOG_FORMAT)
+        if setting.PRINT_EXCEPTION_DETAILS:
+            formatter.formatException = lambda exc_info: format_exception(*exc_info)
+
+    handlers = []
     # 定义一个RotatingFileHandler，最多备份5个日志文件，每个日志文件最大10M
     if is_write_to_file:
         if path and not os.path.exists(os.path.dirname(path)):
@@ -148,17 +354,30 @@ def get_logger(
             encoding=encoding,
         )
         rf_handler.setFormatter(formatter)
-        logger.addHandler(rf_handler)
+        handlers.append(rf_handler)
     if color and is_write_to_console:
         loguru_handler = InterceptHandler()
         loguru_handler.setFormatter(formatter)
         # logging.basicConfig(handlers=[loguru_handler], level=0)
-        logger.addHandler(loguru_handler)
+        handlers.append(loguru_handler)
     elif is_write_to_console:
         stream_handler = logging.StreamHandler()
         stream_handler.stream = sys.stdout
         stream_handler.setFormatter(formatter)
-        logger.addHandler(stream_handler)
+        handlers.append(stream_handler)
+
+    if is_async and handlers:
+        async_handler = AsyncHandler(
+            handlers,
+            queue_size=setting.LOG_ASYNC_QUEUE_SIZE,
+            batch_size=setting.LOG_ASYNC_BATCH_SIZE,
+            full_policy=setting.LOG_ASYNC_FULL_POLICY,
+        )
+        async_handler.setFormatter(formatter)
+        handlers = [async_handler]
+
+    for handler in handlers:
+        logger.addHandler(handler)
 
     _handler_list = []
     _handler_name_list = []
@@ -221,6 +440,28 @@ for STOP_LOG in STOP_LOGS:
 # 日志级别大小关系为：CRITICAL > ERROR > WARNING > INFO > DEBUG
 
 
+class LazyStr:
+    """
+    延迟格式化的日志参数，日志真正输出时才调用func生成内容，日志级别未开启时无格式化开销
+    需配合logging的 %s 参数使用，不可提前用 % 格式化:
+        log.debug("datas: %s", LazyStr(tools.dumps_json, datas, indent=16))
+    """
+
+    __slots__ = ("func", "args", "kwargs", "_value")
+
+    def __init__(self, func, *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self._value = None
+
+    def __str__(self):
+        # 多个handler输出时只格式化一次
+        if self._value is None:
+            self._value = str(self.func(*self.args, **self.kwargs))
+        return self._value
+
+
 class Log:
     log = None
 
@@ -237,6 +478,55 @@ class Log:
             self.__class__.log = get_logger()
         return getattr(self.__class__.log, name)
 
+    @staticmethod
+    @contextmanager
+    def context(**fields):
+        """
+        设置当前线程的日志上下文，with块内打印的结构化日志均带上这些字段，可嵌套
+        Args:
+            **fields: 如 spider、url、correlation_id 等
+        """
+        token = _log_context.set({**_log_context.get(), **fields})
+        try:
+            yield
+        finally:
+            _log_context.reset(token)
+
+    @staticmethod
+    def get_context() -> dict:
+        return _log_context.get()
+
+    @staticmethod
+    def new_correlation_id():
+        """
+        生成关联id，串联一个request从取出、解析到数据入库的日志
+        """
+        return uuid.uuid4().hex
+
+    def event(self, event, message="", level=logging.INFO, **fields):
+        """
+        输出一条结构化的事件日志，仅结构化日志模式下输出
+        Args:
+            event: 事件名
+            message: 日志内容，默认为事件名
+            level: 日志级别
+            **fields: 事件的字段，如 elapsed、exception_type 等
+        """
+        if setting.LOG_JSON and self.isEnabledFor(level):
+            self._log(
+                level,
+                message or event,
+                (),
+                extra=dict(fields, event=event),
+                stacklevel=2,
+            )
+
+    def is_debug(self):
+        """
+        是否输出debug日志，拼接日志内容开销较大时可先判断
+        """
+        return self.isEnabledFor(logging.DEBUG)
+
     @property
     def debug(self):
         return self.__class__.log.debug
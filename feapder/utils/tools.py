@@ -19,6 +19,7 @@ import hmac
 import html
 import importlib
 import json
+import operator
 import os
 import pickle
 import random
@@ -49,6 +50,7 @@ from w3lib.url import canonicalize_url as _canonicalize_url
 
 import feapder.setting as setting
 from feapder.db.redisdb import RedisDB
+from feapder.utils import fast_json
 from feapder.utils.email_sender import EmailSender
 from feapder.utils.log import log
 
@@ -952,7 +954,7 @@ def get_json(json_str):
     """
 
     try:
-        return json.loads(json_str) if json_str else {}
+        return fast_json.loads(json_str) if json_str else {}
     except Exception as e1:
         try:
             json_str = json_str.strip()
@@ -961,7 +963,7 @@ def get_json(json_str):
             for key in keys:
                 json_str = json_str.replace(key, '"%s"' % key)
 
-            return json.loads(json_str) if json_str else {}
+            return fast_json.loads(json_str) if json_str else {}
 
         except Exception as e2:
             log.error(
@@ -983,7 +985,7 @@ def jsonp2json(jsonp):
     @return:
     """
     try:
-        return json.loads(re.match(".*?({.*}).*", jsonp, re.S).group(1))
+        return fast_json.loads(re.match(".*?({.*}).*", jsonp, re.S).group(1))
     except:
         raise ValueError("Invalid Input")
 
@@ -1000,10 +1002,11 @@ def dumps_json(data, indent=4, sort_keys=False):
         if isinstance(data, str):
             data = get_json(data)
 
-        data = json.dumps(
+        data = fast_json.dumps(
             data,
             ensure_ascii=False,
             indent=indent,
+            separators=None,
             skipkeys=True,
             sort_keys=sort_keys,
             default=str,
@@ -2178,45 +2181,25 @@ def make_update_sql(table, data, condition):
     return sql
 
 
-def make_batch_sql(
-    table, datas, auto_update=False, update_columns=(), update_columns_value=()
+@functools.lru_cache(maxsize=1024)
+def _make_batch_sql_template(
+    table, columns, auto_update=False, update_columns=(), update_columns_value=()
 ):
     """
-    @summary: 生产批量的sql
+    @summary: 生成批量sql的语句模板，按 (表名, 列, 更新列) 缓存，避免每批重复拼接
     ---------
     @param table:
-    @param datas: 表数据 [{...}]
-    @param auto_update: 使用的是replace into， 为完全覆盖已存在的数据
-    @param update_columns: 需要更新的列 默认全部，当指定值时，auto_update设置无效，当duplicate key冲突时更新指定的列
-    @param update_columns_value: 需要更新的列的值 默认为datas里边对应的值, 注意 如果值为字符串类型 需要主动加单引号， 如 update_columns_value=("'test'",)
+    @param columns: 列名元组，顺序即为values中值的顺序
+    @param auto_update: 同 make_batch_sql
+    @param update_columns: 同 make_batch_sql，需为元组
+    @param update_columns_value: 同 make_batch_sql，需为元组
     ---------
-    @result:
+    @result: sql
     """
-    if not datas:
-        return
-
-    keys = list(set([key for data in datas for key in data]))
-    values_placeholder = ["%s"] * len(keys)
-
-    values = []
-    for data in datas:
-        value = []
-        for key in keys:
-            current_data = data.get(key)
-            current_data = format_sql_value(current_data)
-
-            value.append(current_data)
-
-        values.append(value)
-
-    keys = ["`{}`".format(key) for key in keys]
-    keys = list2str(keys).replace("'", "")
-
-    values_placeholder = list2str(values_placeholder).replace("'", "")
+    keys = "({})".format(", ".join("`{}`".format(key) for key in columns))
+    values_placeholder = "({})".format(", ".join(["%s"] * len(columns)))
 
     if update_columns:
-        if not isinstance(update_columns, (tuple, list)):
-            update_columns = [update_columns]
         if update_columns_value:
             update_columns_ = ", ".join(
                 [
@@ -2243,6 +2226,69 @@ def make_batch_sql(
             table=table, keys=keys, values_placeholder=values_placeholder
         )
 
+    return sql
+
+
+@functools.lru_cache(maxsize=1024)
+def _make_columns_getter(columns):
+    """
+    按固定列顺序取值的 itemgetter，返回值始终为元组
+    """
+    if len(columns) == 1:
+        key = columns[0]
+        return lambda data: (data[key],)
+
+    return operator.itemgetter(*columns)
+
+
+def make_batch_sql(
+    table, datas, auto_update=False, update_columns=(), update_columns_value=()
+):
+    """
+    @summary: 生产批量的sql
+    ---------
+    @param table:
+    @param datas: 表数据 [{...}]
+    @param auto_update: 使用的是replace into， 为完全覆盖已存在的数据
+    @param update_columns: 需要更新的列 默认全部，当指定值时，auto_update设置无效，当duplicate key冲突时更新指定的列
+    @param update_columns_value: 需要更新的列的值 默认为datas里边对应的值, 注意 如果值为字符串类型 需要主动加单引号， 如 update_columns_value=("'test'",)
+    ---------
+    @result:
+    """
+    if not datas:
+        return
+
+    # 列为所有数据key的并集，保持首次出现的顺序。字段一致时（常见情况）只比较keys视图
+    first_keys = datas[0].keys()
+    columns = dict.fromkeys(first_keys)
+    for data in datas:
+        if data.keys() != first_keys:
+            columns.update(dict.fromkeys(data))
+    columns = tuple(columns)
+
+    # 字段齐全的行走 itemgetter 快速取值，缺失字段的行补 None，整批仍为一条sql
+    getter = _make_columns_getter(columns)
+    columns_count = len(columns)
+    values = [
+        list(map(format_sql_value, getter(data)))
+        if len(data) == columns_count
+        else [format_sql_value(data.get(key)) for key in columns]
+        for data in datas
+    ]
+
+    if update_columns:
+        if not isinstance(update_columns, (tuple, list)):
+            update_columns = [update_columns]
+        update_columns = tuple(update_columns)
+        update_columns_value = tuple(update_columns_value or ())
+    else:
+        update_columns = ()
+        update_columns_value = ()
+
+    sql = _make_batch_sql_template(
+        table, columns, bool(auto_update), update_columns, update_columns_value
+    )
+
     return sql, values
 
 
@@ -36,7 +36,7 @@ packages.extend(
 requires = [
     "better-exceptions>=0.2.2",
     "DBUtils>=3.0",
-    "parsel>=1.8.1",
+    "parsel>=1.9.1",
     "PyMySQL>=1.1.0",
     "redis>=5.0.0,<9.0.0",
     "requests>=2.31.0",
@@ -48,6 +48,7 @@ requires = [
     "influxdb>=5.3.1",
     "pyperclip>=1.8.2",
     "terminal-layout>=2.1.3",
+    "msgpack>=1.0.0",
 ]
 
 render_requires = [
@@ -60,6 +61,10 @@ all_requires = [
     "bitarray>=2.8.0",
     "PyExecJS>=1.5.1",
     "pymongo>=4.0.0",
+    "pyarrow>=14.0.0",
+    "zstandard>=0.21.0",
+    "brotli>=1.1.0",
+    "orjson>=3.8.0",
 ] + render_requires
 
 setuptools.setup(
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: 异步日志测试
+    运行 python tests/test_async_log.py 查看磁盘IO慢时，多线程同步与异步写日志的耗时对比
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import logging
+import threading
+import time
+
+import pytest
+
+from feapder.utils.log import AsyncHandler, get_logger
+
+
+class SlowHandler(logging.Handler):
+    """
+    模拟磁盘IO慢的handler
+    """
+
+    def __init__(self, delay=0.0):
+        super().__init__()
+        self.delay = delay
+        self.messages = []
+
+    def emit(self, record):
+        time.sleep(self.delay)
+        self.messages.append(self.format(record))
+
+
+def make_logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    return logger
+
+
+def test_async_handler():
+    slow_handler = SlowHandler()
+    async_handler = AsyncHandler([slow_handler], batch_size=10)
+    logger = make_logger("test_async_handler", async_handler)
+
+    data = {"page": 1}
+    logger.info("data: %s", data)
+    data["page"] = 2  # 入队时已生成日志内容，之后修改参数不影响
+    for i in range(100):
+        logger.info("message %s", i)
+    async_handler.close()
+
+    assert slow_handler.messages[0] == "data: {'page': 1}"
+    assert slow_handler.messages[-1] == "message 99"
+    assert len(slow_handler.messages) == 101
+
+
+@pytest.mark.parametrize("full_policy", ["drop", "block"])
+def test_full_policy(full_policy):
+    slow_handler = SlowHandler(delay=0.001)
+    async_handler = AsyncHandler(
+        [slow_handler], queue_size=10, full_policy=full_policy
+    )
+    logger = make_logger("test_full_policy_" + full_policy, async_handler)
+
+    for i in range(200):
+        logger.info("message %s", i)
+    async_handler.close()
+
+    if full_policy == "drop":
+        assert async_handler.dropped_count > 0
+    else:
+        assert async_handler.dropped_count == 0
+    assert len(slow_handler.messages) + async_handler.dropped_count == 200
+
+
+def test_get_logger(tmp_path):
+    path = str(tmp_path / "test.log")
+    logger = get_logger(
+        name="test_async_get_logger",
+        path=path,
+        is_write_to_console=False,
+        is_write_to_file=True,
+        is_async=True,
+    )
+    assert [type(handler) for handler in logger.handlers] == [AsyncHandler]
+
+    logger.info("hello")
+    for handler in logger.handlers:
+        handler.close()
+    logger.handlers = []
+
+    with open(path, encoding="utf8") as file:
+        assert "hello" in file.read()
+
+
+def benchmark():
+    thread_count = 8
+    count = 200
+
+    def run(logger):
+        start = time.time()
+        threads = [
+            threading.Thread(
+                target=lambda: [logger.info("message %s", i) for i in range(count)]
+            )
+            for _ in range(thread_count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.time() - start
+
+    sync_cost = run(make_logger("sync", SlowHandler(delay=0.001)))
+
+    async_handler = AsyncHandler([SlowHandler(delay=0.001)], queue_size=100000)
+    async_cost = run(make_logger("async", async_handler))
+    async_handler.close()
+
+    print(f"{thread_count}线程各打印{count}条日志，每条写入耗时1ms")
+    print(f"同步  抓取线程阻塞 {sync_cost:.2f}s")
+    print(f"异步  抓取线程阻塞 {async_cost:.2f}s")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026/10/19
+---------
+@summary: make_batch_sql 测试
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+from feapder.utils import tools
+
+
+def test_make_batch_sql():
+    datas = [{"id": 1, "title": " a "}, {"id": 2, "title": "b"}]
+    sql, values = tools.make_batch_sql("test", datas)
+    print(sql, values)
+    assert sql == "insert ignore into `test` (`id`, `title`) values (%s, %s)"
+    assert values == [[1, "a"], [2, "b"]]
+
+
+def test_make_batch_sql_missing_columns():
+    datas = [{"id": 1}, {"title": "b"}, {"id": 3, "title": "c", "tags": [1, 2]}]
+    sql, values = tools.make_batch_sql("test", datas, update_columns=("title",))
+    print(sql, values)
+    assert (
+        sql
+        == "insert into `test` (`id`, `title`, `tags`) values (%s, %s, %s) on duplicate key update `title`=values(`title`)"
+    )
+    assert values == [[1, None, None], [None, "b", None], [3, "c", "[1, 2]"]]
+
+
+def test_make_batch_sql_cache():
+    tools._make_batch_sql_template.cache_clear()
+    for i in range(3):
+        tools.make_batch_sql("test", [{"id": i, "title": str(i)}], auto_update=True)
+    cache_info = tools._make_batch_sql_template.cache_info()
+    print(cache_info)
+    assert cache_info.misses == 1 and cache_info.hits == 2
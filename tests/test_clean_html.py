@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: html清洗测试及性能对比
+    对比旧流程（Response 删除控制字符 -> Selector re.sub &nbsp; -> strip/replace \x00）与 clean_html 的耗时及内存峰值
+    运行 python tests/test_clean_html.py 查看对比
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import re
+import time
+import tracemalloc
+
+from feapder.network.response import Response
+from feapder.network.selector import Selector, clean_html
+
+OLD_SPECIAL_CHARACTER_PATTERNS = [re.compile("[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F]")]
+
+
+def old_clean_html(text):
+    for special_character_pattern in OLD_SPECIAL_CHARACTER_PATTERNS:
+        text = special_character_pattern.sub("", text)
+    text = re.sub("&nbsp;", "\x20", text)
+    return text.strip().replace("\x00", "")
+
+
+def new_clean_html(text):
+    return clean_html(text).strip().replace("\x00", "")
+
+
+def make_page(repeat, dirty=True):
+    row = '<tr><td>标题&nbsp;{i}</td><td><a href="/item/{i}">详情</a></td></tr>'
+    if dirty:
+        row += "\x00\x1f"
+    return "<html><body><table>" + "".join(row.format(i=i) for i in range(repeat)) + "</table></body></html>"
+
+
+def test_clean_html():
+    text = " <p>a&nbsp;b\x00c\x1fd\x7f</p>\n"
+    assert clean_html(text) == " <p>a bcd</p>\n"
+    assert clean_html(text, replace_nbsp=False) == " <p>a&nbsp;bcd</p>\n"
+
+    # 无需替换时不产生拷贝
+    text = "<p>feapder</p>"
+    assert clean_html(text) is text
+
+    selector = Selector("<p>a&nbsp;b\x00c</p>")
+    assert selector.xpath("//p/text()").get() == "a bc"
+
+    # 单独使用 Selector 时默认保留控制字符，与之前的行为一致
+    selector = Selector("<p>a\x1fb</p>")
+    assert selector.xpath("//p/text()").get() == "a\x1fb"
+    selector = Selector("<p>a\x1fb</p>", del_special_character=True)
+    assert selector.xpath("//p/text()").get() == "ab"
+    selector = Selector(body="<p>a\x1fb</p>".encode(), encoding="utf-8")
+    assert selector.xpath("//p/text()").get() == "a\x1fb"
+
+    response = Response.from_text("<p>a&nbsp;b\x00c</p>", url="http://feapder.com")
+    assert "&nbsp;" in response.text and "\x00" not in response.text
+    assert response.xpath("//p/text()").get() == "a bc"
+
+
+def measure(func, text, times=10):
+    tracemalloc.start()
+    func(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(times):
+        func(text)
+    return (time.perf_counter() - start) / times, peak
+
+
+def benchmark():
+    for dirty in (True, False):
+        text = make_page(50000, dirty=dirty)
+        assert old_clean_html(text) == new_clean_html(text)
+        print(
+            "页面大小: {:.2f}MB, {}".format(
+                len(text.encode()) / 1024 / 1024, "含控制字符" if dirty else "不含控制字符"
+            )
+        )
+        for name, func in (("旧流程", old_clean_html), ("clean_html", new_clean_html)):
+            cost, peak = measure(func, text)
+            print(f"  {name:<12} 耗时 {cost * 1000:.2f}ms  内存峰值 {peak / 1024 / 1024:.2f}MB")
+
+
+if __name__ == "__main__":
+    test_clean_html()
+    benchmark()
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: 响应体压缩协商及解压测试
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import gzip
+import json
+import os
+import tempfile
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from feapder import Request
+from feapder.network import content_encoding
+from feapder.network.response import Response, ResponseTooLargeError
+
+BODY = json.dumps(
+    [{"id": i, "title": f"第{i}条数据", "tags": ["a", "b"]} for i in range(5000)],
+    ensure_ascii=False,
+).encode()
+
+COMPRESSORS = {
+    "gzip": gzip.compress,
+    "deflate": zlib.compress,
+}
+if content_encoding.zstandard:
+    COMPRESSORS["zstd"] = lambda data: content_encoding.zstandard.compress(data)
+if content_encoding.brotli:
+    COMPRESSORS["br"] = lambda data: content_encoding.brotli.compress(data)
+
+# 压缩炸弹：传输10KB左右，解压后10MB
+BOMB = b"\0" * 10 * 1024 * 1024
+
+
+class Handler(BaseHTTPRequestHandler):
+    accept_encodings = []
+
+    def do_GET(self):
+        self.accept_encodings.append(self.headers.get("Accept-Encoding"))
+        encoding, _, data = self.path.strip("/").partition("/")
+        body = COMPRESSORS[encoding](BOMB if data == "bomb" else BODY)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.mark.parametrize("encoding", list(COMPRESSORS))
+def test_content_encoding(server_url, encoding):
+    response = Request(f"{server_url}/{encoding}").get_response()
+    assert Handler.accept_encodings[-1] == content_encoding.ACCEPT_ENCODING
+
+    # 访问content前保持压缩
+    assert response._encoded_content is not None
+    response_dict = response.to_dict
+    assert response_dict["_content_encodings"] == [encoding]
+    assert len(response_dict["_content"]) < len(BODY)
+
+    assert response.content == BODY
+    assert response.json[1]["title"] == "第1条数据"
+
+    # 反序列化后同样在访问时才解压
+    cached = Response.from_dict(response_dict)
+    assert cached._content is False
+    assert cached.content == BODY
+
+
+@pytest.mark.parametrize("encoding", list(COMPRESSORS))
+def test_iter_content(server_url, encoding):
+    # 保留压缩的响应体后，仍可按 requests 的方式迭代
+    response = Request(f"{server_url}/{encoding}").get_response()
+    assert b"".join(response.iter_content(1024)) == BODY
+    assert b"\n".join(response.iter_lines()) == BODY
+
+    response = Request(f"{server_url}/{encoding}").get_response()
+    text = "".join(response.iter_content(1024, decode_unicode=True))
+    assert text == BODY.decode("utf-8")
+
+
+@pytest.mark.parametrize("encoding", list(COMPRESSORS))
+def test_stream_to_decoded(server_url, encoding):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "data.json")
+        response = Request(f"{server_url}/{encoding}", stream_to=path).get_response()
+        with open(path, "rb") as file:
+            assert file.read() == BODY
+        assert b"".join(response.iter_content(1024)) == BODY
+        assert response.content == BODY
+
+
+@pytest.mark.parametrize("encoding", list(COMPRESSORS))
+def test_max_body_size_decoded(server_url, encoding):
+    # 按解压后的大小限制
+    with pytest.raises(ResponseTooLargeError):
+        Request(
+            f"{server_url}/{encoding}/bomb", max_body_size=1024 * 1024
+        ).get_response()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with pytest.raises(ResponseTooLargeError):
+            Request(
+                f"{server_url}/{encoding}/bomb",
+                stream_to=os.path.join(tmp_dir, "bomb"),
+                max_body_size=1024 * 1024,
+            ).get_response()
+        assert os.listdir(tmp_dir) == []
+
+    # 限制大小时边下载边解压
+    request = Request(f"{server_url}/{encoding}", max_body_size=len(BODY))
+    response = request.get_response()
+    assert response._encoded_content is None
+    assert response.content == BODY
+
+
+def test_bounded_decoder():
+    data = gzip.compress(BOMB)
+    decoder = content_encoding.StreamDecoder(["gzip"], max_length=64 * 1024)
+    chunks = list(decoder.decompress(data)) + list(decoder.flush())
+    assert max(len(chunk) for chunk in chunks) <= 64 * 1024
+    assert b"".join(chunks) == BOMB
+
+    # 多重压缩
+    data = zlib.compress(gzip.compress(BODY))
+    decoder = content_encoding.StreamDecoder(["gzip", "deflate"], max_length=1024)
+    chunks = [*decoder.decompress(data[:100]), *decoder.decompress(data[100:])]
+    assert b"".join([*chunks, *decoder.flush()]) == BODY
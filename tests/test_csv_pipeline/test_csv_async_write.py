@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: CSV Pipeline 高吞吐模式写入失败测试
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import csv
+import gzip
+import io
+import logging
+import os
+import time
+
+import pytest
+
+from feapder.pipelines import csv_pipeline
+from feapder.pipelines.csv_pipeline import CsvPipeline
+from feapder.utils.log import log
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture()
+def pipeline(tmp_path):
+    pipeline = CsvPipeline(csv_dir=str(tmp_path), async_write=True, fsync_interval=0)
+    yield pipeline
+    pipeline.close()
+    CsvPipeline._table_fieldnames.clear()
+
+
+def read_rows(pipeline, table, compression=None):
+    path = os.path.join(pipeline.csv_dir, f"{table}.csv")
+    with open(path + csv_pipeline._CsvFileWriter.SUFFIX[compression], "rb") as f:
+        data = f.read()
+    if compression == "gzip":
+        data = gzip.decompress(data)
+    elif compression == "zstd":
+        data = (
+            csv_pipeline.zstandard.ZstdDecompressor()
+            .decompressobj(read_across_frames=True)
+            .decompress(data)
+        )
+    return list(csv.DictReader(io.StringIO(data.decode("utf-8"), newline="")))
+
+
+def test_invalid_items(pipeline):
+    assert pipeline.save_items("invalid", [{"id": 1, "title": "a"}])
+    # 字段不一致在调用线程即返回失败，由ItemBuffer重试，与同步模式一致
+    assert not pipeline.save_items("invalid", [{"id": 2, "name": "b"}])
+    pipeline.close()
+
+    assert read_rows(pipeline, "invalid") == [{"id": "1", "title": "a"}]
+
+
+def test_write_retry(pipeline, monkeypatch):
+    write = csv_pipeline._CsvFileWriter.write
+    failures = []
+
+    def flaky_write(self, rows):
+        if len(failures) < 2:
+            failures.append(rows)
+            raise OSError("No space left on device")
+        write(self, rows)
+
+    monkeypatch.setattr(csv_pipeline._CsvFileWriter, "write", flaky_write)
+
+    assert pipeline.save_items("retry", [{"id": 1}, {"id": 2}])
+    for _ in range(50):
+        if pipeline._write_error:
+            break
+        time.sleep(0.01)
+
+    # 写入线程失败期间不再接收数据
+    assert not pipeline.save_items("retry", [{"id": 3}])
+
+    # 写入线程重试成功后恢复
+    for _ in range(500):
+        if not pipeline._write_error:
+            break
+        time.sleep(0.01)
+    assert pipeline.save_items("retry", [{"id": 3}])
+    pipeline.close()
+
+    assert [row["id"] for row in read_rows(pipeline, "retry")] == ["1", "2", "3"]
+
+
+def test_close_with_failed_items(pipeline, monkeypatch):
+    def broken_write(self, rows):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(csv_pipeline._CsvFileWriter, "write", broken_write)
+    handler = ListHandler()
+    log.addHandler(handler)
+
+    assert pipeline.save_items("broken", [{"id": 1, "title": "标题"}])
+    pipeline.close()
+    log.removeHandler(handler)
+
+    # 关闭时仍写入失败的数据记录到日志，不静默丢弃
+    assert "1,标题" in handler.messages[-1]
+    assert not pipeline._pending_writes
+
+
+COMPRESSIONS = [None, "gzip"]
+if csv_pipeline.zstandard:
+    COMPRESSIONS.append("zstd")
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+def test_partial_write(tmp_path, compression):
+    pipeline = CsvPipeline(
+        csv_dir=str(tmp_path), async_write=True, fsync_interval=0, compression=compression
+    )
+    try:
+        assert pipeline.save_items("partial", [{"id": 1, "title": "a"}])
+        for _ in range(100):
+            file_writer = pipeline._file_writers.get("partial")
+            if file_writer and file_writer.size:
+                break
+            time.sleep(0.01)
+
+        # 写入一半时磁盘写满，之后截断也失败
+        raw = file_writer._raw
+
+        class FullDisk:
+            def __getattr__(self, name):
+                return getattr(raw, name)
+
+            def write(self, data):
+                raw.write(data[: len(data) // 2])
+                raise OSError("No space left on device")
+
+            def truncate(self, size):
+                raise OSError("Input/output error")
+
+        file_writer._raw = FullDisk()
+        assert pipeline.save_items("partial", [{"id": 2, "title": "b" * 100}])
+        for _ in range(50):
+            if pipeline._write_error:
+                break
+            time.sleep(0.01)
+        assert pipeline._write_error and file_writer.broken
+
+        # 恢复后重试：先截断半行，再写入整批，不重复、不损坏
+        file_writer._raw = raw
+        for _ in range(500):
+            if not pipeline._write_error:
+                break
+            time.sleep(0.01)
+        assert pipeline.save_items("partial", [{"id": 3, "title": "c"}])
+    finally:
+        pipeline.close()
+        CsvPipeline._table_fieldnames.clear()
+
+    rows = read_rows(pipeline, "partial", compression)
+    assert [row["id"] for row in rows] == ["1", "2", "3"]
+    assert rows[1]["title"] == "b" * 100
@@ -7,6 +7,7 @@ CSV Pipeline 性能测试
 2. 并发写入性能
 3. 内存占用情况
 4. 文件大小和数据完整性
+5. 高吞吐模式（常驻句柄 + 写入线程）与默认模式的吞吐对比
 
 Created on 2025-10-16
 @author: 道长
@@ -457,6 +458,59 @@ class PerformanceTester:
             "elapsed_time": elapsed,
         }
 
+    def test_async_write_performance(self):
+        """测试高吞吐模式与默认模式的吞吐对比"""
+        print("\n" + "=" * 80)
+        print("测试 8: 高吞吐模式吞吐对比（常驻句柄 + 写入线程）")
+        print("=" * 80)
+
+        # ItemBuffer 每批最多 ITEM_UPLOAD_BATCH_MAX_SIZE 条，小批次多次写入时差异最明显
+        batch_size = 100
+        batch_count = 200
+        data = self.generate_test_data(batch_size)
+        total_items = batch_size * batch_count
+
+        modes = {
+            "默认模式": dict(),
+            "高吞吐模式": dict(async_write=True, fsync_interval=1),
+            "高吞吐模式+gzip": dict(async_write=True, fsync_interval=1, compression="gzip"),
+        }
+        results = {}
+
+        for mode, kwargs in modes.items():
+            csv_dir = os.path.join(self.test_dir, "csv_async", str(len(results)))
+            pipeline = CsvPipeline(csv_dir=csv_dir, **kwargs)
+
+            start_time = time.time()
+            for _ in range(batch_count):
+                pipeline.save_items("product_async", data)
+            # close 会等待写入线程把队列写完并刷盘，计入耗时
+            pipeline.close()
+            elapsed = time.time() - start_time
+
+            file_size = sum(
+                os.path.getsize(os.path.join(csv_dir, f)) for f in os.listdir(csv_dir)
+            )
+            results[mode] = {
+                "total_items": total_items,
+                "elapsed_time": elapsed,
+                "throughput": total_items / elapsed if elapsed > 0 else 0,
+                "file_size_kb": file_size / 1024,
+            }
+
+            print(f"{mode:12s} | "
+                  f"总数据: {total_items} | "
+                  f"耗时: {elapsed:.4f}s | "
+                  f"吞吐量: {results[mode]['throughput']:.0f} 条/秒 | "
+                  f"文件大小: {file_size / 1024:.2f}KB")
+
+        base = results["默认模式"]["throughput"]
+        if base:
+            print(f"\n高吞吐模式提升: {results['高吞吐模式']['throughput'] / base:.1f} 倍")
+
+        self.test_results["async_write"] = results
+        return results
+
     def run_all_tests(self):
         """运行所有测试"""
         print("\n")
@@ -476,6 +530,7 @@ class PerformanceTester:
             self.test_append_mode()
             self.test_concurrent_safety()
             self.test_multiple_tables()
+            self.test_async_write_performance()
 
             # 打印总结
             self.print_summary()
@@ -521,6 +576,14 @@ class PerformanceTester:
                 print(f"   {count:6d} 条: {data['memory_used_mb']:.2f}MB, "
                       f"每条 {data['memory_per_item_kb']:.2f}KB")
 
+        # 高吞吐模式总结
+        if "async_write" in self.test_results:
+            print("\n4. 高吞吐模式吞吐对比:")
+            results = self.test_results["async_write"]
+            for mode, data in results.items():
+                print(f"   {mode}: {data['throughput']:.0f} 条/秒, "
+                      f"耗时 {data['elapsed_time']:.4f}s")
+
         print("\n" + "=" * 80)
         print("✅ 所有测试完成！")
         print("=" * 80)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: 编码探测测试及性能对比
+    分别用 UnicodeDammit、requests 的 apparent_encoding、feapder 的分级探测处理 GBK/UTF-8/Big5 混合的页面
+    运行 python tests/test_encoding_detect.py 查看耗时对比
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import time
+
+from bs4 import UnicodeDammit
+from requests.models import Response as RequestsResponse
+
+from feapder.network.encoding import (
+    DETECT_PREFIX_SIZE,
+    can_decode,
+    detect_encoding,
+    host_encoding_cache,
+)
+
+SIMPLIFIED = "这是一个用于测试编码探测的网页，包含中文标题、正文和链接。"
+TRADITIONAL = "這是一個用於測試編碼探測的網頁，包含中文標題、正文和連結。"
+
+
+def make_page(text, repeat):
+    return (
+        "<html><head><title>" + text[:6] + "</title></head><body>"
+        + "".join(f'<p><a href="/item/{i}">{text}</a></p>' for i in range(repeat))
+        + "</body></html>"
+    )
+
+
+def make_corpus(repeat=2000):
+    """
+    生成语料：(url, 编码, 页面bytes, 原文)
+    """
+    corpus = []
+    for i in range(5):
+        for encoding, text in (
+            ("utf-8", SIMPLIFIED),
+            ("gbk", SIMPLIFIED),
+            ("big5", TRADITIONAL),
+        ):
+            page = make_page(text, repeat)
+            url = f"http://{encoding}.feapder.com/page/{i}"
+            corpus.append((url, encoding, page.encode(encoding), page))
+    return corpus
+
+
+def test_detect_encoding():
+    host_encoding_cache.clear()
+    for url, encoding, content, page in make_corpus(repeat=50):
+        detected = detect_encoding(content, url)
+        assert content.decode(detected) == page, (encoding, detected)
+
+
+def test_cached_encoding_checks_tail():
+    """
+    前64KB是纯ASCII，之后才是中文，缓存的编码只校验开头会被误用
+    """
+    url = "http://mixed.feapder.com/page"
+    head = make_page("feapder encoding detect", 3000).encode()
+    assert len(head) > DETECT_PREFIX_SIZE * 2
+
+    for encoding, text in (("gbk", SIMPLIFIED), ("big5", TRADITIONAL)):
+        content = head + make_page(text, 1000).encode(encoding)
+        assert can_decode(content, "shift_jis")
+        assert not can_decode(content, "shift_jis", tail=True)
+
+        host_encoding_cache.clear()
+        host_encoding_cache.set("mixed.feapder.com", "shift_jis")
+        detected = detect_encoding(content, url)
+        assert content.decode(detected).endswith(make_page(text, 1000))
+        assert host_encoding_cache.get("mixed.feapder.com") == detected
+
+
+def test_permissive_cached_encoding():
+    """
+    gb18030 几乎能解码任意字节，缓存命中后仍需统计探测确认
+    """
+    url = "http://big5.feapder.com/page"
+    page = make_page(TRADITIONAL, 50)
+    content = page.encode("big5")
+    assert can_decode(content, "gb18030", tail=True)
+
+    host_encoding_cache.clear()
+    host_encoding_cache.set("big5.feapder.com", "gb18030")
+    detected = detect_encoding(content, url)
+    assert content.decode(detected) == page
+    assert host_encoding_cache.get("big5.feapder.com") == detected
+
+
+def benchmark():
+    corpus = make_corpus()
+    total_size = sum(len(content) for _, _, content, _ in corpus)
+    print(f"语料: {len(corpus)} 个页面, 共 {total_size / 1024 / 1024:.2f}MB")
+
+    def run_unicode_dammit(url, content):
+        return UnicodeDammit(content, is_html=True).original_encoding
+
+    def run_apparent_encoding(url, content):
+        response = RequestsResponse()
+        response._content = content
+        return response.apparent_encoding
+
+    def run_detect_encoding(url, content):
+        return detect_encoding(content, url)
+
+    for name, func in (
+        ("UnicodeDammit", run_unicode_dammit),
+        ("apparent_encoding", run_apparent_encoding),
+        ("detect_encoding", run_detect_encoding),
+    ):
+        host_encoding_cache.clear()
+        correct = 0
+        start_time = time.time()
+        for url, encoding, content, page in corpus:
+            detected = func(url, content)
+            try:
+                correct += content.decode(detected) == page
+            except Exception:
+                pass
+        elapsed = time.time() - start_time
+        print(
+            f"{name:20s} | 耗时: {elapsed:.4f}s | 每页: {elapsed / len(corpus) * 1000:.2f}ms | "
+            f"正确: {correct}/{len(corpus)}"
+        )
+
+
+if __name__ == "__main__":
+    test_detect_encoding()
+    benchmark()
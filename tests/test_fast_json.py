@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: json加速测试
+    运行 python tests/test_fast_json.py 查看大数据量下与标准库的耗时对比
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import datetime
+import enum
+import json
+import time
+
+from feapder.network.response import Response
+from feapder.utils import fast_json, tools
+
+DATA = {
+    "title": "第1页   \"引号\" \\ /",
+    "time": datetime.datetime(2026, 10, 19, 12, 30, 0, 123),
+    "date": datetime.date(2026, 10, 19),
+    "aware": datetime.datetime(2026, 10, 19, tzinfo=datetime.timezone.utc),
+    "items": [
+        {"id": i, "price": i / 3, "name": f"商品{i}", "tags": ["a", "b"], "ok": True}
+        for i in range(100)
+    ],
+    "empty": [{}, []],
+    "none": None,
+}
+
+
+def std_dumps(obj, **kwargs):
+    kwargs.setdefault("separators", fast_json.COMPACT_SEPARATORS)
+    return json.dumps(obj, ensure_ascii=False, default=str, **kwargs)
+
+
+def test_dumps():
+    assert fast_json.dumps(DATA) == std_dumps(DATA)
+    assert fast_json.dumps(DATA, sort_keys=True) == std_dumps(DATA, sort_keys=True)
+    assert fast_json.dumps(DATA, indent=2, separators=None) == std_dumps(
+        DATA, indent=2, separators=None
+    )
+    assert fast_json.dumps_bytes(DATA) == std_dumps(DATA).encode("utf-8")
+
+    # orjson 不支持的交由标准库
+    for data in ({1: "a"}, {"big": 2**70}, {(1, 2): "a"}):
+        assert fast_json.dumps(data, skipkeys=True) == std_dumps(data, skipkeys=True)
+
+    # 标准库默认分隔符
+    assert fast_json.dumps(DATA, separators=None) == std_dumps(DATA, separators=None)
+
+
+class Color(enum.Enum):
+    RED = 1
+
+
+class Level(enum.IntEnum):
+    HIGH = 3
+
+
+class Mode(str, enum.Enum):
+    FAST = "fast"
+
+
+def test_dumps_parity():
+    # orjson 与标准库结果不一致的值交由标准库，任意位置均与标准库一致
+    for value in (
+        Color.RED,
+        Level.HIGH,
+        Mode.FAST,
+        float("nan"),
+        float("inf"),
+        -float("inf"),
+        1.5,
+        datetime.datetime(2026, 10, 19, 12, 30),
+        datetime.date(2026, 10, 19),
+        2**70,
+        -(2**64),
+    ):
+        for data in (value, [value], {"a": [1, {"b": value}]}, {"a": (value,)}):
+            assert fast_json.dumps(data) == std_dumps(data)
+            assert fast_json.dumps_bytes(data) == std_dumps(data).encode("utf-8")
+
+
+def test_dumps_json():
+    for indent in (None, 2, 4):
+        assert tools.dumps_json(DATA, indent=indent) == json.dumps(
+            DATA, ensure_ascii=False, indent=indent, skipkeys=True, default=str
+        )
+
+
+def test_loads():
+    text = std_dumps(DATA)
+    assert fast_json.loads(text) == json.loads(text)
+    assert fast_json.loads(text.encode("utf-8")) == json.loads(text)
+
+    # 加速库不支持的交由标准库
+    assert fast_json.loads('{"big": 123456789012345678901234567890}') == {
+        "big": 123456789012345678901234567890
+    }
+    assert str(fast_json.loads("[NaN]")) == "[nan]"
+
+    # 大数据分块查找，跨块的大整数同样交由标准库
+    for offset in range(fast_json._SCAN_STEP - 20, fast_json._SCAN_STEP + 2):
+        text = '["%s", %d]' % ("x" * offset, 2**70)
+        assert fast_json.loads(text)[1] == 2**70
+        assert fast_json.loads(text.encode("utf-8"))[1] == 2**70
+
+    assert tools.get_json("{'a': 1}") == {"a": 1}
+    assert tools.jsonp2json('callback({"a": "中文"})') == {"a": "中文"}
+
+
+def make_response(content, encoding=None):
+    response = Response.from_dict(
+        {
+            "url": "https://www.feapder.com/api",
+            "status_code": 200,
+            "_content": content,
+            "headers": {"Content-Type": "application/json"},
+            "cookies": {},
+            "elapsed": 0,
+        }
+    )
+    response.encoding = encoding
+    return response
+
+
+def test_response_json():
+    content = std_dumps(DATA).encode("utf-8")
+    assert make_response(content).json == json.loads(content)
+
+    # 非utf-8编码走text
+    content = json.dumps({"name": "中文"}, ensure_ascii=False).encode("gbk")
+    assert make_response(content, encoding="gbk").json == {"name": "中文"}
+
+    # 控制字符与解析text时一样被去掉
+    assert make_response(b'{"a": "x\x01y"}').json == {"a": "xy"}
+
+
+def benchmark(count=200000, times=5):
+    data = {
+        "items": [
+            {
+                "id": i,
+                "title": f"第{i}条数据",
+                "price": i / 7,
+                "time": datetime.datetime(2026, 10, 19, 12, 0, i % 60),
+                "tags": ["a", "b", "c"],
+            }
+            for i in range(count)
+        ]
+    }
+    print(f"json加速库: {fast_json.get_backend()}")
+
+    start = time.perf_counter()
+    for _ in range(times):
+        text = std_dumps(data)
+    std_cost = (time.perf_counter() - start) / times
+
+    start = time.perf_counter()
+    for _ in range(times):
+        fast_json.dumps(data)
+    cost = (time.perf_counter() - start) / times
+    print(
+        f"dumps  大小 {len(text.encode()) / 1024 / 1024:.1f}MB  标准库 {std_cost * 1000:.1f}ms  加速 {cost * 1000:.1f}ms"
+    )
+
+    content = text.encode("utf-8")
+
+    start = time.perf_counter()
+    for _ in range(times):
+        # 先获取text，走原来的 解码为text -> 去特殊字符 -> 标准库解析
+        response = make_response(content)
+        response.text
+        response.json
+    std_cost = (time.perf_counter() - start) / times
+
+    start = time.perf_counter()
+    for _ in range(times):
+        make_response(content).json
+    cost = (time.perf_counter() - start) / times
+    print(
+        f"Response.json  解析text {std_cost * 1000:.1f}ms  直接解析content {cost * 1000:.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    test_dumps()
+    test_dumps_json()
+    test_loads()
+    test_response_json()
+    benchmark()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: HTTP条件请求缓存测试
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import feapder.setting as setting
+from feapder import Request
+from feapder.core.base_parser import BaseParser, TaskParser
+from feapder.network.response_cache import HttpCache, MemoryResponseCache
+
+BODY = "<html><head><title>feapder</title></head><body>详情页</body></html>".encode()
+ETAG = '"v1"'
+
+
+class Handler(BaseHTTPRequestHandler):
+    requests_headers = []
+
+    def do_GET(self):
+        self.requests_headers.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(BODY)))
+        if self.path != "/no-etag":
+            self.send_header("ETag", ETAG)
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture
+def http_cache(monkeypatch):
+    monkeypatch.setattr(setting, "HTTP_CACHE_ENABLE", True)
+    monkeypatch.setattr(
+        Request, "http_cache", HttpCache(store=MemoryResponseCache(), policy="skip")
+    )
+    yield Request.http_cache
+
+
+def test_not_modified(server_url, http_cache):
+    Handler.requests_headers.clear()
+
+    response = Request(server_url + "/detail").get_response()
+    assert response.status_code == 200 and not response.not_modified
+
+    response = Request(server_url + "/detail").get_response()
+    assert Handler.requests_headers[-1].get("If-None-Match") == ETAG
+    assert response.not_modified
+    assert response.status_code == 200
+    assert response.content == BODY
+    assert response.xpath("//title/text()").get() == "feapder"
+    assert http_cache.is_skip(response)
+
+    # 无校验信息的页面不缓存
+    Request(server_url + "/no-etag").get_response()
+    response = Request(server_url + "/no-etag").get_response()
+    assert "If-None-Match" not in Handler.requests_headers[-1]
+    assert not response.not_modified
+
+
+def test_skip_not_modified(server_url, http_cache):
+    Request(server_url + "/detail").get_response()
+    response = Request(server_url + "/detail").get_response()
+    assert http_cache.is_skip(response)
+
+    # 跳过解析函数时，任务爬虫仍将任务标记为完成
+    request = Request(server_url + "/detail", task_id=1)
+    parser = TaskParser(task_table="spider_task", task_state="state")
+    update_items = list(parser.not_modified(request, response))
+    assert len(update_items) == 1
+    assert update_items[0].to_dict == {"id": 1, "state": 1}
+    assert update_items[0].table_name == "spider_task"
+
+    assert not BaseParser().not_modified(request, response)
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: 结构化日志测试
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import json
+import logging
+
+import pytest
+
+import feapder
+import feapder.setting as setting
+from feapder.buffer.item_buffer import ItemBuffer
+from feapder.buffer.request_buffer import AirSpiderRequestBuffer
+from feapder.core.parser_control import AirSpiderParserControl
+from feapder.db.memorydb import MemoryDB
+from feapder.network.item import Item
+from feapder.utils.log import ContextFilter, JsonFormatter, log
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.setFormatter(JsonFormatter())
+        self.logs = []
+
+    def emit(self, record):
+        self.logs.append(json.loads(self.format(record)))
+
+
+@pytest.fixture()
+def json_logs(monkeypatch):
+    monkeypatch.setattr(setting, "LOG_JSON", True)
+    handler = ListHandler()
+    context_filter = ContextFilter()
+    log.addHandler(handler)
+    log.addFilter(context_filter)
+    yield handler.logs
+    log.removeHandler(handler)
+    log.removeFilter(context_filter)
+
+
+def test_json_formatter(json_logs):
+    with log.context(spider="test_spider", correlation_id="1"):
+        with log.context(url="https://www.baidu.com"):
+            log.info(
+                """
+                -------------- 多行日志 --------------
+                url     %s
+                """,
+                "https://www.baidu.com",
+            )
+        try:
+            1 / 0
+        except Exception as e:
+            log.exception(e)
+    log.event("finished", elapsed=1.5)
+
+    message_log, exception_log, event_log = json_logs
+    # 多行日志去掉缩进
+    assert message_log["message"] == (
+        "-------------- 多行日志 --------------\nurl     https://www.baidu.com"
+    )
+    assert message_log["spider"] == "test_spider"
+    assert message_log["url"] == "https://www.baidu.com"
+
+    assert "url" not in exception_log
+    assert exception_log["correlation_id"] == "1"
+    assert exception_log["exception_type"] == "ZeroDivisionError"
+    assert "Traceback" in exception_log["exception"]
+
+    assert "spider" not in event_log
+    assert event_log["event"] == "finished"
+    assert event_log["elapsed"] == 1.5
+    assert event_log["func"] == "test_json_formatter"
+
+
+class JsonLogSpider(feapder.AirSpider):
+    def parse(self, request, response):
+        if request.url.endswith("error"):
+            raise ValueError("解析出错")
+        yield Item(title="标题")
+
+
+def test_correlation_id(json_logs, monkeypatch):
+    monkeypatch.setattr(
+        setting,
+        "ITEM_PIPELINES",
+        ["feapder.pipelines.console_pipeline.ConsolePipeline"],
+    )
+    monkeypatch.setattr(setting, "SPIDER_MAX_RETRY_TIMES", 0)
+
+    item_buffer = ItemBuffer(redis_key="air_spider")
+    parser_control = AirSpiderParserControl(
+        memory_db=MemoryDB(),
+        request_buffer=AirSpiderRequestBuffer(),
+        item_buffer=item_buffer,
+    )
+    parser_control.add_parser(JsonLogSpider())
+
+    request = feapder.Request(
+        "https://www.baidu.com/ok", auto_request=False, parser_name="JsonLogSpider"
+    )
+    parser_control.deal_request(request)
+    error_request = feapder.Request(
+        "https://www.baidu.com/error", auto_request=False, parser_name="JsonLogSpider"
+    )
+    parser_control.deal_request(error_request)
+    item_buffer.flush()
+
+    events = {log_data.get("event"): log_data for log_data in json_logs}
+    success_log = events["request_success"]
+    assert success_log["correlation_id"] == request.correlation_id
+    assert success_log["spider"] == success_log["parser"] == "JsonLogSpider"
+    assert success_log["callback"] == "parse"
+    assert success_log["fingerprint"] == request.fingerprint
+    assert success_log["url"] == "https://www.baidu.com/ok"
+    assert success_log["retry_times"] == 0
+
+    error_log = events["request_error"]
+    assert error_log["exception_type"] == "ValueError"
+    assert error_log["url"] == "https://www.baidu.com/error"
+    assert error_log["correlation_id"] == error_request.correlation_id
+
+    # 数据入库的日志可追溯到产生数据的request
+    flush_log = events["item_flush"]
+    assert flush_log["correlation_ids"] == [request.correlation_id]
+    assert flush_log["items_count"] == 1
+    assert flush_log["success"] is True
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+JSONL Pipeline 性能测试
+
+与 CsvPipeline 对比相同数据量下的写入吞吐与文件大小
+
+Created on 2026-10-19
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import gzip
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from feapder.pipelines import jsonl_pipeline
+from feapder.pipelines.csv_pipeline import CsvPipeline
+from feapder.pipelines.jsonl_pipeline import JsonlPipeline
+from feapder.utils import fast_json
+
+
+def generate_test_data(count):
+    return [
+        {
+            "id": i + 1,
+            "name": f"商品_{i + 1}",
+            "price": 99.99 + i * 0.1,
+            "category": "Electronics",
+            "url": f"https://example.com/product/{i + 1}",
+            "tags": ["a", "b", "c"],
+            "description": f"Description for product {i + 1}" * 3,
+        }
+        for i in range(count)
+    ]
+
+
+def benchmark(name, pipeline, data, batch_count):
+    start_time = time.time()
+    for _ in range(batch_count):
+        pipeline.save_items("product", data)
+    pipeline.close()
+    elapsed = time.time() - start_time
+
+    total_items = len(data) * batch_count
+    print(
+        f"{name:24s} | 总数据: {total_items} | 耗时: {elapsed:.4f}s | "
+        f"吞吐量: {total_items / elapsed:.0f} 条/秒"
+    )
+    return elapsed
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+def main(test_dir="tests/test_jsonl_pipeline/test_output"):
+    if os.path.exists(test_dir):
+        shutil.rmtree(test_dir)
+
+    batch_size = 1000
+    batch_count = 50
+    data = generate_test_data(batch_size)
+
+    print("=" * 80)
+    print("JSONL Pipeline 与 CSV Pipeline 写入性能对比")
+    print("=" * 80)
+
+    cases = [
+        ("CsvPipeline", lambda d: CsvPipeline(csv_dir=d)),
+        ("JsonlPipeline", lambda d: JsonlPipeline(jsonl_dir=d, compression=None)),
+        ("JsonlPipeline+gzip", lambda d: JsonlPipeline(jsonl_dir=d, compression="gzip")),
+    ]
+    if jsonl_pipeline.zstandard:
+        cases.append(
+            ("JsonlPipeline+zstd", lambda d: JsonlPipeline(jsonl_dir=d, compression="zstd"))
+        )
+
+    for index, (name, create_pipeline) in enumerate(cases):
+        output_dir = os.path.join(test_dir, str(index))
+        benchmark(name, create_pipeline(output_dir), data, batch_count)
+        print(f"{'':24s} | 文件大小: {dir_size(output_dir) / 1024:.2f}KB")
+
+    # 对比 orjson 与标准库序列化
+    if fast_json.orjson:
+        orjson = fast_json.orjson
+        fast_json.orjson = None
+        try:
+            output_dir = os.path.join(test_dir, "stdlib")
+            benchmark(
+                "JsonlPipeline(标准库json)",
+                JsonlPipeline(jsonl_dir=output_dir, compression=None),
+                data,
+                batch_count,
+            )
+        finally:
+            fast_json.orjson = orjson
+
+    # 校验数据完整性
+    gzip_dir = os.path.join(test_dir, "2")
+    rows = 0
+    for file_name in os.listdir(gzip_dir):
+        assert not file_name.endswith(".tmp")
+        with gzip.open(os.path.join(gzip_dir, file_name), "rt", encoding="utf-8") as f:
+            for line in f:
+                json.loads(line)
+                rows += 1
+    assert rows == batch_size * batch_count, rows
+    print(f"\n✅ 数据完整性校验通过，共 {rows} 条")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: JSONL Pipeline 测试
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import datetime
+import enum
+import gzip
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from feapder.pipelines import jsonl_pipeline
+from feapder.pipelines.jsonl_pipeline import JsonlPipeline
+from feapder.utils import fast_json
+
+COMPRESSIONS = [None, "gzip"]
+if jsonl_pipeline.zstandard:
+    COMPRESSIONS.append("zstd")
+
+
+def read_lines(path):
+    with open(path, "rb") as file:
+        data = file.read()
+    if path.endswith(".gz"):
+        data = gzip.decompress(data)
+    elif path.endswith(".zst"):
+        data = (
+            jsonl_pipeline.zstandard.ZstdDecompressor()
+            .decompressobj(read_across_frames=True)
+            .decompress(data)
+        )
+    return [json.loads(line) for line in data.splitlines()]
+
+
+def read_dir(jsonl_dir):
+    rows = []
+    for file_name in sorted(os.listdir(jsonl_dir)):
+        assert not file_name.endswith(".tmp")
+        rows.extend(read_lines(os.path.join(jsonl_dir, file_name)))
+    return rows
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+def test_save_items(tmp_path, compression):
+    pipeline = JsonlPipeline(jsonl_dir=str(tmp_path), compression=compression)
+    assert pipeline.save_items("product", [{"id": 1, "title": "标题"}, {"id": 2}])
+    assert pipeline.save_items("product", [{"id": 3}])
+
+    # 写入中的分段对下游不可见
+    file_names = os.listdir(tmp_path)
+    assert len(file_names) == 1
+    assert file_names[0].endswith(f".{os.getpid()}.tmp")
+
+    pipeline.close()
+    assert read_dir(tmp_path) == [{"id": 1, "title": "标题"}, {"id": 2}, {"id": 3}]
+
+
+def test_rotate(tmp_path):
+    pipeline = JsonlPipeline(jsonl_dir=str(tmp_path), max_file_size=1)
+    for i in range(3):
+        assert pipeline.save_items("product", [{"id": i}])
+    pipeline.close()
+
+    assert len(os.listdir(tmp_path)) == 3
+    assert read_dir(tmp_path) == [{"id": 0}, {"id": 1}, {"id": 2}]
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+def test_write_retry(tmp_path, compression):
+    pipeline = JsonlPipeline(jsonl_dir=str(tmp_path), compression=compression)
+    assert pipeline.save_items("product", [{"id": 1}])
+
+    # 写入一半时磁盘写满
+    segment = pipeline._segments["product"]
+    raw = segment._raw
+
+    class FullDisk:
+        def __getattr__(self, name):
+            return getattr(raw, name)
+
+        def write(self, data):
+            raw.write(data[: len(data) // 2])
+            raise OSError("No space left on device")
+
+    segment._raw = FullDisk()
+    assert not pipeline.save_items("product", [{"id": 2, "content": "x" * 100}])
+    segment._raw = raw
+
+    # 失败的批次已截断，ItemBuffer重试后不重复、不损坏
+    assert pipeline.save_items("product", [{"id": 2, "content": "x" * 100}])
+    pipeline.close()
+    assert [row["id"] for row in read_dir(tmp_path)] == [1, 2]
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+def test_recover_segment(tmp_path, compression):
+    pipeline = JsonlPipeline(jsonl_dir=str(tmp_path), compression=compression)
+    pipeline.save_items("product", [{"id": 1}])
+    pipeline.save_items("product", [{"id": 2}])
+    segment = pipeline._segments["product"]
+    segment._raw.write(b'{"id": 3, "tit')  # 模拟进程崩溃时写了一半
+    segment.discard()
+
+    # 崩溃进程残留的分段，截断不完整的部分后发布
+    tmp_path_of_dead = segment.tmp_path.replace(f".{os.getpid()}.", f".{dead_pid()}.")
+    os.rename(segment.tmp_path, tmp_path_of_dead)
+    # 存活进程正在写入的分段不处理
+    alive = os.path.join(tmp_path, f"other.jsonl.{os.getppid()}.tmp")
+    open(alive, "wb").close()
+
+    JsonlPipeline(jsonl_dir=str(tmp_path), compression=compression)
+    assert os.path.exists(segment.path)
+    assert os.path.exists(alive)
+    assert read_lines(segment.path) == [{"id": 1}, {"id": 2}]
+
+
+def test_dumps_lines():
+    # 与标准库结果一致，orjson 不一致的值（Enum、NaN）交由标准库
+    class Color(enum.Enum):
+        RED = 1
+
+    items = [
+        {"id": 1, "time": datetime.datetime(2026, 10, 19, 12, 30)},
+        {"id": 2, "color": Color.RED, "score": float("nan")},
+        {"id": 2**70},
+    ]
+    expected = "".join(
+        json.dumps(item, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+        for item in items
+    )
+    assert fast_json.dumps_lines(items) == expected.encode("utf-8")
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: 延迟格式化日志测试
+    运行 python tests/test_lazy_log.py 查看INFO级别下每个请求的日志开销对比
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import logging
+import timeit
+
+import pytest
+
+import feapder.utils.tools as tools
+from feapder.network.request import Request
+from feapder.utils.log import LazyStr, log
+
+
+@pytest.fixture()
+def log_level():
+    old_level = log.level
+
+    def set_level(level):
+        log.setLevel(level)
+
+    yield set_level
+    log.setLevel(old_level)
+
+
+def test_lazy_str(log_level):
+    called = []
+
+    def format_datas(datas):
+        called.append(datas)
+        return tools.dumps_json(datas)
+
+    log_level(logging.INFO)
+    log.debug("datas: %s", LazyStr(format_datas, {"a": 1}))
+    assert not log.is_debug()
+    assert not called
+
+    log_level(logging.DEBUG)
+    log.debug("datas: %s", LazyStr(format_datas, {"a": 1}))
+    assert log.is_debug()
+    assert called == [{"a": 1}]
+
+    assert str(LazyStr(tools.dumps_json, [1], indent=None)) == "[1]"
+
+
+def make_request():
+    request = Request(
+        "https://www.baidu.com/s?wd=feapder",
+        params={"page": 1},
+        headers={"Referer": "https://www.baidu.com"},
+        cookies={"token": "xxx"},
+    )
+    request.parser_name = "TestSpider"
+    request.make_requests_kwargs()
+    return request
+
+
+def benchmark():
+    log.setLevel(logging.INFO)
+    request = make_request()
+    datas = [{"id": i, "title": "标题" * 10, "content": "内容" * 50} for i in range(100)]
+
+    def eager():
+        # 改造前：无论是否输出都先拼接日志
+        log.debug(
+            """
+                -------------- %srequest for ----------------
+                url  = %s
+                method = %s
+                args = %s
+                """
+            % (
+                "%s.%s " % (request.parser_name, request.callback_name or "parse"),
+                request.url,
+                request.method,
+                request.requests_kwargs,
+            )
+        )
+        log.debug("datas: %s" % tools.dumps_json(datas, indent=16))
+
+    def lazy():
+        if log.is_debug():
+            log.debug(
+                "%s %s %s %s",
+                request.parser_name,
+                request.url,
+                request.method,
+                request.requests_kwargs,
+            )
+        log.debug("datas: %s", LazyStr(tools.dumps_json, datas, indent=16))
+
+    count = 2000
+    eager_cost = timeit.timeit(eager, number=count)
+    lazy_cost = timeit.timeit(lazy, number=count)
+    print(f"INFO级别 每个请求的日志开销  改造前 {eager_cost / count * 1e6:.1f}us")
+    print(f"INFO级别 每个请求的日志开销  改造后 {lazy_cost / count * 1e6:.1f}us")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: ParquetPipeline 测试
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import json
+import os
+import time
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from feapder.pipelines.parquet_pipeline import ParquetPipeline
+
+
+def list_files(parquet_dir):
+    return sorted(os.listdir(parquet_dir))
+
+
+def read_rows(parquet_dir, file_format="parquet"):
+    rows = []
+    for file_name in list_files(parquet_dir):
+        assert not file_name.endswith(".tmp")
+        if file_name.endswith(".failed.jsonl"):
+            continue
+        path = os.path.join(parquet_dir, file_name)
+        if file_format == "parquet":
+            rows.extend(pq.read_table(path).to_pylist())
+        else:
+            with pa.OSFile(path, "rb") as file:
+                rows.extend(pa.ipc.open_file(file).read_all().to_pylist())
+    return rows
+
+
+def make_pipeline(parquet_dir, **kwargs):
+    kwargs.setdefault("flush_interval", 0)
+    kwargs.setdefault("rotate_interval", 0)
+    kwargs.setdefault("max_file_size", 0)
+    return ParquetPipeline(parquet_dir=str(parquet_dir), **kwargs)
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_buffer_and_flush(tmp_path, file_format):
+    pipeline = make_pipeline(tmp_path, file_format=file_format, row_group_size=3)
+
+    assert pipeline.save_items("product", [{"id": 1}, {"id": 2}])
+    # 未攒够一个行组，仍在缓冲中
+    assert list_files(tmp_path) == []
+
+    assert pipeline.save_items("product", [{"id": 3}, {"id": 4}])
+    # 写入一个行组，文件未关闭前对下游不可见
+    assert [f[-4:] for f in list_files(tmp_path)] == [".tmp"]
+
+    pipeline.close()
+    assert read_rows(tmp_path, file_format) == [{"id": i} for i in range(1, 5)]
+
+
+def test_timer_flush(tmp_path):
+    pipeline = make_pipeline(tmp_path, flush_interval=0.1, rotate_interval=0.3)
+    assert pipeline.save_items("product", [{"id": 1}])
+
+    # 没有新数据时，后台线程按时写入缓冲并关闭文件
+    for _ in range(100):
+        if list_files(tmp_path) and not list_files(tmp_path)[0].endswith(".tmp"):
+            break
+        time.sleep(0.05)
+    assert read_rows(tmp_path) == [{"id": 1}]
+
+    pipeline.close()
+
+
+def test_schema_evolution(tmp_path):
+    pipeline = make_pipeline(tmp_path, row_group_size=1)
+    pipeline.save_items("product", [{"id": 1, "price": 1}])
+    # 同一字段中 int 与 float 合并为 float
+    pipeline.save_items("product", [{"id": 2, "price": 1.5}])
+    # 新增字段滚动到新文件，缺失的字段补null
+    pipeline.save_items("product", [{"id": 3, "title": "标题", "tags": ["a"]}])
+    pipeline.close()
+
+    files = list_files(tmp_path)
+    assert len(files) == 3
+    schema = pq.read_schema(os.path.join(tmp_path, files[-1]))
+    assert schema.field("price").type == pa.float64()
+    assert schema.names == ["id", "price", "title", "tags"]
+
+    assert read_rows(tmp_path) == [
+        {"id": 1, "price": 1},
+        {"id": 2, "price": 1.5},
+        {"id": 3, "price": None, "title": "标题", "tags": '["a"]'},
+    ]
+
+
+def test_rollover(tmp_path):
+    pipeline = make_pipeline(tmp_path, row_group_size=1, max_file_size=1)
+    for i in range(3):
+        pipeline.save_items("product", [{"id": i}])
+    pipeline.close()
+
+    # 每个行组写入后文件大小即超过限制，下次写入时滚动
+    assert len(list_files(tmp_path)) == 3
+    assert read_rows(tmp_path) == [{"id": i} for i in range(3)]
+
+
+def test_save_error(tmp_path):
+    pipeline = make_pipeline(tmp_path, row_group_size=2)
+    assert pipeline.save_items("product", [{"id": 1}])
+    # 字段名非字符串，无法写入。之前已确认的数据单独写入，本批交由ItemBuffer重试
+    assert not pipeline.save_items("product", [{"id": 2, 3: "x"}])
+    assert pipeline.save_items("product", [{"id": 3}])
+    pipeline.close()
+    assert read_rows(tmp_path) == [{"id": 1}, {"id": 3}]
+    assert not [f for f in list_files(tmp_path) if f.endswith(".failed.jsonl")]
+
+
+def test_set_aside_acknowledged_rows(tmp_path):
+    pipeline = make_pipeline(tmp_path, row_group_size=2)
+    # 已返回成功的数据写不进去时转存，不再拖累后续的批次
+    assert pipeline.save_items("product", [{"id": 1, 3: "x"}])
+    assert not pipeline.save_items("product", [{"id": 2}])
+    assert pipeline.save_items("product", [{"id": 2}])
+    assert pipeline.save_items("product", [{"id": 3}])
+    # 关闭时剩余缓冲写入失败也转存，不丢数据
+    assert pipeline.save_items("product", [{"id": 4, 5: "y"}])
+    pipeline.close()
+
+    assert read_rows(tmp_path) == [{"id": 2}, {"id": 3}]
+    failed_rows = []
+    for file_name in list_files(tmp_path):
+        if file_name.endswith(".failed.jsonl"):
+            with open(os.path.join(tmp_path, file_name), "rb") as file:
+                failed_rows.extend(json.loads(line) for line in file)
+    assert failed_rows == [{"id": 1, "3": "x"}, {"id": 4, "5": "y"}]
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: 代理池测试
+    运行 python tests/test_proxy_pool.py 查看模拟负载下 ProxyPool 与 ScoredProxyPool 的对比
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import feapder.setting as setting
+from feapder.db.memorydb import MemoryDB
+from feapder.network.proxy_pool import (
+    BaseProxyPool,
+    ProxyPool,
+    ProxyUnavailableError,
+    ScoredProxyPool,
+)
+from feapder.network.request import Request
+
+
+class Handler(BaseHTTPRequestHandler):
+    proxies = [f"127.0.0.{i}:8888" for i in range(1, 11)]
+    pull_times = 0
+
+    def do_GET(self):
+        self.__class__.pull_times += 1
+        body = "\r\n".join(self.proxies).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def proxy_api():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_get_proxy(proxy_api):
+    proxy_pool = ScoredProxyPool(proxy_api=proxy_api, min_size=0, refill_interval=0.1)
+    proxies = proxy_pool.get_proxy()
+    assert proxies["http"].startswith("http://127.0.0.")
+    assert len(proxy_pool) == 10
+
+
+def test_report_and_remove():
+    proxy_pool = ScoredProxyPool(
+        proxy_api="http://127.0.0.1:1", min_size=0, max_failed_times=2
+    )
+    proxy_pool.add_proxies(["a:1", "b:1", "c:1"])
+
+    proxy_pool.report_proxy("a:1", True, 0.1)
+    proxy_pool.report_proxy("a:1", True, 0.3)
+    proxy_pool.report_proxy("b:1", False)
+    proxy_pool.report_proxy("unknown:1", False)
+
+    stats = proxy_pool.proxy_stats()
+    assert stats[0]["proxy"] == "a:1"
+    assert stats[0]["latency"] == pytest.approx(0.3 * 0.3 + 0.7 * 0.1)
+    assert stats[-1]["proxy"] == "b:1"
+
+    # 连续失败达到上限自动删除
+    proxy_pool.report_proxy("b:1", False)
+    assert len(proxy_pool) == 2
+
+    # 删除后其他代理的下标仍正确
+    proxy_pool.del_proxy("a:1")
+    proxy_pool.del_proxy("a:1")
+    assert len(proxy_pool) == 1
+    assert proxy_pool.get_proxy()["http"] == "http://c:1"
+
+    proxy_pool.del_proxy("c:1")
+    proxy_pool.wait_timeout = 0.1
+    assert proxy_pool.get_proxy() is None
+
+
+def test_weighted_selection():
+    proxy_pool = ScoredProxyPool(
+        proxy_api="http://127.0.0.1:1", min_size=0, sample_size=10
+    )
+    proxy_pool.add_proxies(["good:1", "bad:1"])
+    for _ in range(20):
+        proxy_pool.report_proxy("good:1", True, 0.1)
+        proxy_pool.report_proxy("bad:1", True, 5)
+
+    used = [proxy_pool.get_proxy()["http"] for _ in range(1000)]
+    assert used.count("http://good:1") > 800
+
+
+class EmptyProxyPool(BaseProxyPool):
+    get_times = 0
+
+    def get_proxy(self):
+        self.get_times += 1
+        return None
+
+    def del_proxy(self, proxy):
+        pass
+
+
+def test_acquire_timeout():
+    proxy_pool = EmptyProxyPool()
+    start = time.time()
+    assert proxy_pool.acquire_proxy(timeout=1) is None
+    assert 1 <= time.time() - start < 1.2
+    # 等待间隔逐步增加，不空转
+    assert proxy_pool.get_times < 6
+
+
+def test_acquire_wakeup():
+    proxy_pool = ScoredProxyPool(proxy_api="http://127.0.0.1:1", min_size=0)
+    threading.Timer(0.2, proxy_pool.add_proxies, args=(["a:1"],)).start()
+
+    start = time.time()
+    assert proxy_pool.acquire_proxy(timeout=5)["http"] == "http://a:1"
+    # 添加代理后立即唤醒
+    assert time.time() - start < 1
+
+
+def test_default_pool_acquire(proxy_api):
+    proxy_pool = ProxyPool(proxy_api=proxy_api)
+    assert proxy_pool.acquire_proxy(timeout=1)["http"].startswith("http://127.0.0.")
+
+    # 提取接口不可用时不超过等待时间，返回None
+    proxy_pool = ProxyPool(proxy_api="http://127.0.0.1:1")
+    start = time.time()
+    assert proxy_pool.acquire_proxy(timeout=1) is None
+    assert time.time() - start < 1.5
+
+
+def test_request_proxy_unavailable(monkeypatch):
+    monkeypatch.setattr(setting, "PROXY_ENABLE", True)
+    monkeypatch.setattr(setting, "PROXY_EXTRACT_API", "http://127.0.0.1:1")
+    monkeypatch.setattr(setting, "PROXY_ACQUIRE_TIMEOUT", 0.2)
+    monkeypatch.setattr(Request, "proxies_pool", EmptyProxyPool())
+
+    with pytest.raises(ProxyUnavailableError):
+        Request("http://127.0.0.1:1").make_requests_kwargs()
+
+    # 默认的代理池提取失败时同样按等待超时处理，由调用方重新入队
+    monkeypatch.setattr(Request, "proxies_pool", ProxyPool())
+    with pytest.raises(ProxyUnavailableError):
+        Request("http://127.0.0.1:1").make_requests_kwargs()
+
+
+def test_memory_db_delay():
+    db = MemoryDB()
+    db.add_delay(Request("http://127.0.0.1:1/delay"), 0.5)
+    db.add(Request("http://127.0.0.1:1/now"))
+
+    assert not db.empty()
+    assert db.get().url.endswith("/now")
+    assert db.get() is None
+    assert not db.empty()
+
+    time.sleep(0.5)
+    assert db.get().url.endswith("/delay")
+    assert db.empty()
+
+
+class Simulator:
+    """
+    模拟代理：每个代理有固定的失败率及延迟
+    """
+
+    def __init__(self, count=200):
+        self.quality = {
+            f"10.0.{i // 256}.{i % 256}:8888": (
+                random.choice([0.02, 0.05, 0.3, 0.8]),
+                random.choice([0.05, 0.2, 1, 3]),
+            )
+            for i in range(count)
+        }
+
+    def request(self, proxy):
+        fail_rate, latency = self.quality[proxy]
+        return random.random() > fail_rate, latency * random.uniform(0.5, 1.5)
+
+
+def simulate(proxy_pool, simulator, requests=20000, threads=16):
+    """
+    模拟请求，返回成功率、平均延迟、取代理的平均耗时
+    """
+    lock = threading.Lock()
+    result = {"success": 0, "latency": 0, "get_cost": 0}
+
+    def worker(count):
+        success = latency_sum = get_cost = 0
+        for _ in range(count):
+            start = time.perf_counter()
+            proxy = proxy_pool.get_proxy()["http"].replace("http://", "")
+            get_cost += time.perf_counter() - start
+
+            ok, latency = simulator.request(proxy)
+            proxy_pool.report_proxy(proxy, ok, latency if ok else None)
+            success += ok
+            latency_sum += latency
+        with lock:
+            result["success"] += success
+            result["latency"] += latency_sum
+            result["get_cost"] += get_cost
+
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(worker, [requests // threads] * threads))
+
+    total = requests // threads * threads
+    return (
+        result["success"] / total,
+        result["latency"] / total,
+        result["get_cost"] / total * 1e6,
+    )
+
+
+def benchmark():
+    random.seed(1)
+    simulator = Simulator()
+
+    proxy_pool = ProxyPool(proxy_api="http://127.0.0.1:1")
+    for proxy in simulator.quality:
+        proxy_pool.proxy_queue.put_nowait(proxy)
+    rate, latency, cost = simulate(proxy_pool, simulator)
+    print(f"ProxyPool        成功率 {rate:.1%}  平均延迟 {latency:.2f}s  取代理 {cost:.1f}us")
+
+    proxy_pool = ScoredProxyPool(
+        proxy_api="http://127.0.0.1:1", min_size=0, max_failed_times=10**9
+    )
+    proxy_pool.add_proxies(list(simulator.quality))
+    rate, latency, cost = simulate(proxy_pool, simulator)
+    print(f"ScoredProxyPool  成功率 {rate:.1%}  平均延迟 {latency:.2f}s  取代理 {cost:.1f}us")
+
+    # 删除代理的耗时
+    for size in (1000, 100000):
+        proxies = [f"proxy:{i}" for i in range(size)]
+        proxy_pool = ProxyPool(proxy_api="http://127.0.0.1:1")
+        for proxy in proxies:
+            proxy_pool.proxy_queue.put_nowait(proxy)
+        start = time.perf_counter()
+        for proxy in proxies[-100:]:
+            proxy_pool.del_proxy(proxy)
+        queue_cost = (time.perf_counter() - start) / 100 * 1e6
+
+        proxy_pool = ScoredProxyPool(proxy_api="http://127.0.0.1:1", min_size=0)
+        proxy_pool.add_proxies(proxies)
+        start = time.perf_counter()
+        for proxy in proxies[-100:]:
+            proxy_pool.del_proxy(proxy)
+        scored_cost = (time.perf_counter() - start) / 100 * 1e6
+        print(
+            f"{size}个代理 删除一个代理  ProxyPool {queue_cost:.1f}us  ScoredProxyPool {scored_cost:.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    test_report_and_remove()
+    test_weighted_selection()
+    benchmark()
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: 分布式代理池测试，需本地redis
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from redis import Redis
+
+from feapder.network.proxy_pool import RedisProxyPool
+
+REDIS_URL = "redis://@localhost:6379/0"
+REDIS_KEY = "test_proxy_pool"
+
+
+class Handler(BaseHTTPRequestHandler):
+    pull_times = 0
+
+    def do_GET(self):
+        self.__class__.pull_times += 1
+        body = "\r\n".join(f"127.0.0.{i}:8888" for i in range(1, 21)).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def proxy_api():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture()
+def redis():
+    redis = Redis.from_url(REDIS_URL, decode_responses=True)
+    try:
+        redis.ping()
+    except Exception:
+        pytest.skip("需本地redis")
+
+    def clear():
+        keys = redis.keys(REDIS_KEY + ":*")
+        if keys:
+            redis.delete(*keys)
+
+    clear()
+    yield redis
+    clear()
+
+
+def make_pool(proxy_api="http://127.0.0.1:1", **kwargs):
+    kwargs.setdefault("min_size", 0)
+    return RedisProxyPool(
+        proxy_api=proxy_api, redis_key=REDIS_KEY, redis_url=REDIS_URL, **kwargs
+    )
+
+
+def test_lease_and_return(redis):
+    node1 = make_pool(lease_size=2, max_leases=1)
+    node2 = make_pool(lease_size=2, max_leases=1)
+    node1.add_proxies(["a:1", "b:1", "c:1"])
+    assert node1.add_proxies(["a:1"]) == 0
+
+    node1.get_proxy()
+    node2.get_proxy()
+    # 每个代理最多被租用一次
+    assert len(node1._proxies) == 2
+    assert node2._proxies == list({"a:1", "b:1", "c:1"} - set(node1._proxies))
+    assert redis.zcard(f"{REDIS_KEY}:z_proxy_lease") == 3
+
+    node1.close()
+    node2.close()
+    assert redis.zcard(f"{REDIS_KEY}:z_proxy_lease") == 0
+    assert all(
+        int(redis.hget(f"{REDIS_KEY}:h_proxy_stats", f"{proxy}:leased")) == 0
+        for proxy in ("a:1", "b:1", "c:1")
+    )
+
+
+def test_report_shared_between_nodes(redis):
+    node1 = make_pool(lease_size=3, max_failed_times=2, report_interval=0)
+    node2 = make_pool(lease_size=3, max_failed_times=2, report_interval=0)
+    node1.add_proxies(["a:1", "b:1", "c:1"])
+    node1.get_proxy()
+    node2.get_proxy()
+
+    node1.report_proxy("a:1", True, 0.1)
+    node1.report_proxy("b:1", False)
+    node2.report_proxy("b:1", False)
+
+    # 两个节点的失败累加，达到上限后从redis删除
+    assert redis.zscore(f"{REDIS_KEY}:z_proxy_pool", "b:1") is None
+    assert redis.zscore(f"{REDIS_KEY}:z_proxy_pool", "a:1") > redis.zscore(
+        f"{REDIS_KEY}:z_proxy_pool", "c:1"
+    )
+
+    node1.del_proxy("a:1")
+    assert redis.zcard(f"{REDIS_KEY}:z_proxy_pool") == 1
+
+
+def test_single_leader_extract(redis, proxy_api):
+    Handler.pull_times = 0
+    nodes = [make_pool(proxy_api=proxy_api, refill_interval=0.1) for _ in range(5)]
+    threads = [threading.Thread(target=node.get_proxy) for node in nodes]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(node._proxies for node in nodes)
+    assert redis.zcard(f"{REDIS_KEY}:z_proxy_pool") == 20
+    time.sleep(0.5)
+    assert Handler.pull_times == 1
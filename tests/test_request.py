@@ -43,4 +43,18 @@ def test_from_text():
 
 def test_to_dict():
     request = Request("https://www.baidu.com?a=1&b=2", data={"a":1}, params="k=1", callback="test", task_id=1, cookies={"a":1})
-    print(request.to_dict)
\ No newline at end of file
+    print(request.to_dict)
+
+def test_lazy_absolute_links():
+    text = '<a href="/a/1">a</a><img src="b.png"><div><a href="//cdn.feapder.com/c">c</a></div>'
+    resp = Response.from_text(text=text, url="http://feapder.com/list/")
+    resp.make_absolute_links = "lazy"
+
+    assert "/a/1" in resp.text and "http://feapder.com/a/1" not in resp.text
+    assert resp.xpath("//a/@href").extract() == [
+        "http://feapder.com/a/1",
+        "http://cdn.feapder.com/c",
+    ]
+    assert resp.css("img::attr(src)").get() == "http://feapder.com/list/b.png"
+    assert resp.xpath("//div").xpath("./a/@href").get() == "http://cdn.feapder.com/c"
+    assert resp.re_first('src="(.*?)"') == "http://feapder.com/list/b.png"
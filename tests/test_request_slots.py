@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: Request 紧凑存储及写时复制测试
+    运行 python tests/test_request_slots.py 查看内存队列中100万个request的内存占用及copy耗时
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import copy
+import gc
+import sys
+import threading
+import time
+import tracemalloc
+
+from feapder.db.memorydb import MemoryDB
+from feapder.network.item import Item
+from feapder.network.request import Request
+
+
+def test_attrs():
+    request = Request(
+        "https://www.baidu.com",
+        params={"wd": "feapder"},
+        headers={"Referer": "https://www.baidu.com"},
+        item=Item(title="标题"),
+    )
+    assert not hasattr(request, "__dict__")
+    assert request.params == {"wd": "feapder"}
+    assert request.item.title == "标题"
+    assert not hasattr(request, "data")
+    assert request.requests_kwargs == {
+        "params": {"wd": "feapder"},
+        "headers": {"Referer": "https://www.baidu.com"},
+    }
+
+    # 赋值requests参数时同步更新requests_kwargs
+    request.data = {"page": 1}
+    request.page = 1
+    assert request.requests_kwargs["data"] == {"page": 1}
+    assert "page" not in request.requests_kwargs
+
+    request_dict = request.to_dict
+    assert request_dict["url"] == "https://www.baidu.com"
+    assert request_dict["params"] == {"wd": "feapder"}
+    assert request_dict["page"] == 1
+    assert "requests_kwargs" not in request_dict
+    assert "retry_times" not in request_dict  # 默认值不序列化
+
+    new_request = Request.from_dict(request_dict)
+    assert new_request.item.to_dict == {"title": "标题"}
+    assert new_request.fingerprint == request.fingerprint
+
+
+def test_copy_on_write():
+    request = Request(
+        "https://www.baidu.com",
+        headers={"Referer": "https://www.baidu.com"},
+        callback="parse_list",
+    )
+    request.make_requests_kwargs()
+
+    new_request = request.copy()
+    assert new_request.url == request.url
+    assert new_request.callback == "parse_list"
+    assert new_request.retry_times == 0
+    # 未修改前共享属性
+    assert new_request._attrs is request._attrs
+
+    new_request.headers["Cookie"] = "a=1"
+    new_request.retry_times = 1
+    assert "Cookie" not in request.headers
+    assert "Cookie" not in request.requests_kwargs["headers"]
+    assert request.retry_times == 0
+
+    # 原request再次生成requests参数，不影响拷贝
+    request.make_requests_kwargs()
+    request.requests_kwargs["headers"]["Accept"] = "*/*"
+    assert "Accept" not in new_request.headers
+    assert "User-Agent" in new_request.headers  # 保留拷贝前生成的UA
+
+    # 拷贝不带有会话、关联id等运行时属性，重新生成requests参数
+    another = request.copy()
+    another.params = {"page": 2}
+    assert "params" not in request.requests_kwargs
+    assert another.requests_kwargs["params"] == {"page": 2}
+    assert another.custom_ua is False
+
+
+def test_shallow_copy():
+    request = Request(
+        "https://www.baidu.com", headers={"Referer": "https://www.baidu.com"}
+    )
+    request.make_requests_kwargs()
+    request.correlation_id = "1"
+
+    new_request = copy.copy(request)
+    # 浅拷贝保留运行时属性
+    assert new_request.correlation_id == "1"
+    assert new_request.requests_kwargs == request.requests_kwargs
+
+    new_request.extra = 5
+    new_request.headers = {"Cookie": "a=1"}
+    new_request.requests_kwargs["timeout"] = 1
+    assert not hasattr(request, "extra")
+    assert request.headers["Referer"] == "https://www.baidu.com"
+    assert request.requests_kwargs["headers"]["Referer"] == "https://www.baidu.com"
+    assert request.requests_kwargs["timeout"] != 1
+    assert new_request.requests_kwargs["headers"] == {"Cookie": "a=1"}
+
+
+def test_copy_in_threads():
+    request = Request("https://www.baidu.com", params={"page": list(range(1000))})
+    copies = [request.copy() for _ in range(20)]
+
+    def modify(new_request, i):
+        for _ in range(20):
+            new_request.params["page"].append(i)
+
+    threads = [
+        threading.Thread(target=modify, args=(new_request, i))
+        for i, new_request in enumerate(copies)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 各拷贝的修改互不影响，也不影响原request
+    assert request.params["page"] == list(range(1000))
+    for i, new_request in enumerate(copies):
+        assert new_request.params["page"] == list(range(1000)) + [i] * 20
+
+
+def make_requests(count):
+    for i in range(count):
+        yield Request(
+            f"https://www.baidu.com/s?wd=feapder&page={i}",
+            headers={"Referer": "https://www.baidu.com"},
+            callback="parse_list",
+            parser_name="TestSpider",
+        )
+
+
+def benchmark():
+    count = 1000000
+
+    gc.collect()
+    tracemalloc.start()
+    memory_db = MemoryDB()
+    for request in make_requests(count):
+        memory_db.add(request)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"内存队列中{count}个request 占用内存 {memory / 1024 / 1024:.0f}MB")
+    del memory_db
+    gc.collect()
+
+    request = next(make_requests(1))
+    request.make_requests_kwargs()
+
+    copy_count = 100000
+    start = time.time()
+    copies = [request.copy() for _ in range(copy_count)]
+    cost = time.time() - start
+    print(f"request.copy() 耗时 {cost / copy_count * 1e6:.1f}us")
+
+    gc.collect()
+    tracemalloc.start()
+    copies = [request.copy() for _ in range(copy_count)]
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{copy_count}个拷贝 占用内存 {memory / 1024 / 1024:.1f}MB")
+    print(f"单个request对象 {sys.getsizeof(request)}字节")
+
+
+if __name__ == "__main__":
+    benchmark()
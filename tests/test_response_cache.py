@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: response缓存测试
+    运行 python tests/test_response_cache.py 查看新旧缓存格式的大小及耗时对比
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import ast
+import tempfile
+import time
+
+import feapder.setting as setting
+
+from feapder.network.response import Response
+from feapder.network.response_cache import (
+    DiskResponseCache,
+    MemoryResponseCache,
+    dumps_response,
+    loads_response,
+)
+
+HTML = "<html><head><title>feapder</title></head><body>{}</body></html>".format(
+    "".join(f'<p><a href="/item/{i}">第{i}条数据</a></p>' for i in range(2000))
+)
+
+
+def make_response(url="https://www.feapder.com/"):
+    return Response.from_text(
+        HTML,
+        url=url,
+        headers={"Content-Type": "text/html; charset=utf-8"},
+        cookies={"session": "feapder"},
+    )
+
+
+def assert_same_response(response, cached):
+    assert cached.content == response.content
+    assert cached.url == response.url
+    assert cached.status_code == response.status_code
+    assert cached.headers["content-type"] == response.headers["Content-Type"]
+    assert cached.cookies.get_dict() == response.cookies.get_dict()
+    assert cached.xpath("//title/text()").get() == "feapder"
+
+
+def test_dumps_loads():
+    response = make_response()
+    data = dumps_response(response)
+    assert len(data) < len(response.content)
+    assert_same_response(response, loads_response(data))
+
+    # 兼容旧的缓存格式
+    legacy = str(response.to_dict).encode("utf-8")
+    assert_same_response(response, loads_response(legacy))
+
+
+def test_memory_cache():
+    response = make_response()
+    cache = MemoryResponseCache(max_count=2, expire_time=3600)
+    for key in ("a", "b", "c"):
+        cache.set(key, response)
+    # 超过 max_count 淘汰最久未使用的
+    assert cache.get("a") is None
+    assert_same_response(response, cache.get("b"))
+    assert cache.cache_info()["count"] == 2
+
+    cache.set("expired", response, expire_time=0.01)
+    time.sleep(0.02)
+    assert cache.get("expired") is None
+
+    cache = MemoryResponseCache(max_bytes=1, max_count=0)
+    cache.set("a", response)
+    assert cache.get("a") is None
+
+
+def test_compression_level(monkeypatch):
+    response = make_response()
+    monkeypatch.setitem(setting.RESPONSE_CACHE_SETTING, "compression_level", 1)
+    assert MemoryResponseCache().compression_level == 1
+    assert MemoryResponseCache(compression_level=9).compression_level == 9
+
+    fast = MemoryResponseCache()
+    small = MemoryResponseCache(compression_level=9)
+    fast.set("a", response)
+    small.set("a", response)
+    assert small.cache_info()["bytes"] < fast.cache_info()["bytes"]
+
+
+def test_disk_cache():
+    response = make_response()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = DiskResponseCache(cache_dir=cache_dir, expire_time=3600)
+        cache.set("response_cached:test:1", response)
+        assert_same_response(response, cache.get("response_cached:test:1"))
+        assert cache.get("response_cached:test:2") is None
+        assert cache.cache_info() == {"hits": 1, "misses": 1}
+
+        cache.delete("response_cached:test:1")
+        assert cache.get("response_cached:test:1") is None
+
+        cache.set("expired", response, expire_time=0.01)
+        time.sleep(0.02)
+        assert cache.clear_expired() == 1
+        assert cache.get("expired") is None
+
+
+def benchmark(times=200):
+    response = make_response()
+    print(f"响应体大小: {len(response.content) / 1024:.1f}KB")
+
+    start = time.perf_counter()
+    for _ in range(times):
+        legacy = str(response.to_dict)
+        Response.from_dict(ast.literal_eval(legacy))
+    legacy_cost = (time.perf_counter() - start) / times
+
+    start = time.perf_counter()
+    for _ in range(times):
+        data = dumps_response(response)
+        loads_response(data)
+    cost = (time.perf_counter() - start) / times
+
+    print(f"旧格式(repr)      大小 {len(legacy.encode()) / 1024:.1f}KB  序列化+反序列化 {legacy_cost * 1000:.2f}ms")
+    print(f"msgpack+压缩      大小 {len(data) / 1024:.1f}KB  序列化+反序列化 {cost * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    test_dumps_loads()
+    test_memory_cache()
+    test_disk_cache()
+    benchmark()
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: xpath、css表达式缓存测试及性能对比
+    模拟列表页的解析函数，对比每次编译表达式与使用缓存的耗时
+    运行 python tests/test_selector_cache.py 查看对比
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import time
+
+from feapder.network.selector import (
+    Selector,
+    clear_expression_cache,
+    expression_cache_info,
+)
+
+
+def make_page(page):
+    items = "".join(
+        f"""
+        <li class="item" data-id="{page}-{i}">
+            <h3 class="title"><a href="/detail/{page}/{i}">商品{i}</a></h3>
+            <span class="price">{i * 10}.00</span>
+            <span class="shop">店铺{i % 5}</span>
+            <div class="tags"><em>包邮</em><em>新品</em></div>
+            <p class="desc">这是第{page}页第{i}个商品的描述</p>
+        </li>"""
+        for i in range(20)
+    )
+    return f"""
+    <html><head><title>列表页{page}</title></head>
+    <body>
+        <div id="header"><a class="logo" href="/">feapder</a></div>
+        <ul class="list">{items}</ul>
+        <div class="pager"><a class="next" href="/list/{page + 1}">下一页</a></div>
+    </body></html>
+    """
+
+
+def parse(selector):
+    """
+    与爬虫中常见的解析函数一致，同一批表达式在每个页面上执行
+    """
+    datas = []
+    for item in selector.xpath('//ul[@class="list"]/li'):
+        datas.append(
+            {
+                "id": item.xpath("./@data-id").get(),
+                "title": item.xpath('.//h3[@class="title"]/a/text()').get(),
+                "url": item.xpath('.//h3[@class="title"]/a/@href').get(),
+                "price": item.css("span.price::text").get(),
+                "shop": item.css("span.shop::text").get(),
+                "tags": item.xpath('.//div[@class="tags"]/em/text()').getall(),
+                "desc": item.xpath('normalize-space(.//p[@class="desc"])').get(),
+            }
+        )
+    next_page = selector.css("div.pager a.next::attr(href)").get()
+    title = selector.xpath("//title/text()").get()
+    return title, next_page, datas
+
+
+class UncachedSelector(Selector):
+    """
+    每次调用都重新编译xpath（parsel 1.12 之前的行为），用于对比
+    """
+
+    def _xpath(self, query, namespaces=None, **kwargs):
+        if self.type not in ("html", "xml") or not hasattr(self.root, "xpath"):
+            return super()._xpath(query, namespaces=namespaces, **kwargs)
+
+        nsp = dict(self.namespaces)
+        if namespaces is not None:
+            nsp.update(namespaces)
+        result = self.root.xpath(
+            query, namespaces=nsp, smart_strings=self._lxml_smart_strings, **kwargs
+        )
+        if not isinstance(result, list):
+            result = [result]
+        return self.selectorlist_cls(
+            [
+                self.__class__(
+                    root=x, _expr=query, namespaces=self.namespaces, type=self.type
+                )
+                for x in result
+            ]
+        )
+
+    def _css2xpath(self, query):
+        return super(Selector, self)._css2xpath(query)
+
+
+def test_expression_cache():
+    clear_expression_cache()
+    selector = Selector(make_page(1))
+    title, next_page, datas = parse(selector)
+    assert title == "列表页1"
+    assert next_page == "/list/2"
+    assert len(datas) == 20
+    assert datas[3]["price"] == "30.00"
+    assert datas[3]["tags"] == ["包邮", "新品"]
+    assert parse(UncachedSelector(make_page(1))) == (title, next_page, datas)
+
+    misses = expression_cache_info()["xpath"]["misses"]
+    parse(Selector(make_page(2)))
+    cache_info = expression_cache_info()
+    assert cache_info["xpath"]["misses"] == misses
+    assert cache_info["xpath"]["hits"] > 0
+    assert cache_info["css"]["hits"] > 0
+
+    # 未用到的 EXSLT 命名空间不影响缓存，用到的每次重新编译
+    misses = expression_cache_info()["xpath"]["misses"]
+    assert selector.xpath('//li[re:test(@data-id, "1-1\\d$")]/@data-id').getall() == [
+        f"1-1{i}" for i in range(10)
+    ]
+    assert selector.xpath("set:distinct(//span[@class='shop']/text())").getall() == [
+        f"店铺{i}" for i in range(5)
+    ]
+    selector.xpath("set:distinct(//span[@class='shop']/text())")
+    assert expression_cache_info()["xpath"]["misses"] == misses + 1
+
+    # xml 文档的子节点保持 xml 类型
+    xml = Selector('<root><item id="1"/></root>', type="xml")
+    item = xml.css("item")[0]
+    assert item.type == "xml"
+    assert item.xpath("./@id").get() == "1"
+
+    # xpath 变量及错误的表达式
+    assert selector.xpath("//li[@data-id=$id]/@data-id", id="1-5").get() == "1-5"
+    try:
+        selector.xpath("//li[")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("错误的xpath应抛出ValueError")
+
+
+def benchmark(pages=500):
+    htmls = [make_page(page) for page in range(pages)]
+    for name, selector_cls in (("每次编译", UncachedSelector), ("表达式缓存", Selector)):
+        selectors = [selector_cls(html) for html in htmls]
+        clear_expression_cache()
+        start = time.perf_counter()
+        for selector in selectors:
+            parse(selector)
+        cost = time.perf_counter() - start
+        print(f"{name:<8} {pages} 个页面 耗时 {cost:.2f}s, 平均 {cost / pages * 1000:.3f}ms/页")
+
+    print("缓存命中情况:", expression_cache_info())
+
+
+if __name__ == "__main__":
+    test_expression_cache()
+    benchmark()
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: 直接从bytes构建selector的测试及性能对比
+    对比 text 路径（解码 -> 清洗 -> 重新编码 -> lxml）与 bytes 路径（清洗 -> lxml）的耗时及内存峰值
+    运行 python tests/test_selector_from_bytes.py 查看对比
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import time
+import tracemalloc
+
+from feapder.network.response import Response
+
+HTML = '<html><body><p class="t">标题&nbsp;一\x00\x85</p><a href="/a">链接</a></body></html>'
+
+
+def make_response(html, make_absolute_links="lazy", encoding="utf-8"):
+    response = Response.from_text(html, url="http://www.feapder.com/", encoding=encoding)
+    response.make_absolute_links = make_absolute_links
+    return response
+
+
+def test_selector_from_bytes():
+    response = make_response(HTML)
+    assert response.xpath("//p/text()").get() == "标题 一"
+    assert response.xpath("//a/@href").get() == "http://www.feapder.com/a"
+    # 只用xpath时不生成text
+    assert response._cached_text is None
+
+    # 与 text 路径结果一致
+    expected = make_response(HTML, make_absolute_links=True)
+    assert expected.xpath("//p/text()").get() == response.xpath("//p/text()").get()
+    assert expected.xpath("//a/@href").get() == response.xpath("//a/@href").get()
+
+    # 非utf-8编码走 text 路径
+    response = make_response(HTML.replace("\x85", ""), encoding="gbk")
+    response.encoding = "gbk"
+    assert response.xpath("//p/text()").get() == "标题 一"
+    assert response._cached_text is not None
+
+    # 先获取过text时，直接复用
+    response = make_response(HTML)
+    assert "&nbsp;" in response.text
+    assert response.xpath("//p/text()").get() == "标题 一"
+
+
+def test_invalid_utf8_after_prefix():
+    """
+    64KB之后才出现非法utf-8字节，需走text路径，解析结果与先获取text时一致
+    """
+    content = make_page(2000).encode()
+    content = content.replace(b"1999</td>", b"1999\xff\xfe</td>")
+    assert content.index(b"\xff") > 64 * 1024
+
+    def make():
+        response = Response.from_dict(
+            {
+                "_content": content,
+                "cookies": {},
+                "encoding": "utf-8",
+                "headers": {},
+                "status_code": 200,
+                "elapsed": 0,
+                "url": "http://www.feapder.com/",
+            }
+        )
+        response.make_absolute_links = "lazy"
+        response.encoding = "utf-8"
+        return response
+
+    response = make()
+    assert not response._can_parse_from_content()
+    titles = response.xpath('//td[@class="title"]/text()').getall()
+
+    expected = make()
+    assert expected.text
+    assert titles == expected.xpath('//td[@class="title"]/text()').getall()
+    assert len(titles) == 2000
+
+
+def make_page(repeat):
+    return (
+        "<html><body><table>"
+        + "".join(
+            f'<tr><td class="title">标题&nbsp;{i}</td><td><a href="/item/{i}">详情</a></td></tr>'
+            for i in range(repeat)
+        )
+        + "</table></body></html>"
+    )
+
+
+def parse(response, from_text):
+    if from_text:
+        # 先生成text，selector 由text构建
+        response.text
+    return response.xpath('//td[@class="title"]/text()').getall()
+
+
+def measure(html, from_text, times=5):
+    cost = 0
+    for _ in range(times):
+        response = make_response(html)
+        start = time.perf_counter()
+        parse(response, from_text)
+        cost += time.perf_counter() - start
+
+    response = make_response(html)
+    tracemalloc.start()
+    parse(response, from_text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return cost / times, peak
+
+
+def benchmark():
+    html = make_page(50000)
+    print("页面大小: {:.2f}MB".format(len(html.encode()) / 1024 / 1024))
+    for name, from_text in (("text 路径", True), ("bytes 路径", False)):
+        cost, peak = measure(html, from_text)
+        print(f"  {name:<10} 耗时 {cost * 1000:.2f}ms  内存峰值 {peak / 1024 / 1024:.2f}MB")
+
+
+if __name__ == "__main__":
+    test_selector_from_bytes()
+    test_invalid_utf8_after_prefix()
+    benchmark()
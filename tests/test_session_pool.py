@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: 会话池测试
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from feapder.network.request import Request
+from feapder.network.session_pool import SessionPool
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = json.dumps(
+            {
+                "user_agent": self.headers.get("User-Agent"),
+                "cookie": self.headers.get("Cookie"),
+                "port": self.client_address[1],
+            }
+        ).encode()
+        self.send_response(200)
+        if self.path.startswith("/login"):
+            self.send_header("Set-Cookie", f"token={self.path.split('=')[-1]}; Path=/")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_session_affinity(server):
+    Request.session_pool = SessionPool(Request.user_agent_pool)
+
+    Request(f"{server}/login?user=a", session_key="a").get_response()
+    Request(f"{server}/login?user=b", session_key="b").get_response()
+
+    a1 = Request(f"{server}/list", session_key="a").get_response().json
+    a2 = Request(f"{server}/list", session_key="a").get_response().json
+    b = Request(f"{server}/list", session_key="b").get_response().json
+    anonymous = Request(f"{server}/list").get_response().json
+
+    # 同一会话的UA、cookie固定，并复用连接
+    assert a1["cookie"] == a2["cookie"] == "token=a"
+    assert a1["user_agent"] == a2["user_agent"]
+    assert a1["port"] == a2["port"]
+    assert b["cookie"] == "token=b"
+    assert anonymous["cookie"] is None
+
+    # session_key 参与序列化，会话本身不参与
+    request_dict = Request(f"{server}/list", session_key="a").to_dict
+    assert request_dict["session_key"] == "a"
+    assert "session_identity" not in request_dict
+
+
+def test_lru_and_idle_timeout():
+    session_pool = SessionPool(Request.user_agent_pool, max_sessions=2, idle_timeout=0.2)
+    a = session_pool.get("a")
+    session_pool.get("b")
+    assert session_pool.get("a") is a
+
+    # 超过上限淘汰最久未使用的b
+    session_pool.get("c")
+    assert len(session_pool) == 2
+    assert "a" in session_pool and "b" not in session_pool
+
+    # 空闲超时后重新分配
+    time.sleep(0.3)
+    assert session_pool.get("a") is not a
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: SqlitePipeline 测试
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import sqlite3
+
+from feapder.pipelines.sqlite_pipeline import SqlitePipeline
+
+
+def test_save_and_update_items(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    pipeline = SqlitePipeline(db_path, unique_keys={"spider_data": "url"})
+
+    assert pipeline.save_items(
+        "spider_data",
+        [{"url": "a", "title": "A", "count": 1}, {"url": "b", "title": "B", "count": 2}],
+    )
+    # 重复数据忽略，新字段自动加列
+    assert pipeline.save_items("spider_data", [{"url": "a", "title": "AA", "tags": [1]}])
+    assert pipeline.update_items(
+        "spider_data",
+        [{"url": "b", "title": "BB", "count": 3}, {"url": "c", "title": "C", "count": 4}],
+        update_keys=("title",),
+    )
+    pipeline.close()
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    rows = conn.execute(
+        'SELECT url, title, count, tags FROM "spider_data" ORDER BY url'
+    ).fetchall()
+    print(rows)
+    assert rows == [("a", "A", 1, None), ("b", "BB", 2, None), ("c", "C", 4, None)]
+
+
+def test_update_without_unique_key(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    pipeline = SqlitePipeline(db_path)
+    assert pipeline.save_items("spider_data", [{"url": "a", "title": "A"}])
+    # 没有唯一索引时无法判断数据是否已存在，不执行更新
+    assert not pipeline.update_items(
+        "spider_data", [{"url": "a", "title": "B"}], update_keys=("title",)
+    )
+    pipeline.close()
+
+    # 表已存在后再配置 unique_keys，补建唯一索引
+    pipeline = SqlitePipeline(db_path, unique_keys={"spider_data": "url"})
+    assert pipeline.update_items(
+        "spider_data",
+        [{"url": "a", "title": "B", "tags": ("x", "y")}],
+        update_keys=("title", "tags"),
+    )
+    pipeline.close()
+
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute('SELECT url, title, tags FROM "spider_data"').fetchall()
+    assert rows == [("a", "B", '["x", "y"]')]
+
+
+def test_existing_unique_index(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE "spider_data" ("id" INTEGER PRIMARY KEY, "title" TEXT)')
+    conn.commit()
+
+    # 未配置 unique_keys 时使用表中已有的主键
+    pipeline = SqlitePipeline(db_path)
+    assert pipeline.save_items("spider_data", [{"id": 1, "title": "A"}])
+    assert pipeline.update_items(
+        "spider_data", [{"id": 1, "title": "B"}], update_keys=("title",)
+    )
+    pipeline.close()
+
+    rows = conn.execute('SELECT id, title FROM "spider_data"').fetchall()
+    assert rows == [(1, "B")]
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: 流式下载及响应体大小限制测试
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from feapder import Request
+from feapder.network.response import ResponseTooLargeError
+
+BODY = b"<html><body>" + b"<p>feapder</p>" * 100000 + b"</body></html>"
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if self.path == "/chunked":
+            # 不返回 Content-Length，只能边下载边计数
+            self.send_header("Connection", "close")
+            self.end_headers()
+        else:
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_stream_to_file(server_url):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "page.html")
+        response = Request(server_url + "/", stream_to=path).get_response()
+
+        assert response.content_path == path
+        assert os.path.getsize(path) == len(BODY)
+        assert not os.path.exists(path + ".tmp")
+
+        mm = response.content_mmap()
+        assert mm[:12] == b"<html><body>"
+        mm.close()
+
+        assert response.content == BODY
+        assert response.xpath("//p/text()").get() == "feapder"
+
+
+@pytest.mark.parametrize("path", ["/", "/chunked"])
+def test_max_body_size(server_url, path):
+    with pytest.raises(ResponseTooLargeError):
+        Request(server_url + path, max_body_size=1024).get_response()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        stream_to = os.path.join(tmp_dir, "page.html")
+        with pytest.raises(ResponseTooLargeError):
+            Request(
+                server_url + path, stream_to=stream_to, max_body_size=1024
+            ).get_response()
+        assert os.listdir(tmp_dir) == []
+
+    response = Request(server_url + path, max_body_size=len(BODY)).get_response()
+    assert response.content == BODY
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: GoldUserPool 可用索引测试，取用户部分需本地redis
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from feapder.db.redisdb import RedisDB
+from feapder.network.user_pool import GoldUser, GoldUserPool
+
+REDIS_KEY = "test:gold_available"
+
+
+def make_user(username, **kwargs):
+    kwargs.setdefault("max_use_times", 10)
+    kwargs.setdefault("use_interval", 5)
+    kwargs.setdefault("work_time", (0, 24))
+    return GoldUser(username=username, password="1234", **kwargs)
+
+
+def test_next_use_time():
+    now = time.time()
+    today = datetime.now().strftime("%Y-%m-%d")
+    user = make_user("zhangsan", _last_use_time=now, _reset_use_times_date=today)
+    assert GoldUserPool._next_use_time(user) == pytest.approx(now + 5)
+
+    user = make_user("zhangsan", _last_use_time=now, _delay_use=60)
+    assert GoldUserPool._next_use_time(user) == pytest.approx(now + 60)
+
+    # 超过每日使用次数，次日可用
+    user = make_user(
+        "zhangsan",
+        _last_use_time=now,
+        _use_times=11,
+        _reset_use_times_date=today,
+    )
+    tomorrow = datetime.now().replace(
+        hour=0, minute=0, second=0, microsecond=0
+    ) + timedelta(days=1)
+    assert GoldUserPool._next_use_time(user) == tomorrow.timestamp()
+
+    # 不在工作时间，下个工作时间可用
+    user = make_user("zhangsan", work_time=(7, 23))
+    date = datetime(2026, 10, 19, 23, 30)
+    assert GoldUserPool._next_work_time(user, date.timestamp()) == datetime(
+        2026, 10, 20, 7
+    ).timestamp()
+    date = datetime(2026, 10, 19, 3)
+    assert GoldUserPool._next_work_time(user, date.timestamp()) == datetime(
+        2026, 10, 19, 7
+    ).timestamp()
+
+
+class CustomGoldUserPool(GoldUserPool):
+    def login(self, user: GoldUser) -> GoldUser:
+        user.cookies = "zzzz"
+        return user
+
+
+@pytest.fixture()
+def make_user_pool():
+    try:
+        redisdb = RedisDB()
+        redisdb.ping()
+    except Exception:
+        pytest.skip("需本地redis")
+
+    def clear():
+        keys = redisdb.getkeys(REDIS_KEY + ":*")
+        if keys:
+            redisdb.delete(*keys)
+
+    def make_user_pool(users):
+        user_pool = CustomGoldUserPool(REDIS_KEY, users=users)
+        user_pool.run()
+        return user_pool
+
+    clear()
+    yield make_user_pool
+    clear()
+
+
+def test_get_user(make_user_pool):
+    user_pool = make_user_pool(
+        [make_user(f"user{i}", use_interval=60) for i in range(100)]
+    )
+
+    start = time.time()
+    users = [user_pool.get_user(block=False) for _ in range(100)]
+    # 每个用户只被取出一次，无需逐个扫描、等待
+    assert len({user.username for user in users}) == 100
+    assert time.time() - start < 5
+
+    # 使用间隔内无可用用户
+    assert user_pool.get_user(block=False) is None
+    assert user_pool.get_user(block=False, not_limit_use_interval=True)
+
+
+def test_exclusive(make_user_pool):
+    user_pool = make_user_pool([make_user("user1", use_interval=0, exclusive_time=60)])
+
+    assert user_pool.get_user(block=False, used_for_spider_name="spider_a")
+    # 独占的爬虫可继续使用，其他爬虫需等待独占时长
+    assert user_pool.get_user(block=False, used_for_spider_name="spider_a")
+    assert user_pool.get_user(block=False, used_for_spider_name="spider_b") is None
+
+
+def test_relogin(make_user_pool):
+    user_pool = make_user_pool([make_user(f"user{i}", use_interval=60) for i in range(2)])
+    assert user_pool.get_user(block=False)
+    assert user_pool.get_user(block=False)
+
+    # 一个用户cookie过期被删除，另一个在使用间隔内，重新登录过期的用户，而不是等待
+    user_pool.del_user("user0")
+    start = time.time()
+    user = user_pool.get_user()
+    assert user.username == "user0" and user.cookies
+    assert time.time() - start < 5
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 2026-10-19
+---------
+@summary: 用户序列化及本地缓存测试，缓存部分需本地redis
+    运行 python tests/user_pool/test_user_cache.py 查看反序列化的耗时对比
+---------
+@author: Boris
+@email: boris_liu@foxmail.com
+"""
+
+import threading
+import time
+import timeit
+
+import pytest
+
+from feapder.db.redisdb import RedisDB
+from feapder.network.user_pool.base_user_pool import GoldUser, GuestUser, UserCache
+
+REDIS_URL = "redis://@localhost:6379/0"
+TAB_USER_POOL = "test:h_guest_pool"
+
+
+def make_gold_user():
+    return GoldUser(
+        username="zhangsan",
+        password="1234",
+        max_use_times=10,
+        use_interval=(5, 10),
+        cookies={"token": "xxx"},
+        proxies={"http": "http://127.0.0.1:8888"},
+    )
+
+
+def test_serialize():
+    user = make_gold_user()
+    user_str = user.to_json()
+    assert user_str.startswith("{") and ", " not in user_str
+
+    new_user = GoldUser.from_json(user_str)
+    assert new_user.to_dict() == {
+        **user.to_dict(),
+        "use_interval": [5, 10],
+        "work_time": [7, 23],
+    }
+
+    # 兼容旧版本以str(dict)存储的用户
+    assert GoldUser.from_json(str(user.to_dict())).to_dict() == user.to_dict()
+
+    # 不执行代码
+    with pytest.raises(ValueError):
+        GuestUser.from_json("__import__('os').getcwd()")
+
+
+@pytest.fixture()
+def redisdb():
+    try:
+        redisdb = RedisDB(url=REDIS_URL)
+        redisdb.ping()
+    except Exception:
+        pytest.skip("需本地redis")
+
+    redisdb.clear(TAB_USER_POOL)
+    redisdb.clear(TAB_USER_POOL + ":version")
+    yield redisdb
+    redisdb.clear(TAB_USER_POOL)
+    redisdb.clear(TAB_USER_POOL + ":version")
+
+
+def test_user_cache(redisdb):
+    cache1 = UserCache(redisdb, TAB_USER_POOL, GuestUser)
+    cache2 = UserCache(redisdb, TAB_USER_POOL, GuestUser)
+    assert cache2.count() == 0
+
+    # 其他进程添加用户时唤醒等待的线程
+    user = GuestUser(user_agent="ua", cookies={"a": "1"})
+    threading.Timer(0.2, cache1.save, args=(user,)).start()
+    start = time.time()
+    assert cache2.wait(timeout=5)
+    assert time.time() - start < 1
+
+    assert cache2.get(user.user_id).cookies == {"a": "1"}
+    # 返回的是副本
+    cache2.get(user.user_id).cookies = None
+    assert cache2.get(user.user_id).cookies == {"a": "1"}
+    # 修改副本中的cookies、proxies不影响缓存
+    cache2.get(user.user_id).cookies["a"] = "2"
+    assert cache2.get(user.user_id).cookies == {"a": "1"}
+
+    cache1.delete(user.user_id)
+    time.sleep(0.2)
+    assert cache2.get(user.user_id) is None
+
+
+def benchmark():
+    user = make_gold_user()
+    legacy_str = str(user.to_dict())
+    user_str = user.to_json()
+
+    count = 20000
+    eval_cost = timeit.timeit(lambda: GoldUser(**eval(legacy_str)), number=count)
+    json_cost = timeit.timeit(lambda: GoldUser.from_json(user_str), number=count)
+    print(f"eval       {eval_cost / count * 1e6:.1f}us")
+    print(f"from_json  {json_cost / count * 1e6:.1f}us")
+    print(f"存储长度  str(dict) {len(legacy_str)}  json {len(user_str)}")
+
+
+if __name__ == "__main__":
+    test_serialize()
+    benchmark()